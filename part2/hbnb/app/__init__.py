@@ -4,10 +4,28 @@ from app.api.v1.users import api as users_ns
 from app.api.v1.amenities import api as amenities_ns
 from app.api.v1.places import api as places_ns
 from app.api.v1.reviews import api as reviews_ns
+from app.services import facade
+from config import config
 
-def create_app():
+def init_metrics(app):
+    """Time requests, facade and repository calls, and serve them at /metrics"""
+    # (Imported here: the backends are only loaded when used, see HBnBFacade.use_repositories)
+    from app.metrics import metrics
+    from app.persistence.journal import JournaledRepository
+    from app.persistence.repository import InMemoryRepository
+    from app.persistence.sqlite_repository import SQLiteRepository
+    from app.services.facade import HBnBFacade
+    metrics.init_app(app, facade, classes=(HBnBFacade, InMemoryRepository, SQLiteRepository, JournaledRepository))
+
+def create_app(config_class=config['default']):
     app = Flask(__name__)
-    api = Api(app, version='1.0', title='HBnB API', description='HBnB Application API', doc="/api/v1/")
+    app.config.from_object(config_class)
+    facade.init_app(app)
+    if app.config.get('METRICS_ENABLED'):
+        init_metrics(app)
+    docs = app.config.get('API_DOCS', True)
+    api = Api(version='1.0', title='HBnB API', description='HBnB Application API', doc="/api/v1/" if docs else False)
+    api.init_app(app, add_specs=docs)  # (Api(app) would not pass add_specs on)
 
     # Register namespaces
     api.add_namespace(users_ns, path='/api/v1/users')
@@ -1,5 +1,11 @@
 from flask_restx import Namespace, Resource, fields
 from app.services import facade
+from app.api.v1.conditional import collection_headers, conditional_headers, not_modified
+from app.api.v1.batch import batch_response, get_batch_items
+from app.api.v1.lookup import get_ids_arg, get_lookup_ids, lookup_model
+from app.api.v1.pagination import get_page_args, page_headers, paginate_list
+from app.api.v1.serializers import AMENITY_SUMMARY, PLACE_SUMMARY, amenity_serializer, detail_response, place_serializer
+from app.api.v1.streaming import stream_format, stream_response
 
 api = Namespace('amenities', description='Amenity operations')
 
@@ -9,6 +15,9 @@ amenity_model = api.model('Amenity', {
 })
 
 
+amenity_summary = amenity_serializer.compile(AMENITY_SUMMARY)
+
+
 @api.route('/')
 class AmenityList(Resource):
     @api.expect(amenity_model, validate=True)
@@ -28,30 +37,82 @@ class AmenityList(Resource):
             return {'error': str(err)}, 400
         return {"id": new_amenity.id, "name": new_amenity.name}, 201
 
+    @api.param('limit', 'Maximum number of amenities to return')
+    @api.param('cursor', 'Cursor of the page to fetch, from the X-Next-Cursor header')
+    @api.param('ids', "Only the objects of these comma separated ID's (at most 100), in their order")
+    @api.param('stream', 'Stream the whole collection: 1 for NDJSON lines, json for a JSON array')
+    @api.param('fields', 'Comma separated fields to return instead of the default ones')
     @api.response(200, 'List of amenities retrieved successfully')
+    @api.response(400, 'Invalid pagination parameters')
     def get(self):
         """Retrieve a list of all amenities"""
-        amenities = facade.get_all_amenities()
-        amenities_response = []
+        headers = collection_headers('amenities')
+        cached = not_modified(headers)
+        if cached:
+            return cached
+        try:
+            serialize = amenity_serializer.compile(amenity_serializer.select(AMENITY_SUMMARY))
+            ids = get_ids_arg()
+            streaming = stream_format()
+            if streaming:
+                amenities = facade.iter_amenities() if ids is None else facade.get_many('amenities', ids)
+                return stream_response(amenities, serialize, streaming, headers)
+            limit, cursor = get_page_args()
+            if ids is None:
+                amenities, next_cursor = facade.get_amenities_page(limit, cursor)
+            else:
+                ids, next_cursor = paginate_list(ids, limit, cursor)
+                amenities = facade.get_many('amenities', ids)
+        except ValueError as err:
+            return {'error': str(err)}, 400
+        amenities_response = [serialize(amenity) for amenity in amenities]
 
-        for amenity in amenities:
-            amenities_response.append({
-                "id": amenity.id,
-                "name": amenity.name
-            })
+        return amenities_response, 200, {**headers, **page_headers(next_cursor)}
+
+@api.route('/batch')
+class AmenityBatch(Resource):
+    @api.expect([amenity_model])
+    @api.response(201, 'Amenities created, invalid items are reported by index')
+    @api.response(400, 'No valid amenity in the batch')
+    def post(self):
+        """Register many amenities at once from a JSON array or NDJSON lines"""
+        try:
+            created, errors = facade.bulk_create_amenities(get_batch_items())
+        except ValueError as err:
+            return {'error': str(err)}, 400
+        return batch_response(created, errors)
 
-        return amenities_response, 200
+@api.route('/lookup')
+class AmenityLookup(Resource):
+    @api.expect(lookup_model(api), validate=True)
+    @api.param('fields', 'Comma separated fields to return instead of the default ones')
+    @api.response(200, 'Amenities found, in the order of the ids (unknown ids are skipped)')
+    @api.response(400, 'Invalid ids or fields')
+    def post(self):
+        """Retrieve many amenities by ID at once"""
+        try:
+            serialize = amenity_serializer.compile(amenity_serializer.select(AMENITY_SUMMARY))
+            amenities = facade.get_many('amenities', get_lookup_ids())
+        except ValueError as err:
+            return {'error': str(err)}, 400
+        return [serialize(amenity) for amenity in amenities], 200
 
 @api.route('/<amenity_id>')
 class AmenityResource(Resource):
+    @api.param('fields', 'Comma separated fields to return instead of the default ones')
     @api.response(200, 'Amenity details retrieved successfully')
+    @api.response(304, 'Amenity not modified since the ETag or date sent')
     @api.response(404, 'Amenity not found')
     def get(self, amenity_id):
         """Get amenity details by ID"""
         amenity = facade.get_amenity(amenity_id)
         if not amenity:
             return {'error': 'Amenity not found'}, 404
-        return {"id": amenity.id, "name": amenity.name}, 200
+        headers = conditional_headers((amenity.id, amenity.updated_at), amenity.updated_at)
+        try:
+            return detail_response('amenities', amenity, headers, amenity_serializer, AMENITY_SUMMARY)
+        except ValueError as err:
+            return {'error': str(err)}, 400
 
     @api.expect(amenity_model)
     @api.response(200, 'Amenity updated successfully')
@@ -70,4 +131,47 @@ class AmenityResource(Resource):
         except ValueError as err:
             return {'error': str(err)}, 400
 
-        return {"id": existing_amenity.id, "name": existing_amenity.name}, 200
\ No newline at end of file
+        return {"id": existing_amenity.id, "name": existing_amenity.name}, 200
+
+    @api.response(200, 'Amenity deleted successfully')
+    @api.response(404, 'Amenity not found')
+    @api.response(400, 'A delete rule forbids it while the amenity has dependent objects')
+    def delete(self, amenity_id):
+        """Delete an amenity"""
+        if not facade.get_amenity(amenity_id):
+            return {'error': 'Amenity not found'}, 404
+
+        try:
+            facade.delete_amenity(amenity_id)
+        except ValueError as err:
+            return {'error': str(err)}, 400
+
+        return {"message": "Amenity deleted successfully"}, 200
+
+@api.route('/<amenity_id>/places')
+class AmenityPlaceList(Resource):
+    @api.param('limit', 'Maximum number of places to return')
+    @api.param('cursor', 'Cursor of the page to fetch, from the X-Next-Cursor header')
+    @api.param('fields', 'Comma separated fields to return instead of the default ones')
+    @api.response(200, 'List of places offering the amenity retrieved successfully')
+    @api.response(400, 'Invalid pagination parameters')
+    @api.response(404, 'Amenity not found')
+    def get(self, amenity_id):
+        """Get all places offering a specific amenity"""
+        amenity = facade.get_amenity(amenity_id)
+        if not amenity:
+            return {'error': 'Amenity not found'}, 404
+
+        headers = collection_headers('places', 'reviews', 'amenities')
+        cached = not_modified(headers)
+        if cached:
+            return cached
+        try:
+            serialize = place_serializer.compile(place_serializer.select(PLACE_SUMMARY))
+            limit, cursor = get_page_args()
+            places, next_cursor = facade.get_places_page_by_amenity(amenity_id, limit, cursor)
+        except ValueError as err:
+            return {'error': str(err)}, 400
+        places_response = [serialize(place) for place in places]
+
+        return places_response, 200, {**headers, **page_headers(next_cursor)}
@@ -0,0 +1,32 @@
+import json
+from flask import request
+
+MAX_BATCH_SIZE = 100000
+
+
+def get_batch_items():
+    """Read the items of a batch request, sent as a JSON array or as NDJSON lines"""
+    if request.mimetype == 'application/x-ndjson':
+        items = []
+        for line in request.stream:
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                items.append(None)  # (Reported as an invalid item)
+            if len(items) > MAX_BATCH_SIZE:
+                break
+    else:
+        items = request.get_json(silent=True)
+        if not isinstance(items, list):
+            raise ValueError("Expected a JSON array or NDJSON lines !")
+    if len(items) > MAX_BATCH_SIZE:
+        raise ValueError(f"A batch must not exceed {MAX_BATCH_SIZE} items !")
+    return items
+
+
+def batch_response(created, errors):
+    """201 with the created ID's if anything was created, 400 otherwise; errors are per item index"""
+    body = {"created": [obj.id for obj in created], "errors": errors}
+    return body, 201 if created else 400
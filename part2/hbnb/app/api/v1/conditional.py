@@ -0,0 +1,51 @@
+import hashlib
+from flask import Response, request
+from flask_restx.representations import output_json
+from werkzeug.http import http_date, parse_date
+from app.services import facade
+
+
+def conditional_headers(etag_parts, *modified):
+    """ETag hashed from the values a response is built from, and Last-Modified from the
+    latest of the given datetimes (None values are skipped)"""
+    digest = hashlib.blake2b(repr(etag_parts).encode(), digest_size=12).hexdigest()
+    headers = {'ETag': f'"{digest}"'}
+    modified = [moment for moment in modified if moment is not None]
+    if modified:
+        # (The models hold naive local times, timestamp() turns them into UTC)
+        headers['Last-Modified'] = http_date(max(modified).timestamp())
+    return headers
+
+
+def collection_headers(*kinds):
+    """ETag of a list response built from the given repositories ('users', 'reviews'...)"""
+    return collection_etag(facade.get_versions(*kinds), request.full_path, request.headers.get('Accept'))
+
+
+def collection_etag(versions, full_path, accept):
+    """ETag of a list response from its repositories' versions and the request's path, query and Accept"""
+    headers = conditional_headers((versions, full_path, accept))
+    headers['Vary'] = 'Accept'
+    return headers
+
+
+def not_modified(headers):
+    """A 304 response if the client's copy matches the headers, None if the body must be sent"""
+    if request.if_none_match:
+        # (If-None-Match wins over If-Modified-Since when both are sent)
+        fresh = request.if_none_match.contains_weak(headers['ETag'].strip('"'))
+    elif request.if_modified_since and 'Last-Modified' in headers:
+        fresh = parse_date(headers['Last-Modified']) <= request.if_modified_since
+    else:
+        fresh = False
+    return Response(status=304, headers=headers) if fresh else None
+
+
+def cached_response(kind, obj_id, headers, build):
+    """200 response with the body build() returns, reused from the response cache while the ETag holds"""
+    body = facade.response_cache.get(kind, obj_id, headers['ETag'])
+    if body is None:
+        # (Encoded like flask-restx encodes the dicts the other handlers return)
+        body = output_json(build(), 200).get_data()
+        facade.response_cache.put(kind, obj_id, headers['ETag'], body)
+    return Response(body, mimetype='application/json', headers=headers)
@@ -0,0 +1,35 @@
+from flask import request
+from flask_restx import fields
+
+MAX_IDS_ARG = 100  # (Longer lists go in the body of a POST to /lookup)
+MAX_LOOKUP_IDS = 1000
+
+
+def get_ids_arg():
+    """Ids of the ?ids= query parameter of a list request, None without it"""
+    value = request.args.get('ids')
+    if value is None:
+        return None
+    ids = [obj_id for obj_id in value.split(',') if obj_id]
+    if not ids:
+        raise ValueError("ids must list at least one id !")
+    if len(ids) > MAX_IDS_ARG:
+        raise ValueError(f"ids must not list more than {MAX_IDS_ARG} ids, POST longer lists to /lookup !")
+    return ids
+
+
+def lookup_model(api):
+    """Model of a lookup request body, registered on a namespace"""
+    return api.model(f'{api.name.capitalize()}Lookup', {
+        'ids': fields.List(fields.String, required=True, description=f"ID's of the {api.name} to retrieve")
+    })
+
+
+def get_lookup_ids():
+    """Ids of a lookup request body (validated against lookup_model)"""
+    ids = request.get_json()['ids']
+    if not ids:
+        raise ValueError("ids must list at least one id !")
+    if len(ids) > MAX_LOOKUP_IDS:
+        raise ValueError(f"A lookup must not exceed {MAX_LOOKUP_IDS} ids !")
+    return ids
@@ -0,0 +1,86 @@
+import base64
+import binascii
+import heapq
+import json
+from operator import itemgetter
+from urllib.parse import urlencode
+from flask import request
+from app.persistence.repository import decode_cursor, encode_cursor
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+def get_page_args():
+    """Read the ?limit= and ?cursor= query parameters of a list request"""
+    limit = request.args.get('limit', DEFAULT_LIMIT)
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise ValueError("limit must be an integer !")
+    if limit < 1 or limit > MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_LIMIT} !")
+    return limit, request.args.get('cursor')
+
+
+def cursor_offset(cursor):
+    """Position in a list of a cursor from paginate_list (0 without one)"""
+    start = 0 if cursor is None else decode_cursor(cursor)
+    if start < 0:
+        raise ValueError("Invalid cursor !")
+    return start
+
+
+def page_headers(next_cursor):
+    """Headers pointing the client to the next page, if there is one"""
+    if next_cursor is None:
+        return {}
+    args = request.args.to_dict()
+    args['cursor'] = next_cursor
+    return {
+        'X-Next-Cursor': next_cursor,
+        'Link': f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+    }
+
+
+def paginate_list(items, limit, cursor=None):
+    """Page through a list that is the same on every request (e.g. the ids of the request) by
+    position, returns (page, next_cursor)"""
+    start = cursor_offset(cursor)
+    end = start + limit
+    next_cursor = encode_cursor(end) if end < len(items) else None
+    return items[start:end], next_cursor
+
+
+def encode_key_cursor(key):
+    """Turn the sort key of a result into an opaque pagination cursor"""
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_key_cursor(cursor):
+    try:
+        key = json.loads(base64.urlsafe_b64decode((cursor + '=' * (-len(cursor) % 4)).encode()))
+    except (ValueError, binascii.Error):
+        raise ValueError("Invalid cursor !")
+    if not isinstance(key, list):
+        raise ValueError("Invalid cursor !")
+    return tuple(key)
+
+
+def paginate_sorted(items, limit, cursor, key):
+    """Page through a computed list of results in key(item) order, returns (page, next_cursor).
+    key(item) is a tuple unique to each item (e.g. (distance, id)); the cursor holds the key of
+    the last item sent, so results added or removed between requests do not shift the next page.
+    Only the page is sorted: the results after the cursor go through a heap of limit + 1 items"""
+    keyed = ((key(item), item) for item in items)
+    if cursor is not None:
+        after = decode_key_cursor(cursor)
+        keyed = ((item_key, item) for item_key, item in keyed if item_key > after)
+    try:
+        # (One extra result tells whether there is a next page)
+        selected = heapq.nsmallest(limit + 1, keyed, key=itemgetter(0))
+    except TypeError:
+        raise ValueError("Invalid cursor !")
+    page = selected[:limit]
+    next_cursor = encode_key_cursor(page[-1][0]) if len(selected) > limit else None
+    return [item for _, item in page], next_cursor
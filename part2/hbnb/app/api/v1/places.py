@@ -1,5 +1,16 @@
+import math
+from flask import request
 from flask_restx import Namespace, Resource, fields
 from app.services import facade
+from app.api.v1.conditional import collection_headers, conditional_headers, not_modified
+from app.api.v1.batch import batch_response, get_batch_items
+from app.api.v1.lookup import get_ids_arg, get_lookup_ids, lookup_model
+from app.api.v1.pagination import cursor_offset, get_page_args, page_headers, paginate_list, paginate_sorted
+from app.api.v1.serializers import (PLACE_DETAIL, PLACE_SUMMARY, PLACE_TOP, detail_response, get_includes,
+                                    include_kinds, list_body, place_serializer)
+from app.api.v1.streaming import stream_format, stream_response
+from app.persistence.repository import encode_cursor
+from app.persistence.search import tokenize
 
 api = Namespace('places', description='Place operations')
 
@@ -37,6 +48,117 @@ place_model = api.model('Place', {
 })
 
 
+def place_headers(place):
+    """Validators of a place's detail response, which also shows its owner, amenities and rating.
+    Only stored state goes in, so every worker sends the same ones (a rating change stamps the place)"""
+    owner, stats = place.owner, place.rating_stats
+    amenities = [(amenity.id, amenity.updated_at) for amenity in place.amenities]
+    return conditional_headers(
+        (place.id, place.updated_at, owner.id, owner.updated_at, amenities, stats.count, stats.total, stats.histogram),
+        place.updated_at, owner.updated_at, *(updated_at for _, updated_at in amenities))
+
+
+def place_item(names):
+    """List item serializer of (distance_km, place) search results, distance_km may be None"""
+    serialize = place_serializer.compile(names)
+    with_distance = 'distance_km' in names
+
+    def item(result):
+        distance, place = result
+        place_response = serialize(place)
+        if with_distance and distance is not None:
+            place_response["distance_km"] = round(distance, 3)
+        return place_response
+
+    return item
+
+
+PLACE_LIST = PLACE_SUMMARY + ('distance_km',)
+place_summary = place_item(PLACE_LIST)
+
+
+def parse_floats(value, count, name):
+    """Parse a comma separated list of exactly `count` floats from a query parameter"""
+    try:
+        numbers = [float(number) for number in value.split(',')]
+    except ValueError:
+        raise ValueError(f"{name} must be a comma separated list of numbers !")
+    if len(numbers) != count:
+        raise ValueError(f"{name} must contain {count} numbers !")
+    return numbers
+
+
+def optional_float(name):
+    """Parse an optional numeric query parameter (a finite number: NaN compares false with
+    everything, so it would filter out every place instead of being reported)"""
+    value = request.args.get(name)
+    if value is None:
+        return None
+    number = parse_floats(value, 1, name)[0]
+    if not math.isfinite(number):
+        raise ValueError(f"{name} must be a finite number !")
+    return number
+
+
+def amenity_ids_arg():
+    """Parse the ?amenities=id1,id2 query parameter, None if it is absent"""
+    value = request.args.get('amenities')
+    if value is None:
+        return None
+    amenity_ids = [amenity_id for amenity_id in value.split(',') if amenity_id]
+    for amenity_id in amenity_ids:
+        if not facade.get_amenity(amenity_id):
+            raise ValueError("One of the amenities does not exist!")
+    return amenity_ids
+
+
+def distance_order(result):
+    return result[0], result[1].id
+
+
+def price_order(result):
+    return result[1].price, result[1].id
+
+
+def search_places():
+    """Run the area, price and amenity search of the request, returns (results, sort key of their
+    order for paginate_sorted, None for the storage order); (None, None) without search parameter"""
+    bbox = request.args.get('bbox')
+    near = request.args.get('near')
+    min_price = optional_float('min_price')
+    max_price = optional_float('max_price')
+    amenity_ids = amenity_ids_arg()
+    if bbox is not None:
+        min_lat, min_lon, max_lat, max_lon = parse_floats(bbox, 4, "bbox")
+        if not (-90 <= min_lat <= max_lat <= 90) or not (-180 <= min_lon <= 180 and -180 <= max_lon <= 180):
+            raise ValueError("bbox must be min_lat,min_lon,max_lat,max_lon with valid coordinates !")
+        results = facade.get_places_in_bbox(min_lat, min_lon, max_lat, max_lon)
+        order = distance_order
+    elif near is not None:
+        latitude, longitude = parse_floats(near, 2, "near")
+        if not (-90 <= latitude <= 90) or not (-180 <= longitude <= 180):
+            raise ValueError("near must be lat,lon with valid coordinates !")
+        radius_km = parse_floats(request.args.get('radius_km', ''), 1, "radius_km")[0]
+        if not (math.isfinite(radius_km) and radius_km > 0):
+            raise ValueError("radius_km must be a positive finite number !")
+        results = facade.get_places_near(latitude, longitude, radius_km)
+        order = distance_order
+    elif min_price is not None or max_price is not None:
+        # (Price only searches scan every place, the column store does it vectorized)
+        results = facade.filter_places(min_price=min_price, max_price=max_price)
+        order = price_order
+    elif amenity_ids is not None:
+        return [(None, place) for place in facade.get_places_with_amenities(amenity_ids)], None
+    else:
+        return None, None
+
+    # The remaining bounds are checked on the candidates directly
+    return [(distance, place) for distance, place in results
+            if (min_price is None or place.price >= min_price)
+            and (max_price is None or place.price <= max_price)
+            and (amenity_ids is None or facade.place_has_amenities(place, amenity_ids))], order
+
+
 @api.route('/')
 class PlaceList(Resource):
     @api.expect(place_model, validate=True)
@@ -77,54 +199,183 @@ class PlaceList(Resource):
             "owner_id": new_place.owner.id
         }, 201
 
+    @api.param('limit', 'Maximum number of places to return')
+    @api.param('cursor', 'Cursor of the page to fetch, from the X-Next-Cursor header')
+    @api.param('bbox', 'Only places inside min_lat,min_lon,max_lat,max_lon, closest to its center first')
+    @api.param('near', 'Only places around lat,lon (requires radius_km), closest first')
+    @api.param('radius_km', 'Search radius around the near point, in kilometers')
+    @api.param('min_price', 'Only places at or above this price, cheapest first without an area')
+    @api.param('max_price', 'Only places at or below this price, cheapest first without an area')
+    @api.param('amenities', "Only places offering all of these comma separated amenity ID's")
+    @api.param('ids', "Only the objects of these comma separated ID's (at most 100), in their order")
+    @api.param('stream', 'Stream the whole collection: 1 for NDJSON lines, json for a JSON array')
+    @api.param('fields', 'Comma separated fields to return instead of the default ones')
+    @api.param('include', 'Related objects to side-load: owner, amenities, reviews (and their relations, e.g. reviews.user)')
     @api.response(200, 'List of places retrieved successfully')
+    @api.response(400, 'Invalid query parameters')
     def get(self):
         """Retrieve a list of all places"""
-        places = facade.get_all_places()
-        places_response = []
+        try:
+            includes = get_includes('places')
+        except ValueError as err:
+            return {'error': str(err)}, 400
+        headers = collection_headers('places', 'reviews', 'amenities', *include_kinds('places', includes))
+        cached = not_modified(headers)
+        if cached:
+            return cached
+        try:
+            serialize = place_item(place_serializer.select(PLACE_LIST, extras=('distance_km',)))
+            ids = get_ids_arg()
+            streaming = stream_format()
+            if streaming and includes:
+                raise ValueError('include cannot be combined with stream !')
+            results, order = search_places() if ids is None else (None, None)
+            if streaming:
+                if ids is not None:
+                    results = [(None, place) for place in facade.get_many('places', ids)]
+                elif results is None:
+                    results = ((None, place) for place in facade.iter_places())
+                return stream_response(results, serialize, streaming, headers)
+            limit, cursor = get_page_args()
+            if ids is not None:
+                ids, next_cursor = paginate_list(ids, limit, cursor)
+                results = [(None, place) for place in facade.get_many('places', ids)]
+            elif results is None:
+                places, next_cursor = facade.get_places_page(limit, cursor)
+                results = [(None, place) for place in places]
+            elif order is None:
+                places, next_cursor = facade.get_page_of('places', [place for _, place in results], limit, cursor)
+                results = [(None, place) for place in places]
+            else:
+                # (Keyset cursors: places added or removed between requests do not shift the pages)
+                results, next_cursor = paginate_sorted(results, limit, cursor, order)
+        except ValueError as err:
+            return {'error': str(err)}, 400
+        places_response = list_body('places', [place for _, place in results],
+                                    [serialize(result) for result in results], includes)
+
+        return places_response, 200, {**headers, **page_headers(next_cursor)}
+
+@api.route('/batch')
+class PlaceBatch(Resource):
+    @api.expect([place_model])
+    @api.response(201, 'Places created, invalid items are reported by index')
+    @api.response(400, 'No valid place in the batch')
+    def post(self):
+        """Register many places at once from a JSON array or NDJSON lines"""
+        try:
+            created, errors = facade.bulk_create_places(get_batch_items())
+        except ValueError as err:
+            return {'error': str(err)}, 400
+        return batch_response(created, errors)
+
+@api.route('/top')
+class TopPlaceList(Resource):
+    @api.param('by', "Ranking to use: 'rating' (best average first) or 'price' (cheapest first)")
+    @api.param('n', 'Number of places to return (default 10, max 100)')
+    @api.param('fields', 'Comma separated fields to return instead of the default ones')
+    @api.param('include', 'Related objects to side-load: owner, amenities, reviews (and their relations, e.g. reviews.user)')
+    @api.response(200, 'Leaderboard retrieved successfully')
+    @api.response(400, 'Invalid query parameters')
+    def get(self):
+        """Retrieve the best rated or cheapest places"""
+        try:
+            n = int(request.args.get('n', 10))
+        except ValueError:
+            return {'error': 'n must be an integer !'}, 400
+        if n < 1 or n > 100:
+            return {'error': 'n must be between 1 and 100 !'}, 400
 
-        for place in places:
-            places_response.append({
-                "id": place.id,
-                "title": place.title,
-                "latitude": place.latitude,
-                "longitude": place.longitude
-            })
+        try:
+            serialize = place_serializer.compile(place_serializer.select(PLACE_TOP))
+            includes = get_includes('places')
+        except ValueError as err:
+            return {'error': str(err)}, 400
+        headers = collection_headers('places', 'reviews', 'amenities', *include_kinds('places', includes))
+        cached = not_modified(headers)
+        if cached:
+            return cached
+        try:
+            places = facade.get_top_places(request.args.get('by', 'rating'), n)
+        except ValueError as err:
+            return {'error': str(err)}, 400
+        places_response = list_body('places', places, [serialize(place) for place in places], includes)
+
+        return places_response, 200, headers
+
+@api.route('/search')
+class PlaceSearch(Resource):
+    @api.param('q', 'Words to find in the title, description or reviews of the places (all of them must match)')
+    @api.param('fields', 'Comma separated fields to return instead of the default ones')
+    @api.param('include', 'Related objects to side-load: owner, amenities, reviews (and their relations, e.g. reviews.user)')
+    @api.param('limit', 'Maximum number of places to return')
+    @api.param('cursor', 'Cursor of the page to fetch, from the X-Next-Cursor header')
+    @api.response(200, 'Matching places retrieved successfully, best match first')
+    @api.response(400, 'Invalid query parameters')
+    def get(self):
+        """Search places by text, ranked by relevance (BM25)"""
+        query = request.args.get('q', '')
+        if not tokenize(query):
+            return {'error': 'q must contain at least one search term !'}, 400
+        try:
+            names = place_serializer.select(PLACE_SUMMARY + ('score',), extras=('score',))
+            includes = get_includes('places')
+        except ValueError as err:
+            return {'error': str(err)}, 400
+        headers = collection_headers('places', 'reviews', *include_kinds('places', includes))
+        cached = not_modified(headers)
+        if cached:
+            return cached
 
-        return places_response, 200
+        try:
+            limit, cursor = get_page_args()
+            offset = cursor_offset(cursor)
+            results, total = facade.search_places(query, limit, offset)
+        except ValueError as err:
+            return {'error': str(err)}, 400
+        next_cursor = encode_cursor(offset + limit) if offset + limit < total else None
+        serialize = place_serializer.compile(names)
+        if 'score' in names:
+            places_response = [{**serialize(place), "score": round(score, 4)} for score, place in results]
+        else:
+            places_response = [serialize(place) for _, place in results]
+        places_response = list_body('places', [place for _, place in results], places_response, includes)
+
+        return places_response, 200, {**headers, **page_headers(next_cursor), 'X-Total-Count': str(total)}
+
+@api.route('/lookup')
+class PlaceLookup(Resource):
+    @api.expect(lookup_model(api), validate=True)
+    @api.param('fields', 'Comma separated fields to return instead of the default ones')
+    @api.param('include', 'Related objects to side-load: owner, amenities, reviews (and their relations, e.g. reviews.user)')
+    @api.response(200, 'Places found, in the order of the ids (unknown ids are skipped)')
+    @api.response(400, 'Invalid ids, fields or includes')
+    def post(self):
+        """Retrieve many places by ID at once"""
+        try:
+            serialize = place_serializer.compile(place_serializer.select(PLACE_SUMMARY))
+            includes = get_includes('places')
+            places = facade.get_many('places', get_lookup_ids())
+        except ValueError as err:
+            return {'error': str(err)}, 400
+        return list_body('places', places, [serialize(place) for place in places], includes), 200
 
 @api.route('/<place_id>')
 class PlaceResource(Resource):
+    @api.param('fields', 'Comma separated fields to return instead of the default ones')
+    @api.param('include', 'Related objects to side-load: owner, amenities, reviews (and their relations, e.g. reviews.user)')
     @api.response(200, 'Place details retrieved successfully')
+    @api.response(304, 'Place not modified since the ETag or date sent')
     @api.response(404, 'Place not found')
     def get(self, place_id):
         """Get place details by ID"""
         place = facade.get_place(place_id)
         if not place:
             return {'error': 'Place not found'}, 404
-        
-        owner = {
-            "id": place.owner.id,
-            "first_name": place.owner.first_name,
-            "last_name": place.owner.last_name,
-            "email": place.owner.email
-        }
-
-        amenities = []
-        for amenity in place.amenities:
-            amenities.append({
-                "id": amenity.id,
-                "name": amenity.name
-            })
-        return {
-            "id": place.id,
-            "title": place.title,
-            "description": place.description,
-            "latitude": place.latitude,
-            "longitude": place.longitude,
-            "owner": owner,
-            "amenities": amenities
-        }, 200
+        try:
+            return detail_response('places', place, place_headers(place), place_serializer, PLACE_DETAIL)
+        except ValueError as err:
+            return {'error': str(err)}, 400
 
     @api.expect(place_model)
     @api.response(200, 'Place updated successfully')
@@ -156,3 +407,18 @@ class PlaceResource(Resource):
             return {'error': str(err)}, 400
         
         return {"message": "Place updated successfully"}, 200
+
+    @api.response(200, 'Place deleted successfully')
+    @api.response(404, 'Place not found')
+    @api.response(400, 'A delete rule forbids it while the place has dependent objects')
+    def delete(self, place_id):
+        """Delete a place"""
+        if not facade.get_place(place_id):
+            return {'error': 'Place not found'}, 404
+
+        try:
+            facade.delete_place(place_id)
+        except ValueError as err:
+            return {'error': str(err)}, 400
+
+        return {"message": "Place deleted successfully"}, 200
@@ -1,5 +1,12 @@
 from flask_restx import Namespace, Resource, fields
 from app.services import facade
+from app.api.v1.conditional import collection_headers, conditional_headers, not_modified
+from app.api.v1.batch import batch_response, get_batch_items
+from app.api.v1.lookup import get_ids_arg, get_lookup_ids, lookup_model
+from app.api.v1.pagination import get_page_args, page_headers, paginate_list
+from app.api.v1.serializers import (REVIEW_DETAIL, REVIEW_SUMMARY, USER_REVIEW_SUMMARY, detail_response, get_includes,
+                                    include_kinds, list_body, review_serializer)
+from app.api.v1.streaming import stream_format, stream_response
 
 api = Namespace('reviews', description='Review operations')
 
@@ -11,6 +18,9 @@ review_model = api.model('Review', {
     'place_id': fields.String(required=True, description='ID of the place')
 })
 
+
+review_summary = review_serializer.compile(REVIEW_SUMMARY)
+
 @api.route('/')
 class ReviewList(Resource):
     @api.expect(review_model, validate=True)
@@ -45,38 +55,92 @@ class ReviewList(Resource):
             "place_id": new_review.place.id
         }, 201
 
+    @api.param('limit', 'Maximum number of reviews to return')
+    @api.param('cursor', 'Cursor of the page to fetch, from the X-Next-Cursor header')
+    @api.param('ids', "Only the objects of these comma separated ID's (at most 100), in their order")
+    @api.param('stream', 'Stream the whole collection: 1 for NDJSON lines, json for a JSON array')
+    @api.param('fields', 'Comma separated fields to return instead of the default ones')
+    @api.param('include', 'Related objects to side-load: user, place (and their relations, e.g. place.owner)')
     @api.response(200, 'List of reviews retrieved successfully')
+    @api.response(400, 'Invalid pagination parameters')
     def get(self):
         """Retrieve a list of all reviews"""
-        reviews = facade.get_all_reviews()
-        reviews_response = []
+        try:
+            includes = get_includes('reviews')
+        except ValueError as err:
+            return {'error': str(err)}, 400
+        headers = collection_headers('reviews', *include_kinds('reviews', includes))
+        cached = not_modified(headers)
+        if cached:
+            return cached
+        try:
+            serialize = review_serializer.compile(review_serializer.select(REVIEW_SUMMARY))
+            ids = get_ids_arg()
+            streaming = stream_format()
+            if streaming and includes:
+                raise ValueError('include cannot be combined with stream !')
+            if streaming:
+                reviews = facade.iter_reviews() if ids is None else facade.get_many('reviews', ids)
+                return stream_response(reviews, serialize, streaming, headers)
+            limit, cursor = get_page_args()
+            if ids is None:
+                reviews, next_cursor = facade.get_reviews_page(limit, cursor)
+            else:
+                ids, next_cursor = paginate_list(ids, limit, cursor)
+                reviews = facade.get_many('reviews', ids)
+        except ValueError as err:
+            return {'error': str(err)}, 400
+        reviews_response = list_body('reviews', reviews, [serialize(review) for review in reviews], includes)
 
-        for review in reviews:
-            reviews_response.append({
-                "id": review.id,
-                "text": review.text,
-                "rating": review.rating,
-            })
+        return reviews_response, 200, {**headers, **page_headers(next_cursor)}
+
+@api.route('/batch')
+class ReviewBatch(Resource):
+    @api.expect([review_model])
+    @api.response(201, 'Reviews created, invalid items are reported by index')
+    @api.response(400, 'No valid review in the batch')
+    def post(self):
+        """Register many reviews at once from a JSON array or NDJSON lines"""
+        try:
+            created, errors = facade.bulk_create_reviews(get_batch_items())
+        except ValueError as err:
+            return {'error': str(err)}, 400
+        return batch_response(created, errors)
 
-        return reviews_response, 200
+@api.route('/lookup')
+class ReviewLookup(Resource):
+    @api.expect(lookup_model(api), validate=True)
+    @api.param('fields', 'Comma separated fields to return instead of the default ones')
+    @api.param('include', 'Related objects to side-load: user, place (and their relations, e.g. place.owner)')
+    @api.response(200, 'Reviews found, in the order of the ids (unknown ids are skipped)')
+    @api.response(400, 'Invalid ids, fields or includes')
+    def post(self):
+        """Retrieve many reviews by ID at once"""
+        try:
+            serialize = review_serializer.compile(review_serializer.select(REVIEW_SUMMARY))
+            includes = get_includes('reviews')
+            reviews = facade.get_many('reviews', get_lookup_ids())
+        except ValueError as err:
+            return {'error': str(err)}, 400
+        return list_body('reviews', reviews, [serialize(review) for review in reviews], includes), 200
 
 @api.route('/<review_id>')
 class ReviewResource(Resource):
+    @api.param('fields', 'Comma separated fields to return instead of the default ones')
+    @api.param('include', 'Related objects to side-load: user, place (and their relations, e.g. place.owner)')
     @api.response(200, 'Review details retrieved successfully')
+    @api.response(304, 'Review not modified since the ETag or date sent')
     @api.response(404, 'Review not found')
     def get(self, review_id):
         """Get review details by ID"""
         review = facade.get_review(review_id)
         if not review:
             return {'error': 'Review not found'}, 404
-        
-        return {
-            "id": review.id,
-            "text": review.text,
-            "rating": review.rating,
-            "user_id": review.user.id,
-            "place_id": review.place.id
-        }
+        headers = conditional_headers((review.id, review.updated_at), review.updated_at)
+        try:
+            return detail_response('reviews', review, headers, review_serializer, REVIEW_DETAIL)
+        except ValueError as err:
+            return {'error': str(err)}, 400
 
     @api.expect(review_model)
     @api.response(200, 'Review updated successfully')
@@ -111,7 +175,12 @@ class ReviewResource(Resource):
 
 @api.route('/places/<place_id>/reviews')
 class PlaceReviewList(Resource):
+    @api.param('fields', 'Comma separated fields to return instead of the default ones')
+    @api.param('include', 'Related objects to side-load: user, place (and their relations, e.g. place.owner)')
+    @api.param('limit', 'Maximum number of reviews to return')
+    @api.param('cursor', 'Cursor of the page to fetch, from the X-Next-Cursor header')
     @api.response(200, 'List of reviews for the place retrieved successfully')
+    @api.response(400, 'Invalid query parameters')
     @api.response(404, 'Place not found')
     def get(self, place_id):
         """Get all reviews for a specific place"""
@@ -119,13 +188,53 @@ class PlaceReviewList(Resource):
         if not place:
             return {'error': 'Place not found'}, 404
         
-        reviews = facade.get_reviews_by_place(place_id)
-        reviews_response = []
-        for review in reviews:
-            reviews_response.append({
-                "id": review.id,
-                "text": review.text,
-                "rating": review.rating,
-            })
-
-        return reviews_response, 200
+        try:
+            serialize = review_serializer.compile(review_serializer.select(REVIEW_SUMMARY))
+            includes = get_includes('reviews')
+        except ValueError as err:
+            return {'error': str(err)}, 400
+        headers = collection_headers('reviews', *include_kinds('reviews', includes))
+        cached = not_modified(headers)
+        if cached:
+            return cached
+        try:
+            limit, cursor = get_page_args()
+            reviews, next_cursor = facade.get_reviews_page_by_place(place_id, limit, cursor)
+        except ValueError as err:
+            return {'error': str(err)}, 400
+        reviews_response = list_body('reviews', reviews, [serialize(review) for review in reviews], includes)
+
+        return reviews_response, 200, {**headers, **page_headers(next_cursor)}
+
+@api.route('/users/<user_id>/reviews')
+class UserReviewList(Resource):
+    @api.param('fields', 'Comma separated fields to return instead of the default ones')
+    @api.param('include', 'Related objects to side-load: user, place (and their relations, e.g. place.owner)')
+    @api.param('limit', 'Maximum number of reviews to return')
+    @api.param('cursor', 'Cursor of the page to fetch, from the X-Next-Cursor header')
+    @api.response(200, 'List of reviews written by the user retrieved successfully')
+    @api.response(400, 'Invalid query parameters')
+    @api.response(404, 'User not found')
+    def get(self, user_id):
+        """Get all reviews written by a specific user"""
+        user = facade.get_user(user_id)
+        if not user:
+            return {'error': 'User not found'}, 404
+
+        try:
+            serialize = review_serializer.compile(review_serializer.select(USER_REVIEW_SUMMARY))
+            includes = get_includes('reviews')
+        except ValueError as err:
+            return {'error': str(err)}, 400
+        headers = collection_headers('reviews', *include_kinds('reviews', includes))
+        cached = not_modified(headers)
+        if cached:
+            return cached
+        try:
+            limit, cursor = get_page_args()
+            reviews, next_cursor = facade.get_reviews_page_by_user(user_id, limit, cursor)
+        except ValueError as err:
+            return {'error': str(err)}, 400
+        reviews_response = list_body('reviews', reviews, [serialize(review) for review in reviews], includes)
+
+        return reviews_response, 200, {**headers, **page_headers(next_cursor)}
@@ -0,0 +1,237 @@
+from operator import attrgetter
+from flask import request
+from app.api.v1.conditional import cached_response, conditional_headers, not_modified
+
+MAX_COMPILED = 256  # (Field selections compiled per serializer before the cache starts over)
+
+
+class Serializer:
+    """Response dicts of one model, built from named field getters.
+
+    A field selection (a tuple of names) is compiled once into a function that
+    only calls the getters of those fields, so an unrequested field (e.g. the
+    owner nested in a place) is neither computed nor sent.
+    """
+
+    def __init__(self, getters):
+        self.getters = getters  # field name -> getter of the value from the object, in output order
+        self._compiled = {}
+
+    def select(self, default, extras=()):
+        """Names of the fields the request's ?fields= asks for (in output order), `default` without it.
+        `extras` are names the handler adds itself (e.g. distance_km)"""
+        value = request.args.get('fields')
+        if value is None:
+            return default
+        allowed = (*self.getters, *extras)
+        names = {name.strip() for name in value.split(',') if name.strip()}
+        if not names:
+            raise ValueError('fields must name at least one field !')
+        unknown = names.difference(allowed)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))} ! (allowed: {', '.join(allowed)})")
+        return tuple(name for name in allowed if name in names)
+
+    def compile(self, names):
+        """Function building the dict of the named fields of an object (extras are skipped)"""
+        serialize = self._compiled.get(names)
+        if serialize is None:
+            getters = tuple((name, self.getters[name]) for name in names if name in self.getters)
+
+            def serialize(obj):
+                return {name: get(obj) for name, get in getters}
+
+            if len(self._compiled) >= MAX_COMPILED:
+                self._compiled.clear()
+            self._compiled[names] = serialize
+        return serialize
+
+
+def detail_response(kind, obj, headers, serializer, default):
+    """Conditional response of one object with the fields and includes of the request (ValueError
+    on unknown ones). Only the default representation goes through the response cache"""
+    names = serializer.select(default)
+    tree = get_includes(kind)
+    found = resolve_included(kind, [obj], tree) if tree else None
+    if found is not None:
+        # (Included objects change without the object itself changing)
+        headers = {**headers, **conditional_headers((headers['ETag'], names, included_versions(found)))}
+    elif names != default:
+        # (Each field selection is its own representation, with its own ETag)
+        headers = {**headers, **conditional_headers((headers['ETag'], names))}
+    cached = not_modified(headers)
+    if cached:
+        return cached
+    serialize = serializer.compile(names)
+    if found is not None:
+        return compound_document(kind, [obj], serialize(obj), found), 200, headers
+    if names == default:
+        return cached_response(kind, obj.id, headers, lambda: serialize(obj))
+    return serialize(obj), 200, headers
+
+
+def timestamps():
+    return {
+        'created_at': lambda obj: obj.created_at.isoformat(),
+        'updated_at': lambda obj: obj.updated_at.isoformat()
+    }
+
+
+user_serializer = Serializer({
+    'id': attrgetter('id'),
+    'first_name': attrgetter('first_name'),
+    'last_name': attrgetter('last_name'),
+    'email': attrgetter('email'),
+    'rating': lambda user: user.rating_stats.to_dict(),
+    'average_rating': attrgetter('rating_stats.average'),
+    'review_count': attrgetter('rating_stats.count'),
+    **timestamps()
+})
+USER_DETAIL = ('id', 'first_name', 'last_name', 'email', 'rating')
+USER_SUMMARY = ('id', 'first_name', 'last_name', 'email', 'average_rating', 'review_count')
+
+amenity_serializer = Serializer({
+    'id': attrgetter('id'),
+    'name': attrgetter('name'),
+    **timestamps()
+})
+AMENITY_SUMMARY = ('id', 'name')
+
+place_serializer = Serializer({
+    'id': attrgetter('id'),
+    'title': attrgetter('title'),
+    'description': attrgetter('description'),
+    'price': attrgetter('price'),
+    'latitude': attrgetter('latitude'),
+    'longitude': attrgetter('longitude'),
+    'owner_id': attrgetter('owner.id'),
+    'owner': lambda place: {
+        "id": place.owner.id,
+        "first_name": place.owner.first_name,
+        "last_name": place.owner.last_name,
+        "email": place.owner.email
+    },
+    'amenities': lambda place: [{"id": amenity.id, "name": amenity.name} for amenity in place.amenities],
+    'rating': lambda place: place.rating_stats.to_dict(),
+    'average_rating': attrgetter('rating_stats.average'),
+    'review_count': attrgetter('rating_stats.count'),
+    **timestamps()
+})
+PLACE_DETAIL = ('id', 'title', 'description', 'latitude', 'longitude', 'owner', 'amenities', 'rating')
+PLACE_SUMMARY = ('id', 'title', 'latitude', 'longitude', 'average_rating', 'review_count')
+PLACE_TOP = ('id', 'title', 'price', 'latitude', 'longitude', 'average_rating', 'review_count')
+PLACE_INCLUDED = ('id', 'title', 'price', 'latitude', 'longitude', 'owner_id', 'average_rating', 'review_count')
+
+review_serializer = Serializer({
+    'id': attrgetter('id'),
+    'text': attrgetter('text'),
+    'rating': attrgetter('rating'),
+    'user_id': attrgetter('user.id'),
+    'place_id': attrgetter('place.id'),
+    **timestamps()
+})
+REVIEW_DETAIL = ('id', 'text', 'rating', 'user_id', 'place_id')
+REVIEW_SUMMARY = ('id', 'text', 'rating')
+USER_REVIEW_SUMMARY = ('id', 'text', 'rating', 'place_id')
+
+# kind -> relation -> (kind of the related objects, function returning the related objects of an object)
+RELATIONS = {
+    'places': {
+        'owner': ('users', lambda place: (place.owner,)),
+        'amenities': ('amenities', lambda place: place.amenities),
+        'reviews': ('reviews', lambda place: place.reviews),
+    },
+    'reviews': {
+        'user': ('users', lambda review: (review.user,)),
+        'place': ('places', lambda review: (review.place,)),
+    },
+    'users': {
+        'places': ('places', lambda user: user.places),
+        'reviews': ('reviews', lambda user: user.reviews),
+    },
+}
+# kind -> (serializer, fields) of its objects in the included section (with the ids linking them back)
+INCLUDED = {
+    'users': (user_serializer, USER_SUMMARY),
+    'amenities': (amenity_serializer, AMENITY_SUMMARY),
+    'places': (place_serializer, PLACE_INCLUDED),
+    'reviews': (review_serializer, REVIEW_DETAIL),
+}
+MAX_INCLUDE_DEPTH = 3
+
+
+def get_includes(kind):
+    """Tree ({relation: {relation of the related objects: ...}}) of the request's ?include= paths
+    (e.g. reviews.user) from objects of a kind, empty without it"""
+    value = request.args.get('include')
+    tree = {}
+    if value is None:
+        return tree
+    for path in filter(None, (path.strip() for path in value.split(','))):
+        names = path.split('.')
+        if len(names) > MAX_INCLUDE_DEPTH:
+            raise ValueError(f"include paths follow at most {MAX_INCLUDE_DEPTH} relations !")
+        node, node_kind = tree, kind
+        for name in names:
+            relations = RELATIONS.get(node_kind, {})
+            if name not in relations:
+                raise ValueError(f"Unknown include: {path} ! ({node_kind} relations: {', '.join(relations) or 'none'})")
+            node_kind = relations[name][0]
+            node = node.setdefault(name, {})
+    if not tree:
+        raise ValueError('include must name at least one relation !')
+    return tree
+
+
+def include_kinds(kind, tree):
+    """Kinds of the objects an include tree reaches, sorted (their versions join the list ETags)"""
+    kinds = set()
+    for name, subtree in tree.items():
+        related_kind = RELATIONS[kind][name][0]
+        kinds.add(related_kind)
+        kinds.update(include_kinds(related_kind, subtree))
+    return tuple(sorted(kinds))
+
+
+def resolve_included(kind, objects, tree, found=None):
+    """Objects an include tree reaches from `objects`, as {kind: {id: object}}: each relation is
+    followed in one pass over all the objects of its level, and each related object kept once"""
+    if found is None:
+        found = {}
+    for name, subtree in tree.items():
+        related_kind, related = RELATIONS[kind][name]
+        level = {}
+        for obj in objects:
+            for other in related(obj):
+                level[other.id] = other
+        found.setdefault(related_kind, {}).update(level)
+        if subtree:
+            resolve_included(related_kind, level.values(), subtree, found)
+    return found
+
+
+def included_versions(found):
+    """ETag parts of resolved included objects: they change when any of them does"""
+    return sorted((kind, obj.id, obj.updated_at, *((obj.rating_stats.count, obj.rating_stats.total)
+                                                  if hasattr(obj, 'rating_stats') else ()))
+                  for kind, objects in found.items() for obj in objects.values())
+
+
+def compound_document(kind, objects, data, found):
+    """{"data", "included"} body of `data` (built from `objects`) and the resolved included objects,
+    without repeating the primary objects"""
+    primary_ids = {obj.id for obj in objects}
+    included = {}
+    for related_kind, related in found.items():
+        serializer, names = INCLUDED[related_kind]
+        serialize = serializer.compile(names)
+        included[related_kind] = [serialize(obj) for obj in related.values()
+                                  if related_kind != kind or obj.id not in primary_ids]
+    return {"data": data, "included": included}
+
+
+def list_body(kind, objects, data, tree):
+    """A list response body: `data`, or its compound document when the request has includes"""
+    if not tree:
+        return data
+    return compound_document(kind, objects, data, resolve_included(kind, objects, tree))
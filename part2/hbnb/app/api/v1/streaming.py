@@ -0,0 +1,73 @@
+import json
+from itertools import islice
+from flask import Response, request, stream_with_context
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+NDJSON = 'application/x-ndjson'
+STREAM_CHUNK_SIZE = 500  # serialized records per written chunk
+# format -> (opening, separator, closing, mimetype)
+STREAM_FORMATS = {
+    'ndjson': ('', '\n', '\n', NDJSON),
+    'json': ('[', ',', ']', 'application/json')
+}
+
+
+def parse_stream_format(stream, accept):
+    """'ndjson' or 'json' for the ?stream= value and Accept header of a request asking
+    for a streamed response, None otherwise.
+
+    ?stream=1 (or an Accept header preferring application/x-ndjson) streams one
+    JSON object per line, ?stream=json streams a regular JSON array.
+    """
+    if stream == 'json':
+        return 'json'
+    if stream in ('1', 'true', 'ndjson'):
+        return 'ndjson'
+    if accept and parse_accept_header(accept, MIMEAccept).best_match(['application/json', NDJSON]) == NDJSON:
+        return 'ndjson'
+    return None
+
+
+def stream_format():
+    """Streaming format requested by the current request, see parse_stream_format()"""
+    return parse_stream_format(request.args.get('stream'), request.headers.get('Accept'))
+
+
+class StreamEncoder:
+    """Turns batches of items into the successive text chunks of a streamed body"""
+
+    def __init__(self, serialize, stream_format='ndjson'):
+        self._serialize = serialize
+        self._encode = json.JSONEncoder(separators=(',', ':')).encode
+        self._start, self._separator, self._end, self.mimetype = STREAM_FORMATS[stream_format]
+        self._empty = True
+
+    def encode(self, batch):
+        if not batch:
+            return ''
+        prefix = self._start if self._empty else self._separator
+        self._empty = False
+        return prefix + self._separator.join(self._encode(self._serialize(item)) for item in batch)
+
+    def finish(self):
+        if self._empty:
+            # (An empty NDJSON body has no line at all)
+            return self._start + self._end if self._start else ''
+        return self._end
+
+
+def stream_response(items, serialize, stream_format='ndjson', headers=None):
+    """Chunked response serializing the items lazily, so a whole collection is never held as a string"""
+    encoder = StreamEncoder(serialize, stream_format)
+
+    def generate():
+        iterator = iter(items)
+        while True:
+            batch = list(islice(iterator, STREAM_CHUNK_SIZE))
+            if not batch:
+                break
+            yield encoder.encode(batch)
+        yield encoder.finish()
+
+    return Response(stream_with_context(generate()), mimetype=encoder.mimetype, headers=headers)
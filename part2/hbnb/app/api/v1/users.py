@@ -1,5 +1,12 @@
 from flask_restx import Namespace, Resource, fields
 from app.services import facade
+from app.api.v1.conditional import collection_headers, conditional_headers, not_modified
+from app.api.v1.batch import batch_response, get_batch_items
+from app.api.v1.lookup import get_ids_arg, get_lookup_ids, lookup_model
+from app.api.v1.pagination import get_page_args, page_headers, paginate_list
+from app.api.v1.serializers import (USER_DETAIL, USER_SUMMARY, detail_response, get_includes, include_kinds,
+                                    list_body, user_serializer)
+from app.api.v1.streaming import stream_format, stream_response
 
 api = Namespace('users', description='User operations')
 
@@ -10,6 +17,16 @@ user_model = api.model('User', {
     'email': fields.String(required=True, description='Email of the user')
 })
 
+
+def user_headers(user):
+    """Validators of a user's detail response, from stored state only (a rating change stamps the user)"""
+    stats = user.rating_stats
+    return conditional_headers((user.id, user.updated_at, stats.count, stats.total, stats.histogram),
+                               user.updated_at)
+
+
+user_summary = user_serializer.compile(USER_SUMMARY)
+
 @api.route('/')
 class UserList(Resource):
     @api.expect(user_model, validate=True)
@@ -32,33 +49,92 @@ class UserList(Resource):
         return {'id': new_user.id, 'first_name': new_user.first_name, 'last_name': new_user.last_name, 'email': new_user.email}, 201
 
 
+    @api.param('limit', 'Maximum number of users to return')
+    @api.param('cursor', 'Cursor of the page to fetch, from the X-Next-Cursor header')
+    @api.param('ids', "Only the objects of these comma separated ID's (at most 100), in their order")
+    @api.param('stream', 'Stream the whole collection: 1 for NDJSON lines, json for a JSON array')
+    @api.param('fields', 'Comma separated fields to return instead of the default ones')
+    @api.param('include', 'Related objects to side-load: places, reviews (and their relations, e.g. reviews.place)')
     @api.response(200, 'List of users retrieved successfully')
+    @api.response(400, 'Invalid pagination parameters')
     def get(self):
         """Get all users"""
-        users = facade.get_all_users()
-        users_response = []
+        try:
+            includes = get_includes('users')
+        except ValueError as err:
+            return {'error': str(err)}, 400
+        headers = collection_headers('users', 'reviews', *include_kinds('users', includes))
+        cached = not_modified(headers)
+        if cached:
+            return cached
+        try:
+            serialize = user_serializer.compile(user_serializer.select(USER_SUMMARY))
+            ids = get_ids_arg()
+            streaming = stream_format()
+            if streaming and includes:
+                raise ValueError('include cannot be combined with stream !')
+            if streaming:
+                users = facade.iter_users() if ids is None else facade.get_many('users', ids)
+                return stream_response(users, serialize, streaming, headers)
+            limit, cursor = get_page_args()
+            if ids is None:
+                users, next_cursor = facade.get_users_page(limit, cursor)
+            else:
+                ids, next_cursor = paginate_list(ids, limit, cursor)
+                users = facade.get_many('users', ids)
+        except ValueError as err:
+            return {'error': str(err)}, 400
+        users_response = list_body('users', users, [serialize(user) for user in users], includes)
 
-        for user in users:
-            users_response.append({
-                "id": user.id,
-                "first_name": user.first_name,
-                "last_name": user.last_name,
-                "email": user.email,
-            })
+        return users_response, 200, {**headers, **page_headers(next_cursor)}
 
-        return users_response, 200
 
+@api.route('/batch')
+class UserBatch(Resource):
+    @api.expect([user_model])
+    @api.response(201, 'Users created, invalid items are reported by index')
+    @api.response(400, 'No valid user in the batch')
+    def post(self):
+        """Register many users at once from a JSON array or NDJSON lines"""
+        try:
+            created, errors = facade.bulk_create_users(get_batch_items())
+        except ValueError as err:
+            return {'error': str(err)}, 400
+        return batch_response(created, errors)
+
+@api.route('/lookup')
+class UserLookup(Resource):
+    @api.expect(lookup_model(api), validate=True)
+    @api.param('fields', 'Comma separated fields to return instead of the default ones')
+    @api.param('include', 'Related objects to side-load: places, reviews (and their relations, e.g. reviews.place)')
+    @api.response(200, 'Users found, in the order of the ids (unknown ids are skipped)')
+    @api.response(400, 'Invalid ids, fields or includes')
+    def post(self):
+        """Retrieve many users by ID at once"""
+        try:
+            serialize = user_serializer.compile(user_serializer.select(USER_SUMMARY))
+            includes = get_includes('users')
+            users = facade.get_many('users', get_lookup_ids())
+        except ValueError as err:
+            return {'error': str(err)}, 400
+        return list_body('users', users, [serialize(user) for user in users], includes), 200
 
 @api.route('/<user_id>')
 class UserResource(Resource):
+    @api.param('fields', 'Comma separated fields to return instead of the default ones')
+    @api.param('include', 'Related objects to side-load: places, reviews (and their relations, e.g. reviews.place)')
     @api.response(200, 'User details retrieved successfully')
+    @api.response(304, 'User not modified since the ETag or date sent')
     @api.response(404, 'User not found')
     def get(self, user_id):
         """Get user details by ID"""
         user = facade.get_user(user_id)
         if not user:
             return {'error': 'User not found'}, 404
-        return {'id': user.id, 'first_name': user.first_name, 'last_name': user.last_name, 'email': user.email}, 200
+        try:
+            return detail_response('users', user, user_headers(user), user_serializer, USER_DETAIL)
+        except ValueError as err:
+            return {'error': str(err)}, 400
 
 
     @api.expect(user_model)
@@ -78,3 +154,18 @@ class UserResource(Resource):
             return {'error': str(err)}, 400
 
         return {'id': existing_user.id, 'first_name': existing_user.first_name, 'last_name': existing_user.last_name, 'email': existing_user.email}, 200
+
+    @api.response(200, 'User deleted successfully')
+    @api.response(404, 'User not found')
+    @api.response(400, 'A delete rule forbids it while the user has dependent objects')
+    def delete(self, user_id):
+        """Delete a user"""
+        if not facade.get_user(user_id):
+            return {'error': 'User not found'}, 404
+
+        try:
+            facade.delete_user(user_id)
+        except ValueError as err:
+            return {'error': str(err)}, 400
+
+        return {"message": "User deleted successfully"}, 200
@@ -0,0 +1,241 @@
+"""ASGI front of the Flask app, to hold many slow or long-lived connections per process.
+
+Requests run the Flask app on a thread pool and the event loop writes the
+responses, so a thread is free again as soon as its response is produced and
+slow readers only cost a socket. Requests streaming a whole collection
+(?stream=, Accept: application/x-ndjson, see app.api.v1.streaming) are served
+natively: pages come from AsyncHBnBFacade and are written as the client reads
+them, without holding any thread.
+
+Only the standard library is needed here; serve it with any ASGI server
+(e.g. `uvicorn asgi:app`).
+"""
+import asyncio
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+from urllib.parse import parse_qs
+from app.api.v1.amenities import amenity_summary
+from app.api.v1.conditional import collection_etag
+from app.api.v1.places import place_summary
+from app.api.v1.reviews import review_summary
+from app.api.v1.streaming import StreamEncoder, parse_stream_format
+from app.api.v1.users import user_summary
+from app.services import facade as default_facade
+from app.services.async_facade import AsyncHBnBFacade
+
+MAX_THREADS = 64
+SPOOL_SIZE = 65536  # (Request bodies above this size are spooled to a temporary file)
+BUFFERED_CHUNKS = 16  # response chunks a thread may queue ahead of the client
+
+# path -> (collection, list item serializer, repositories its ETag depends on)
+STREAMED_COLLECTIONS = {
+    '/api/v1/users/': ('users', user_summary, ('users', 'reviews')),
+    '/api/v1/amenities/': ('amenities', amenity_summary, ('amenities',)),
+    '/api/v1/places/': ('places', lambda place: place_summary((None, place)), ('places', 'reviews', 'amenities')),
+    '/api/v1/reviews/': ('reviews', review_summary, ('reviews',)),
+}
+# (Place searches are computed by the Flask handler)
+PLACE_SEARCH_ARGS = ('bbox', 'near', 'min_price', 'max_price', 'amenities')
+
+_DONE = object()
+
+
+class _Disconnected(Exception):
+    pass
+
+
+def wsgi_environ(scope, body):
+    """WSGI environ of an ASGI http scope (PEP 3333 strings are latin-1 decoded bytes)"""
+    script_name = scope.get('root_path', '')
+    path_info = scope['path']
+    if script_name and path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': script_name.encode().decode('latin-1'),
+        'PATH_INFO': path_info.encode().decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.input_terminated': True,  # (The whole body was read, even without a Content-Length)
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name, value = name.decode('latin-1'), value.decode('latin-1')
+        if name == 'content-type':
+            key = 'CONTENT_TYPE'
+        elif name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+def _response_start(status, headers):
+    return {
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+    }
+
+
+class HBnBASGI:
+    """ASGI application serving a Flask app (and its facade's collections natively)"""
+
+    def __init__(self, wsgi_app, facade=None, max_threads=MAX_THREADS):
+        self.wsgi_app = wsgi_app
+        self._facade = facade or default_facade
+        self._executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix='hbnb-asgi')
+        self.facade = AsyncHBnBFacade(self._facade, executor=self._executor)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            route = self._streamed_collection(scope)
+            if route is not None:
+                await self._stream_collection(scope, send, *route)
+            else:
+                await self._call_wsgi(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._facade.close()
+
+    # native collection streams
+
+    def _streamed_collection(self, scope):
+        """(collection, serializer, ETag repositories, format) of a streamed collection GET, None otherwise"""
+        route = STREAMED_COLLECTIONS.get(scope['path'])
+        if route is None or scope['method'] != 'GET':
+            return None
+        headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in scope['headers']}
+        if 'if-none-match' in headers or 'if-modified-since' in headers:
+            return None  # (Conditional requests are answered by the Flask handler)
+        args = parse_qs(scope['query_string'].decode('latin-1'))
+        if route[0] == 'places' and any(arg in args for arg in PLACE_SEARCH_ARGS):
+            return None
+        if any(arg in args for arg in ('fields', 'include', 'ids')):
+            return None  # (Field selections, includes and id lists are handled by the Flask handler)
+        stream_format = parse_stream_format(args.get('stream', [None])[0], headers.get('accept'))
+        if stream_format is None:
+            return None
+        return route + (stream_format, headers.get('accept'))
+
+    async def _stream_collection(self, scope, send, kind, serialize, version_kinds, stream_format, accept):
+        full_path = f"{scope['path']}?{scope['query_string'].decode('latin-1')}"
+        await self.facade.sync()
+        versions = await self.facade.get_versions(*version_kinds)
+        encoder = StreamEncoder(serialize, stream_format)
+        headers = collection_etag(versions, full_path, accept)
+        headers['Content-Type'] = encoder.mimetype
+        await send(_response_start(200, headers.items()))
+        async for page in self.facade.iter_pages(kind):
+            chunk = encoder.encode(page)
+            if chunk:
+                await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+        await send({'type': 'http.response.body', 'body': encoder.finish().encode(), 'more_body': False})
+
+    # everything else goes through Flask
+
+    async def _call_wsgi(self, scope, receive, send):
+        body = SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return
+            body.write(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        body.seek(0)
+
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue(maxsize=BUFFERED_CHUNKS)
+        disconnected = threading.Event()
+        environ = wsgi_environ(scope, body)
+        worker = loop.run_in_executor(self._executor, self._run_wsgi, environ, loop, chunks, disconnected)
+
+        started = False
+        try:
+            while True:
+                message = await chunks.get()
+                if message is _DONE:
+                    break
+                started = True
+                await send(message)
+            await worker
+        except Exception:
+            if started:
+                raise
+            await send(_response_start(500, [('Content-Type', 'text/plain')]))
+            await send({'type': 'http.response.body', 'body': b'Internal Server Error'})
+            return
+        finally:
+            if not worker.done():
+                # The client went away: stop the app's iterator and let the thread finish
+                disconnected.set()
+                while await chunks.get() is not _DONE:
+                    pass
+            body.close()
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+    def _run_wsgi(self, environ, loop, chunks, disconnected):
+        """Run the WSGI app on a worker thread, queueing its ASGI messages for the event loop"""
+        response = {}
+
+        def put(message):
+            if disconnected.is_set():
+                raise _Disconnected()
+            asyncio.run_coroutine_threadsafe(chunks.put(message), loop).result()
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response.get('sent'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['start'] = _response_start(int(status.split(' ', 1)[0]), headers)
+            return write
+
+        def write(data):
+            if not response.get('sent'):
+                response['sent'] = True
+                put(response['start'])
+            if data:
+                put({'type': 'http.response.body', 'body': data, 'more_body': True})
+
+        try:
+            result = self.wsgi_app(environ, start_response)
+            try:
+                for data in result:
+                    write(data)
+                write(b'')
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+        except _Disconnected:
+            pass
+        finally:
+            asyncio.run_coroutine_threadsafe(chunks.put(_DONE), loop).result()
@@ -0,0 +1,176 @@
+"""Request and method timings, exposed at /metrics in the Prometheus text format.
+
+Disabled unless the METRICS_ENABLED setting is true: nothing is wrapped and
+no route or hook is registered then, so it costs nothing. Once enabled,
+every public method of the facade and of the repository classes is timed
+(per class and method) along with every request (per route, method and
+status). The counters live in the process; with several worker processes
+each one exposes its own.
+"""
+import functools
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, g, request
+
+# Upper bounds of the latency buckets, in seconds (repository calls take microseconds)
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    """Latency histograms of one metric, keyed by their label values"""
+    __slots__ = ('name', 'help', 'label_names', '_series', '_lock')
+
+    def __init__(self, name, help, label_names):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self._series = {}  # label values -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, seconds):
+        bucket = bisect_left(BUCKETS, seconds)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(BUCKETS) + 1), 0.0, 0]
+            series[0][bucket] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((labels, [list(counts), total, count])
+                            for labels, (counts, total, count) in self._series.items())
+        for labels, (counts, total, count) in series:
+            label_text = format_labels(self.label_names, labels)
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS + ('+Inf',), counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {total!r}')
+            lines.append(f'{self.name}_count{{{label_text}}} {count}')
+        return lines
+
+
+class Counter:
+    """Monotonic counters of one metric, keyed by their label values"""
+    __slots__ = ('name', 'help', 'label_names', '_values', '_lock')
+
+    def __init__(self, name, help, label_names):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        lines.extend(f'{self.name}{{{format_labels(self.label_names, labels)}}} {value}' for labels, value in values)
+        return lines
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(names, values):
+    return ','.join(f'{name}="{escape_label(value)}"' for name, value in zip(names, values))
+
+
+class Metrics:
+    """Registry of the app's metrics, and the hooks feeding it"""
+
+    def __init__(self):
+        self.requests = Histogram('hbnb_http_request_duration_seconds', 'Time spent handling HTTP requests.',
+                                  ('method', 'route', 'status'))
+        self.calls = Histogram('hbnb_method_duration_seconds', 'Time spent in facade and repository methods.',
+                               ('class', 'method'))
+        self.errors = Counter('hbnb_method_errors_total', 'Facade and repository calls that raised.',
+                              ('class', 'method', 'exception'))
+        self._instrumented = {}  # (class, method name) -> original function
+        self._facade = None
+
+    def init_app(self, app, facade, classes=()):
+        """Time the app's requests and the methods of `classes`, serve the metrics at /metrics"""
+        self._facade = facade
+        self.instrument(*classes)
+        app.before_request(self._start_request)
+        app.after_request(self._end_request)
+        app.add_url_rule('/metrics', 'metrics', self.view)
+
+    # requests
+
+    def _start_request(self):
+        g.metrics_start = time.perf_counter()
+
+    def _end_request(self, response):
+        start = g.pop('metrics_start', None)
+        if start is not None:
+            # (The route template, not the path, keeps one series per endpoint)
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            self.requests.observe((request.method, route, str(response.status_code)), time.perf_counter() - start)
+        return response
+
+    # facade and repository methods
+
+    def instrument(self, *classes):
+        """Wrap the public methods each class defines with timers"""
+        for cls in classes:
+            for name, func in list(vars(cls).items()):
+                if name.startswith('_') or not callable(func) or isinstance(func, (staticmethod, classmethod, type)):
+                    continue
+                if (cls, name) in self._instrumented:
+                    continue
+                self._instrumented[(cls, name)] = func
+                setattr(cls, name, self._timed(cls.__name__, name, func))
+
+    def uninstrument(self):
+        """Put the original methods back"""
+        for (cls, name), func in self._instrumented.items():
+            setattr(cls, name, func)
+        self._instrumented.clear()
+
+    def _timed(self, class_name, method_name, func):
+        labels = (class_name, method_name)
+        calls, errors = self.calls, self.errors
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception as err:
+                errors.inc(labels + (type(err).__name__,))
+                raise
+            finally:
+                calls.observe(labels, time.perf_counter() - start)
+        return timed
+
+    # exposition
+
+    def render(self):
+        lines = self.requests.render() + self.calls.render() + self.errors.render()
+        if self._facade is not None:
+            stats = self._facade.response_cache.stats()
+            for name in ('hits', 'misses', 'evictions', 'invalidations'):
+                lines.append(f'# TYPE hbnb_response_cache_{name}_total counter')
+                lines.append(f'hbnb_response_cache_{name}_total {stats[name]}')
+            lines.append('# TYPE hbnb_response_cache_entries gauge')
+            lines.append(f'hbnb_response_cache_entries {stats["size"]}')
+        return '\n'.join(lines) + '\n'
+
+    def view(self):
+        return Response(self.render(), content_type=CONTENT_TYPE)
+
+
+metrics = Metrics()
@@ -2,6 +2,7 @@ from .base import BaseModel
 
 
 class Amenity(BaseModel):
+    __slots__ = ('_name',)
 
     def __init__(self, name):
         if name is None:
@@ -1,20 +1,46 @@
+import time
 import uuid
 from datetime import datetime
 
 
 class BaseModel:
+    # (Slots instead of a per-instance __dict__; timestamps are kept as epoch floats
+    # and only turned into datetime objects when they are read)
+    __slots__ = ('id', '_created_at', '_updated_at')
+    # (Attributes maintained by the application, which update() leaves alone)
+    READ_ONLY = frozenset(('id', 'created_at', 'updated_at'))
+
     def __init__(self):
         self.id = str(uuid.uuid4())
-        self.created_at = datetime.now()
-        self.updated_at = datetime.now()
+        self._created_at = self._updated_at = time.time()
+
+    @property
+    def created_at(self):
+        return datetime.fromtimestamp(self._created_at)
+
+    @created_at.setter
+    def created_at(self, value):
+        if not isinstance(value, datetime):
+            raise ValueError("created_at must be a datetime !")
+        self._created_at = value.timestamp()
+
+    @property
+    def updated_at(self):
+        return datetime.fromtimestamp(self._updated_at)
+
+    @updated_at.setter
+    def updated_at(self, value):
+        if not isinstance(value, datetime):
+            raise ValueError("updated_at must be a datetime !")
+        self._updated_at = value.timestamp()
 
     def save(self):
         """Update the updated_at timestamp whenever the object is modified"""
-        self.updated_at = datetime.now()
+        self._updated_at = time.time()
 
     def update(self, data):
         """Update the attributes of the object based on the provided dictionary"""
         for key, value in data.items():
-            if hasattr(self, key):
+            if key not in self.READ_ONLY and hasattr(self, key):
                 setattr(self, key, value)
         self.save()  # Update the updated_at timestamp
@@ -1,8 +1,12 @@
 from .base import BaseModel
+from .rating_stats import RatingStats
 from .user import User
 
 
 class Place(BaseModel):
+    __slots__ = ('_title', '_description', '_price', '_latitude', '_longitude', '_owner',
+                 '_reviews', '_amenities', '_rating_stats')
+    READ_ONLY = BaseModel.READ_ONLY | {'reviews', 'rating_stats'}
 
     def __init__(self, title, description, price, latitude, longitude, owner, amenities):
         if title is None or price is None or latitude is None \
@@ -15,8 +19,13 @@ class Place(BaseModel):
         self.latitude = latitude
         self.longitude = longitude
         self.owner = owner
-        self.reviews = []  # List to store related reviews
+        self.reviews = []  # Related reviews
         self.amenities = amenities  # List to store related amenities
+        self._rating_stats = RatingStats()  # Aggregates of the reviews' ratings (maintained by the facade)
+
+    @property
+    def rating_stats(self):
+        return self._rating_stats
 
     @property
     def title(self):
@@ -90,13 +99,34 @@ class Place(BaseModel):
             raise ValueError("Owner must be a User instance !")
         self._owner = value
 
+    @property
+    def amenities(self):
+        return list(self._amenities.values())
+
+    @amenities.setter
+    def amenities(self, value):
+        # (The existance of the amenities is validated in the facade)
+        self._amenities = {amenity.id: amenity for amenity in value}  # (Ordered like the list it came from)
+
+    @property
+    def reviews(self):
+        return list(self._reviews.values())
+
+    @reviews.setter
+    def reviews(self, value):
+        # (Kept by id, so a deleted review is unlinked without a scan)
+        self._reviews = {review.id: review for review in value}
+
     def add_review(self, review):
         """Add a review to the place."""
         # (The existance of the review is validated in the facade)
-        self.reviews.append(review)
+        self._reviews[review.id] = review
+
+    def remove_review(self, review):
+        """Remove a review from the place."""
+        self._reviews.pop(review.id, None)
 
     def add_amenity(self, amenity):
         """Add an amenity to the place."""
         # (The existance of the amenity is validated in the facade)
-        if amenity not in self.amenities:
-            self.amenities.append(amenity)
+        self._amenities.setdefault(amenity.id, amenity)
@@ -0,0 +1,42 @@
+import time
+from datetime import datetime
+
+
+class RatingStats:
+    """Running aggregates (count, sum, 1-5 histogram) of review ratings"""
+    __slots__ = ('count', 'total', 'histogram', '_updated_at')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.histogram = [0] * 5  # (Index 0 counts the 1 star ratings)
+        self._updated_at = None  # (Epoch time of the last change, None while there is no review)
+
+    def add(self, rating):
+        self.count += 1
+        self.total += rating
+        self.histogram[rating - 1] += 1
+        self._updated_at = time.time()
+
+    def remove(self, rating):
+        self.count -= 1
+        self.total -= rating
+        self.histogram[rating - 1] -= 1
+        self._updated_at = time.time()
+
+    @property
+    def updated_at(self):
+        return None if self._updated_at is None else datetime.fromtimestamp(self._updated_at)
+
+    @property
+    def average(self):
+        if self.count == 0:
+            return None
+        return self.total / self.count
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "average": self.average,
+            "histogram": {str(rating): self.histogram[rating - 1] for rating in range(1, 6)}
+        }
@@ -3,6 +3,7 @@ from .place import Place
 from .user import User
 
 class Review(BaseModel):
+    __slots__ = ('_text', '_rating', '_place', '_user')
 
     def __init__(self, text, rating, place, user):
         if text is None or rating is None or place is None or user is None:
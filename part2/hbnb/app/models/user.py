@@ -1,8 +1,11 @@
 from .base import BaseModel
+from .rating_stats import RatingStats
 import re
 
 
 class User(BaseModel):
+    __slots__ = ('_first_name', '_last_name', '_email', 'is_admin', '_places', '_reviews', '_rating_stats')
+    READ_ONLY = BaseModel.READ_ONLY | {'places', 'reviews', 'rating_stats'}
 
     def __init__(self, first_name, last_name, email, is_admin=False):
         """Initialization"""
@@ -13,9 +16,14 @@ class User(BaseModel):
         self.last_name = last_name
         self.email = email
         self.is_admin = is_admin
-        self.places = []  # List to store related places
-        self.reviews = [] # List of reviews written by the user
+        self.places = []  # Places owned by the user
+        self.reviews = [] # Reviews written by the user
+        self._rating_stats = RatingStats()  # Aggregates of the ratings given (maintained by the facade)
     
+    @property
+    def rating_stats(self):
+        return self._rating_stats
+
     @property
     def first_name(self):
         return self._first_name
@@ -58,12 +66,38 @@ class User(BaseModel):
             raise ValueError("Incorrect email format")
         self._email = value
     
+    # (Related objects are kept by id, so a deleted one is unlinked without a scan)
+
+    @property
+    def places(self):
+        return list(self._places.values())
+
+    @places.setter
+    def places(self, value):
+        self._places = {place.id: place for place in value}
+
+    @property
+    def reviews(self):
+        return list(self._reviews.values())
+
+    @reviews.setter
+    def reviews(self, value):
+        self._reviews = {review.id: review for review in value}
+
     def add_place(self, place):
         """Add a new place to the user"""
         # (The existance of the place is validated in the facade)
-        self.places.append(place)
+        self._places[place.id] = place
+
+    def remove_place(self, place):
+        """Remove a place from the user"""
+        self._places.pop(place.id, None)
 
     def add_review(self, review):
         """Add a new review to the user"""
         # (The existance of the review is validated in the facade)
-        self.reviews.append(review)
+        self._reviews[review.id] = review
+
+    def remove_review(self, review):
+        """Remove a review from the user"""
+        self._reviews.pop(review.id, None)
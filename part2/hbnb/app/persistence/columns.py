@@ -0,0 +1,124 @@
+import threading
+from importlib.util import find_spec
+
+from app.persistence.spatial import EARTH_RADIUS_KM
+
+# (NumPy is optional, the facade falls back to walking the objects; it is imported
+# by the first column store since it is slow to import)
+np = None
+
+
+class PlaceColumnStore:
+    """NumPy columns of place scalars (price, coordinates, average rating) for vectorized scans"""
+
+    available = find_spec('numpy') is not None
+
+    def __init__(self, capacity=1024):
+        global np
+        if not self.available:
+            raise RuntimeError("PlaceColumnStore requires numpy")
+        if np is None:
+            import numpy as np
+        # (Rows move on removal, so scans hold the lock too; they are short vectorized passes)
+        self._lock = threading.Lock()
+        self._size = 0
+        self._rows = {}  # obj_id -> row
+        self._objects = []  # row -> obj
+        self.price = np.empty(capacity)
+        self.latitude = np.empty(capacity)
+        self.longitude = np.empty(capacity)
+        self.rating = np.empty(capacity)  # (NaN while the place has no review)
+
+    def __len__(self):
+        return self._size
+
+    def add(self, place):
+        with self._lock:
+            self._add(place)
+
+    def _add(self, place):
+        row = self._rows.get(place.id)
+        if row is None:
+            if self._size == len(self.price):
+                self._grow()
+            row = self._size
+            self._rows[place.id] = row
+            self._objects.append(place)
+            self._size += 1
+        self.price[row] = place.price
+        self.latitude[row] = place.latitude
+        self.longitude[row] = place.longitude
+        self.rating[row] = self._average_rating(place)
+
+    def remove(self, place):
+        with self._lock:
+            self._remove(place)
+
+    def _remove(self, place):
+        row = self._rows.pop(place.id, None)
+        if row is None:
+            return
+        # Move the last row into the hole so the columns stay dense
+        last = self._size - 1
+        if row != last:
+            moved = self._objects[last]
+            self._objects[row] = moved
+            self._rows[moved.id] = row
+            for column in (self.price, self.latitude, self.longitude, self.rating):
+                column[row] = column[last]
+        self._objects.pop()
+        self._size -= 1
+
+    def filter(self, min_price=None, max_price=None, min_rating=None,
+               latitude=None, longitude=None, radius_km=None):
+        """Return (distance_km, place) pairs matching every given bound.
+
+        Results are ordered by distance when a point is given, by price otherwise
+        (distance_km is None in that case).
+        """
+        with self._lock:
+            return self._filter(min_price, max_price, min_rating, latitude, longitude, radius_km)
+
+    def _filter(self, min_price, max_price, min_rating, latitude, longitude, radius_km):
+        size = self._size
+        price = self.price[:size]
+        mask = np.ones(size, dtype=bool)
+        if min_price is not None:
+            mask &= price >= min_price
+        if max_price is not None:
+            mask &= price <= max_price
+        if min_rating is not None:
+            mask &= self.rating[:size] >= min_rating  # (NaN compares as False)
+
+        rows = np.flatnonzero(mask)
+        if latitude is None:
+            rows = rows[np.argsort(price[rows], kind='stable')]
+            return [(None, self._objects[row]) for row in rows.tolist()]
+
+        distances = self.distances_km(latitude, longitude, rows)
+        if radius_km is not None:
+            keep = distances <= radius_km
+            rows, distances = rows[keep], distances[keep]
+        order = np.argsort(distances, kind='stable')
+        return [(distance, self._objects[row])
+                for distance, row in zip(distances[order].tolist(), rows[order].tolist())]
+
+    def distances_km(self, latitude, longitude, rows):
+        """Vectorized haversine distance from the point to the given rows"""
+        lat1, lon1 = np.radians(latitude), np.radians(longitude)
+        lat2 = np.radians(self.latitude[rows])
+        lon2 = np.radians(self.longitude[rows])
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+    def _grow(self):
+        capacity = len(self.price) * 2
+        for name in ('price', 'latitude', 'longitude', 'rating'):
+            column = np.empty(capacity)
+            column[:self._size] = getattr(self, name)[:self._size]
+            setattr(self, name, column)
+
+    @staticmethod
+    def _average_rating(place):
+        average = place.rating_stats.average
+        return np.nan if average is None else average
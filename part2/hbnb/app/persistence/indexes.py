@@ -0,0 +1,237 @@
+import heapq
+import threading
+from bisect import bisect_left, insort
+from operator import attrgetter
+
+# Indexes are written under their repository's write lock. MembershipIndex is read without a
+# lock: its reads only copy containers (atomic in CPython) or iterate over such copies.
+# AttributeIndex and SortedIndex reads bisect and walk lists that writes shift, split and
+# merge, so both take a lock of their own around every read and write
+
+
+class AttributeIndex:
+    """Hash index from an attribute value to the objects holding it, in storage order.
+
+    The objects of a value are kept as (position, object) pairs sorted by their
+    position in the repository, so a page of them is found by bisection like a
+    page of the whole repository.
+    """
+
+    def __init__(self, attr_name, position, unique=False):
+        self.attr_name = attr_name
+        self.unique = unique
+        self._getter = attrgetter(attr_name)  # (Dotted names like 'place.id' are supported)
+        self._position = position  # obj_id -> position of the object in its repository
+        self._entries = {}  # value -> [(position, obj)] sorted by position
+        self._keys = {}  # obj_id -> (value, position) it is indexed under
+        self._lock = threading.Lock()
+
+    def key(self, obj):
+        return self._getter(obj)
+
+    def check(self, value, obj_id=None):
+        """Raise ValueError if a unique value is already used by another object"""
+        if not self.unique:
+            return
+        with self._lock:
+            taken = any(obj.id != obj_id for _, obj in self._entries.get(value, ()))
+        if taken:
+            raise ValueError(f"{self.attr_name} already exists !")
+
+    def add(self, obj):
+        value = self.key(obj)
+        position = self._position(obj.id)
+        with self._lock:
+            self._remove(obj)
+            # (A new object has the highest position: insort appends it)
+            insort(self._entries.setdefault(value, []), (position, obj))
+            self._keys[obj.id] = (value, position)
+
+    def remove(self, obj):
+        with self._lock:
+            self._remove(obj)
+
+    def _remove(self, obj):
+        # (The stored key is used, so the object may already hold its new value)
+        key = self._keys.pop(obj.id, None)
+        if key is None:
+            return
+        value, position = key
+        entry = self._entries[value]
+        # ((position,) sorts just before (position, obj): objects are never compared)
+        del entry[bisect_left(entry, (position,))]
+        if not entry:
+            del self._entries[value]
+
+    def get(self, value):
+        with self._lock:
+            entry = self._entries.get(value)
+            return entry[0][1] if entry else None
+
+    def get_all(self, value):
+        with self._lock:
+            return [obj for _, obj in self._entries.get(value, ())]
+
+    def page(self, value, limit, after=-1):
+        """Up to `limit` (position, object) pairs of the objects holding the value, after a position"""
+        with self._lock:
+            entry = self._entries.get(value, ())
+            start = bisect_left(entry, (after + 1,))
+            return entry[start:start + limit]
+
+
+class MembershipIndex:
+    """Bitmask per object plus posting set per member, for "has all of these" queries.
+
+    Members (e.g. amenities) get compact integer ordinals; each indexed object
+    stores the OR of its members' bits. The ordinal of a member no object holds
+    any more is freed and reused, so the masks do not grow under churn.
+    """
+
+    def __init__(self, members_attr):
+        self.members_attr = members_attr
+        self._ordinals = {}  # member_id -> bit position
+        self._members = []  # bit position -> member_id (None once free)
+        self._free = []  # heap of the free bit positions (the lowest is reused first)
+        self._masks = {}  # obj_id -> bitmask of its members
+        self._postings = {}  # member_id -> {obj_id: obj}
+
+    def ordinal(self, member_id):
+        if member_id not in self._ordinals:
+            if self._free:
+                ordinal = heapq.heappop(self._free)
+                self._members[ordinal] = member_id
+            else:
+                ordinal = len(self._members)
+                self._members.append(member_id)
+            self._ordinals[member_id] = ordinal
+        return self._ordinals[member_id]
+
+    def mask(self, member_ids):
+        """Bitmask of the given members, None if one of them was never indexed"""
+        mask = 0
+        for member_id in member_ids:
+            if member_id not in self._ordinals:
+                return None
+            mask |= 1 << self._ordinals[member_id]
+        return mask
+
+    def add(self, obj):
+        mask = 0
+        for member in getattr(obj, self.members_attr):
+            mask |= 1 << self.ordinal(member.id)
+            self._postings.setdefault(member.id, {})[obj.id] = obj
+        self._masks[obj.id] = mask
+
+    def remove(self, obj):
+        mask = self._masks.pop(obj.id, 0)
+        while mask:
+            lowest = mask & -mask
+            mask ^= lowest
+            member_id = self._members[lowest.bit_length() - 1]
+            posting = self._postings[member_id]
+            posting.pop(obj.id, None)
+            if not posting:
+                del self._postings[member_id]
+                ordinal = self._ordinals.pop(member_id)
+                self._members[ordinal] = None
+                heapq.heappush(self._free, ordinal)
+
+    def has_all(self, obj, member_ids):
+        required = self.mask(member_ids)
+        return required is not None and self._masks.get(obj.id, 0) & required == required
+
+    def get_all(self, member_ids):
+        """Objects holding every one of the members, in the smallest posting's order"""
+        required = self.mask(member_ids)
+        if not required:
+            return []
+        postings = [self._postings.get(member_id, {}) for member_id in member_ids]
+        smallest = min(postings, key=len)
+        return [obj for obj_id, obj in list(smallest.items()) if self._masks.get(obj_id, 0) & required == required]
+
+    def get_all_with(self, member_id):
+        return list(self._postings.get(member_id, {}).values())
+
+
+class SortedIndex:
+    """Objects kept ordered by key(obj), for top-N queries.
+
+    key(obj) must return a sortable value, or None to leave the object out.
+    The entries are split into sorted blocks of at most 2 * BLOCK_SIZE, so a
+    write only shifts one block instead of the whole list.
+    """
+
+    BLOCK_SIZE = 1000
+
+    def __init__(self, key):
+        self._key = key
+        self._blocks = []  # sorted blocks of sorted (key, obj_id)
+        self._maxes = []  # block position -> last entry of the block
+        self._keys = {}  # obj_id -> key it is indexed under
+        self._objects = {}  # obj_id -> obj
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, obj):
+        key = self._key(obj)
+        with self._lock:
+            self._remove(obj)
+            if key is None:
+                return
+            self._insert((key, obj.id))
+            self._keys[obj.id] = key
+            self._objects[obj.id] = obj
+
+    def remove(self, obj):
+        with self._lock:
+            self._remove(obj)
+
+    def _remove(self, obj):
+        key = self._keys.pop(obj.id, None)
+        if key is None:
+            return
+        self._delete((key, obj.id))
+        del self._objects[obj.id]
+
+    def _insert(self, entry):
+        if not self._blocks:
+            self._blocks.append([entry])
+            self._maxes.append(entry)
+            return
+        position = min(bisect_left(self._maxes, entry), len(self._blocks) - 1)
+        block = self._blocks[position]
+        insort(block, entry)
+        self._maxes[position] = block[-1]
+        if len(block) > 2 * self.BLOCK_SIZE:
+            self._blocks[position:position + 1] = [block[:self.BLOCK_SIZE], block[self.BLOCK_SIZE:]]
+            self._maxes[position:position + 1] = [block[self.BLOCK_SIZE - 1], block[-1]]
+
+    def _delete(self, entry):
+        position = bisect_left(self._maxes, entry)
+        block = self._blocks[position]
+        del block[bisect_left(block, entry)]
+        if len(block) < self.BLOCK_SIZE // 2 and len(self._blocks) > 1:
+            # Merge a small block into its neighbour, splitting the result again if it is too large
+            start = position - 1 if position == len(self._blocks) - 1 else position
+            merged = self._blocks[start] + self._blocks[start + 1]
+            blocks = [merged] if len(merged) <= 2 * self.BLOCK_SIZE else \
+                [merged[:len(merged) // 2], merged[len(merged) // 2:]]
+            self._blocks[start:start + 2] = blocks
+            self._maxes[start:start + 2] = [merged_block[-1] for merged_block in blocks]
+        elif block:
+            self._maxes[position] = block[-1]
+        else:
+            del self._blocks[position]
+            del self._maxes[position]
+
+    def first(self, n):
+        entries = []
+        with self._lock:
+            for block in self._blocks:
+                if len(entries) >= n:
+                    break
+                entries.extend(block[:n - len(entries)])
+            return [self._objects[obj_id] for _, obj_id in entries]
@@ -0,0 +1,289 @@
+import json
+import mmap
+import os
+import pickle
+import threading
+from app.persistence.repository import InMemoryRepository
+
+SNAPSHOT_FILE = 'snapshot.pickle'
+SNAPSHOT_CHUNK = 10000  # records per pickled chunk of the snapshot
+LOG_FILE = 'journal.log'
+ROTATED_LOG_FILE = 'journal.log.old'
+
+
+class Journal:
+    """Append-only log of repository changes, with group commit and periodic snapshots.
+
+    Log entries are JSON lines: {"seq", "op": "put"|"delete", "kind", "record"|"id"}.
+    A single flusher thread writes and fsyncs whatever accumulated while the
+    previous fsync was running, so concurrent writers share one fsync.
+
+    A snapshot is a pickled header ({"seq"}) followed by pickled
+    {"op": "put_many", "kind", "records"} chunks, read back from a memory map.
+    """
+
+    def __init__(self, directory, durable=True, compact_interval=300.0, compact_min_entries=10000):
+        self.directory = directory
+        self.durable = durable
+        self.compact_interval = compact_interval
+        self.compact_min_entries = compact_min_entries
+        os.makedirs(directory, exist_ok=True)
+        self._cond = threading.Condition()
+        self._buffer = []
+        self._seq = 0
+        self._flushed_seq = 0
+        self._entries_since_snapshot = 0
+        self._closed = False
+        self._writing = False
+        self._log_end = None  # size of the readable part of the log found by load()
+        self._compact_lock = threading.Lock()
+        self._log = None
+        self._flusher = None
+        self._compactor = None
+        self._dump_all = None
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def load(self):
+        """Yield the stored entries: the snapshot's chunks, then the log tail written after it"""
+        snapshot_seq = 0
+        path = self._path(SNAPSHOT_FILE)
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb') as snapshot, \
+                    mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                snapshot_seq = pickle.load(mapped)["seq"]
+                while mapped.tell() < len(mapped):
+                    yield pickle.load(mapped)
+        self._seq = snapshot_seq
+        for name in (ROTATED_LOG_FILE, LOG_FILE):
+            path = self._path(name)
+            if not os.path.exists(path):
+                continue
+            end = 0
+            with open(path, 'rb') as log:
+                for line in log:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # (A torn last line from a crash, start() cuts it off)
+                    end += len(line)
+                    if entry["seq"] > snapshot_seq:
+                        self._seq = entry["seq"]
+                        self._entries_since_snapshot += 1
+                        yield entry
+            if name == LOG_FILE:
+                self._log_end = end
+        self._flushed_seq = self._seq
+
+    def start(self, dump_all):
+        """Open the log for appending; dump_all() yields the (kind, record) pairs to snapshot"""
+        self._dump_all = dump_all
+        path = self._path(LOG_FILE)
+        if self._log_end is not None and os.path.getsize(path) > self._log_end:
+            os.truncate(path, self._log_end)
+        self._log = open(path, 'ab')
+        self._flusher = threading.Thread(target=self._flush_loop, name='journal-flusher', daemon=True)
+        self._flusher.start()
+        if self.compact_interval:
+            self._compactor = threading.Thread(target=self._compact_loop, name='journal-compactor', daemon=True)
+            self._compactor.start()
+
+    def append(self, op, kind, payload):
+        self.append_many(op, kind, [payload])
+
+    def append_many(self, op, kind, payloads):
+        """Append one entry per payload, committed together"""
+        self.wait(self.enqueue(op, kind, payloads))
+
+    def enqueue(self, op, kind, payloads):
+        """Queue one entry per payload and return the last sequence number without waiting for the disk"""
+        with self._cond:
+            was_empty = not self._buffer
+            for payload in payloads:
+                self._seq += 1
+                entry = {"seq": self._seq, "op": op, "kind": kind}
+                entry["record" if op == 'put' else "id"] = payload
+                self._buffer.append(json.dumps(entry).encode() + b'\n')
+            seq = self._seq
+            self._entries_since_snapshot += len(payloads)
+            if was_empty or self.durable:
+                # (The flusher only sleeps while the buffer is empty)
+                self._cond.notify_all()
+            return seq
+
+    def wait(self, seq):
+        """In durable mode, block until the entries up to seq are on disk"""
+        if not self.durable:
+            return
+        with self._cond:
+            while self._flushed_seq < seq and not self._closed:
+                self._cond.wait()
+
+    def flush(self):
+        """Block until everything appended so far is on disk"""
+        with self._cond:
+            target = self._seq
+            self._cond.notify_all()
+            while self._flushed_seq < target and not self._closed:
+                self._cond.wait()
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                while not self._buffer and not self._closed:
+                    self._cond.wait()
+                if not self._buffer and self._closed:
+                    return
+                batch, self._buffer = self._buffer, []
+                seq = self._seq
+                log = self._log
+                self._writing = True
+            # (Writes happen outside the lock so appends keep queueing the next batch)
+            log.write(b''.join(batch))
+            log.flush()
+            os.fsync(log.fileno())
+            with self._cond:
+                self._flushed_seq = max(self._flushed_seq, seq)
+                self._writing = False
+                self._cond.notify_all()
+
+    def _compact_loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed, timeout=self.compact_interval)
+                if self._closed:
+                    return
+                due = self._entries_since_snapshot >= self.compact_min_entries
+            if due:
+                self.compact()
+
+    def compact(self):
+        """Write a snapshot of the current state and drop the log it covers"""
+        with self._compact_lock:
+            self.flush()
+            with self._cond:
+                # Later appends go to a fresh log; the snapshot covers the rotated one
+                while self._buffer or self._writing:
+                    self._cond.wait()
+                snapshot_seq = self._seq
+                self._log.close()
+                self._rotate_log()
+                self._log = open(self._path(LOG_FILE), 'ab')
+                self._entries_since_snapshot = 0
+
+            # (Changes racing with the dump are also in the new log, replaying them is idempotent)
+            temporary = self._path(SNAPSHOT_FILE + '.tmp')
+            with open(temporary, 'wb') as snapshot:
+                pickle.dump({"seq": snapshot_seq}, snapshot, protocol=pickle.HIGHEST_PROTOCOL)
+                chunk_kind, chunk = None, []
+                for kind, record in self._dump_all():
+                    if kind != chunk_kind or len(chunk) == SNAPSHOT_CHUNK:
+                        self._write_chunk(snapshot, chunk_kind, chunk)
+                        chunk_kind, chunk = kind, []
+                    chunk.append(record)
+                self._write_chunk(snapshot, chunk_kind, chunk)
+                snapshot.flush()
+                os.fsync(snapshot.fileno())
+            os.replace(temporary, self._path(SNAPSHOT_FILE))
+            os.remove(self._path(ROTATED_LOG_FILE))
+
+    @staticmethod
+    def _write_chunk(snapshot, kind, records):
+        if records:
+            pickle.dump({"op": "put_many", "kind": kind, "records": records},
+                        snapshot, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _rotate_log(self):
+        current, rotated = self._path(LOG_FILE), self._path(ROTATED_LOG_FILE)
+        if not os.path.exists(rotated):
+            os.replace(current, rotated)
+            return
+        # (A compaction was interrupted, its rotated log is not covered by a snapshot yet)
+        with open(current, 'rb') as log, open(rotated, 'ab') as old_log:
+            old_log.write(log.read())
+            old_log.flush()
+            os.fsync(old_log.fileno())
+        os.remove(current)
+
+    def close(self):
+        if self._log is None:
+            return
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._flusher.join()
+        if self._compactor is not None:
+            self._compactor.join()
+        self._log.close()
+        self._log = None
+
+
+class JournaledRepository(InMemoryRepository):
+    """InMemoryRepository recording every add, update and delete in a Journal"""
+
+    def __init__(self, journal, record, indexes=(), unique_indexes=()):
+        super().__init__(indexes=indexes, unique_indexes=unique_indexes)
+        self._journal = journal
+        self._record = record
+
+    # Entries are queued under the write lock, so the log has the changes in the order they
+    # were applied; the wait for the disk happens outside it, so concurrent writers share an fsync
+
+    def add(self, obj):
+        with self._write_lock:
+            super().add(obj)
+            seq = self._journal.enqueue('put', self._record.kind, [self._record.dump(obj)])
+        self._journal.wait(seq)
+
+    def add_many(self, objs):
+        with self._write_lock:
+            super().add_many(objs)
+            seq = self._journal.enqueue('put', self._record.kind, [self._record.dump(obj) for obj in objs])
+        self._journal.wait(seq)
+
+    def update(self, obj_id, data):
+        with self._write_lock:
+            obj = self.get(obj_id)
+            if not obj:
+                return
+            try:
+                super().update(obj_id, data)
+            finally:
+                # (A failed update may still have changed some attributes)
+                seq = self._journal.enqueue('put', self._record.kind, [self._record.dump(obj)])
+        self._journal.wait(seq)
+
+    def delete(self, obj_id):
+        with self._write_lock:
+            if obj_id not in self._storage:
+                return
+            super().delete(obj_id)
+            seq = self._journal.enqueue('delete', self._record.kind, [obj_id])
+        self._journal.wait(seq)
+
+    def restore(self, record, resolve):
+        """Apply a journal record without journaling it again"""
+        with self._write_lock:
+            obj = self.get(record["id"])
+            if obj is None:
+                InMemoryRepository.add(self, self._record.load(record, resolve))
+            else:
+                self._unindex(obj)
+                self._record.refresh(obj, record, resolve)
+                self._index(obj)
+
+    def restore_many(self, records, resolve):
+        """Load snapshot records into an empty repository, skipping every per-object check"""
+        load = self._record.load
+        with self._write_lock:
+            for record in records:
+                try:
+                    self._insert(load(record, resolve))
+                except LookupError:
+                    pass  # (Its place or user was deleted while the snapshot was written)
+
+    def discard(self, obj_id):
+        """Apply a journal delete without journaling it again"""
+        InMemoryRepository.delete(self, obj_id)
@@ -0,0 +1,161 @@
+"""Flat records of the models, used by the durable storage backends.
+
+Records only hold scalars and the ids of related objects. Loading a record
+skips the setters' validation (the data was validated before it was stored)
+and links the object to its related objects through `resolve(kind, obj_id)`;
+a LookupError is raised when a required related object does not exist.
+"""
+from app.models.amenity import Amenity
+from app.models.place import Place
+from app.models.rating_stats import RatingStats
+from app.models.review import Review
+from app.models.user import User
+
+
+def _resolve_required(resolve, kind, obj_id):
+    obj = resolve(kind, obj_id)
+    if obj is None:
+        raise LookupError(f"{kind} {obj_id} does not exist")
+    return obj
+
+
+def _base_fields(obj):
+    return {
+        "id": obj.id,
+        "created_at": obj._created_at,
+        "updated_at": obj._updated_at
+    }
+
+
+def _set_base_fields(obj, record):
+    obj.id = record["id"]
+    obj._created_at = record["created_at"]
+    obj._updated_at = record["updated_at"]
+
+
+class UserRecord:
+    kind = 'users'
+    model = User
+    columns = ('first_name', 'last_name', 'email', 'is_admin')
+    references = {}  # attribute path -> column holding the related id
+    foreign_keys = {}  # column holding a related id -> kind of the related object
+
+    @staticmethod
+    def dump(user):
+        record = _base_fields(user)
+        record.update(first_name=user.first_name, last_name=user.last_name,
+                      email=user.email, is_admin=bool(user.is_admin))
+        return record
+
+    @staticmethod
+    def load(record, resolve):
+        user = User.__new__(User)
+        user.places = []
+        user.reviews = []
+        user._rating_stats = RatingStats()
+        UserRecord.refresh(user, record, resolve)
+        return user
+
+    @staticmethod
+    def refresh(user, record, resolve):
+        _set_base_fields(user, record)
+        user._first_name = record["first_name"]
+        user._last_name = record["last_name"]
+        user._email = record["email"]
+        user.is_admin = bool(record["is_admin"])
+
+
+class AmenityRecord:
+    kind = 'amenities'
+    model = Amenity
+    columns = ('name',)
+    references = {}
+    foreign_keys = {}
+
+    @staticmethod
+    def dump(amenity):
+        record = _base_fields(amenity)
+        record.update(name=amenity.name)
+        return record
+
+    @staticmethod
+    def load(record, resolve):
+        amenity = Amenity.__new__(Amenity)
+        AmenityRecord.refresh(amenity, record, resolve)
+        return amenity
+
+    @staticmethod
+    def refresh(amenity, record, resolve):
+        _set_base_fields(amenity, record)
+        amenity._name = record["name"]
+
+
+class PlaceRecord:
+    kind = 'places'
+    model = Place
+    columns = ('title', 'description', 'price', 'latitude', 'longitude', 'owner_id', 'amenity_ids')
+    references = {'owner.id': 'owner_id'}
+    foreign_keys = {'owner_id': 'users'}
+
+    @staticmethod
+    def dump(place):
+        record = _base_fields(place)
+        record.update(title=place.title, description=place.description, price=place.price,
+                      latitude=place.latitude, longitude=place.longitude, owner_id=place.owner.id,
+                      amenity_ids=[amenity.id for amenity in place.amenities])
+        return record
+
+    @staticmethod
+    def load(record, resolve):
+        place = Place.__new__(Place)
+        place.reviews = []
+        place._rating_stats = RatingStats()
+        place._owner = _resolve_required(resolve, 'users', record["owner_id"])
+        PlaceRecord.refresh(place, record, resolve)
+        place.owner.add_place(place)
+        return place
+
+    @staticmethod
+    def refresh(place, record, resolve):
+        _set_base_fields(place, record)
+        place._title = record["title"]
+        place._description = record["description"]
+        place._price = record["price"]
+        place._latitude = record["latitude"]
+        place._longitude = record["longitude"]
+        amenities = (resolve('amenities', amenity_id) for amenity_id in record["amenity_ids"])
+        place.amenities = [amenity for amenity in amenities if amenity is not None]
+
+
+class ReviewRecord:
+    kind = 'reviews'
+    model = Review
+    columns = ('text', 'rating', 'place_id', 'user_id')
+    references = {'place.id': 'place_id', 'user.id': 'user_id'}
+    foreign_keys = {'place_id': 'places', 'user_id': 'users'}
+
+    @staticmethod
+    def dump(review):
+        record = _base_fields(review)
+        record.update(text=review.text, rating=review.rating,
+                      place_id=review.place.id, user_id=review.user.id)
+        return record
+
+    @staticmethod
+    def load(record, resolve):
+        review = Review.__new__(Review)
+        review._place = _resolve_required(resolve, 'places', record["place_id"])
+        review._user = _resolve_required(resolve, 'users', record["user_id"])
+        ReviewRecord.refresh(review, record, resolve)
+        review.place.add_review(review)
+        review.user.add_review(review)
+        return review
+
+    @staticmethod
+    def refresh(review, record, resolve):
+        _set_base_fields(review, record)
+        review._text = record["text"]
+        review._rating = record["rating"]
+
+
+RECORDS = {record.kind: record for record in (UserRecord, AmenityRecord, PlaceRecord, ReviewRecord)}
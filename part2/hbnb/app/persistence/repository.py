@@ -1,14 +1,47 @@
+import base64
+import binascii
+import heapq
+import threading
+import time
 from abc import ABC, abstractmethod
+from bisect import bisect_right
+from operator import attrgetter, itemgetter
+from app.persistence.indexes import AttributeIndex
+
+
+def encode_cursor(position):
+    """Turn a repository position into an opaque pagination cursor"""
+    return base64.urlsafe_b64encode(str(position).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Turn an opaque pagination cursor back into a repository position"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise ValueError("Invalid cursor !")
+
 
 class Repository(ABC):
     @abstractmethod
     def add(self, obj):
         pass
 
+    @abstractmethod
+    def add_many(self, objs):
+        """Add all the objects at once, or none of them if one breaks a unique index"""
+        pass
+
     @abstractmethod
     def get(self, obj_id):
         pass
 
+    @abstractmethod
+    def get_many(self, obj_ids):
+        """Return the objects of the given ids in one call, in the order of the ids (unknown ids are skipped)"""
+        pass
+
     @abstractmethod
     def get_all(self):
         pass
@@ -25,28 +58,221 @@ class Repository(ABC):
     def get_by_attribute(self, attr_name, attr_value):
         pass
 
+    @abstractmethod
+    def get_all_by_attribute(self, attr_name, attr_value):
+        pass
+
+    @abstractmethod
+    def get_page(self, limit, cursor=None):
+        """Return (objects, next_cursor); next_cursor is None on the last page"""
+        pass
+
+    @abstractmethod
+    def get_page_of(self, objs, limit, cursor=None):
+        """Page through some objects of the repository (e.g. from an index) in storage order,
+        with the same cursors as get_page; objects deleted from the repository are skipped"""
+        pass
+
+    def get_page_by_attribute(self, attr_name, attr_value, limit, cursor=None):
+        """Page of the objects whose attribute has the value, with the same cursors as get_page"""
+        return self.get_page_of(self.get_all_by_attribute(attr_name, attr_value), limit, cursor)
+
+    @property
+    @abstractmethod
+    def version(self):
+        """Counter changing on every add, update and delete (used for collection ETags)"""
+        pass
+
 
 class InMemoryRepository(Repository):
-    def __init__(self):
+    """Dict backed repository, safe to share between threads.
+
+    Writes are serialized by a per-repository lock, so checking the unique
+    indexes and inserting is atomic. Reads never take it: they do single dict
+    lookups or work on copies (which CPython makes atomically), and attribute
+    lookups take the short lock of their index, so they never wait for a whole
+    write and always see a consistent snapshot.
+    """
+
+    def __init__(self, indexes=(), unique_indexes=()):
         self._storage = {}
+        self._indexes = {}
+        self._write_lock = threading.RLock()
+        # Insertion order for pagination: parallel lists of sequence numbers and ids,
+        # deleted ids are left as None until the next compaction (which swaps in new lists)
+        self._next_seq = 0
+        self._order = ([], [])
+        self._positions = {}  # obj_id -> sequence number
+        self._tombstones = 0
+        # (Starts from the creation time so a restarted process never reuses a version)
+        self._version = time.time_ns()
+        for attr_name in unique_indexes:
+            self._indexes[attr_name] = AttributeIndex(attr_name, self._positions.get, unique=True)
+        for attr_name in indexes:
+            self._indexes[attr_name] = AttributeIndex(attr_name, self._positions.get)
+        self._secondary_indexes = []
 
     def add(self, obj):
+        with self._write_lock:
+            for index in self._indexes.values():
+                index.check(index.key(obj), obj.id)
+            self._insert(obj)
+
+    def add_many(self, objs):
+        with self._write_lock:
+            for index in self._indexes.values():
+                if not index.unique:
+                    continue
+                seen = set()
+                for obj in objs:
+                    value = index.key(obj)
+                    index.check(value, obj.id)
+                    if value in seen:
+                        raise ValueError(f"{index.attr_name} already exists !")
+                    seen.add(value)
+            for obj in objs:
+                self._insert(obj)
+
+    def _insert(self, obj):
+        """Store and index an object that is known to satisfy the unique indexes (write lock held)"""
+        if obj.id not in self._positions:
+            seqs, ids = self._order
+            self._positions[obj.id] = self._next_seq
+            # (Ids first: a concurrent get_page only reads positions below len(seqs))
+            ids.append(obj.id)
+            seqs.append(self._next_seq)
+            self._next_seq += 1
+        # (After the position: the attribute indexes order their objects by it)
         self._storage[obj.id] = obj
+        self._index(obj)
+        self._version += 1
 
     def get(self, obj_id):
         return self._storage.get(obj_id)
 
+    def get_many(self, obj_ids):
+        return [obj for obj in map(self._storage.get, obj_ids) if obj is not None]
+
     def get_all(self):
-        return list(self._storage.values())
+        return list(self._storage.copy().values())
 
     def update(self, obj_id, data):
-        obj = self.get(obj_id)
-        if obj:
-            obj.update(data)
+        with self._write_lock:
+            obj = self.get(obj_id)
+            if obj:
+                # Refuse the update before touching the object if it breaks a unique index
+                for attr_name, value in data.items():
+                    index = self._indexes.get(attr_name)
+                    if index:
+                        index.check(value, obj_id)
+                self._unindex(obj)
+                try:
+                    obj.update(data)
+                finally:
+                    self._index(obj)
+                    self._version += 1
+
+    def reindex(self, obj):
+        """Move an object in the indexes after a change made outside update() (e.g. its rating)"""
+        with self._write_lock:
+            if obj.id in self._storage:
+                self._unindex(obj)
+                self._index(obj)
 
     def delete(self, obj_id):
-        if obj_id in self._storage:
-            del self._storage[obj_id]
+        with self._write_lock:
+            if obj_id in self._storage:
+                self._unindex(self._storage.pop(obj_id))
+                self._version += 1
+                seqs, ids = self._order
+                seq = self._positions.pop(obj_id)
+                ids[bisect_right(seqs, seq) - 1] = None
+                self._tombstones += 1
+                if self._tombstones > len(ids) // 2:
+                    self._compact_order()
 
     def get_by_attribute(self, attr_name, attr_value):
-        return next((obj for obj in self._storage.values() if getattr(obj, attr_name) == attr_value), None)
+        index = self._indexes.get(attr_name)
+        if index:
+            return index.get(attr_value)
+        return next((obj for obj in self.get_all() if getattr(obj, attr_name) == attr_value), None)
+
+    def get_all_by_attribute(self, attr_name, attr_value):
+        index = self._indexes.get(attr_name)
+        if index:
+            return index.get_all(attr_value)
+        getter = attrgetter(attr_name)
+        return [obj for obj in self.get_all() if getter(obj) == attr_value]
+
+    @property
+    def version(self):
+        return self._version
+
+    def add_index(self, index):
+        """Register an index (any object with add(obj)/remove(obj)) kept in sync with the storage"""
+        with self._write_lock:
+            for obj in self._storage.values():
+                index.add(obj)
+            self._secondary_indexes.append(index)
+
+    def get_page(self, limit, cursor=None):
+        seqs, ids = self._order
+        size = len(seqs)
+        start = 0
+        if cursor is not None:
+            start = bisect_right(seqs, decode_cursor(cursor), 0, size)
+        page = []
+        position = start
+        while position < size and len(page) < limit:
+            obj_id = ids[position]
+            obj = None if obj_id is None else self._storage.get(obj_id)
+            if obj is not None:
+                page.append(obj)
+            position += 1
+        # Skip trailing deleted slots so the last page does not announce an empty one
+        while position < size and ids[position] is None:
+            position += 1
+        if position >= size:
+            return page, None
+        return page, encode_cursor(seqs[position - 1])
+
+    def get_page_of(self, objs, limit, cursor=None):
+        after = -1 if cursor is None else decode_cursor(cursor)
+        positions = self._positions
+        seqs = ((positions.get(obj.id), obj) for obj in objs)
+        # (One extra object tells whether there is a next page)
+        keyed = heapq.nsmallest(limit + 1, ((seq, obj) for seq, obj in seqs if seq is not None and seq > after),
+                                key=itemgetter(0))
+        page = [obj for _, obj in keyed[:limit]]
+        if len(keyed) <= limit:
+            return page, None
+        return page, encode_cursor(keyed[limit - 1][0])
+
+    def get_page_by_attribute(self, attr_name, attr_value, limit, cursor=None):
+        index = self._indexes.get(attr_name)
+        if index is None:
+            return super().get_page_by_attribute(attr_name, attr_value, limit, cursor)
+        after = -1 if cursor is None else decode_cursor(cursor)
+        # (One extra object tells whether there is a next page)
+        entries = index.page(attr_value, limit + 1, after)
+        page = [obj for _, obj in entries[:limit]]
+        if len(entries) <= limit:
+            return page, None
+        return page, encode_cursor(entries[limit - 1][0])
+
+    def _compact_order(self):
+        kept = [(seq, obj_id) for seq, obj_id in zip(*self._order) if obj_id is not None]
+        self._order = ([seq for seq, _ in kept], [obj_id for _, obj_id in kept])
+        self._tombstones = 0
+
+    def _index(self, obj):
+        for index in self._indexes.values():
+            index.add(obj)
+        for index in self._secondary_indexes:
+            index.add(obj)
+
+    def _unindex(self, obj):
+        for index in self._indexes.values():
+            index.remove(obj)
+        for index in self._secondary_indexes:
+            index.remove(obj)
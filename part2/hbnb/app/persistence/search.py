@@ -0,0 +1,224 @@
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from array import array
+from collections import Counter
+from importlib.util import find_spec
+
+TOKEN_PATTERN = re.compile(r'\w+')
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have in into is it its of on or so that the their this to was
+were will with you your
+""".split())
+MAX_FREQUENCY = 0xFFFF  # (Term frequencies are stored on 16 bits)
+
+# (NumPy is optional, searches fall back to plain loops; it is imported by the first search)
+np = None
+HAS_NUMPY = find_spec('numpy') is not None
+
+
+def tokenize(text):
+    """Lowercased, accent-stripped word tokens of a text, without stopwords"""
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return [token for token in TOKEN_PATTERN.findall(text) if token not in STOPWORDS]
+
+
+def text_terms(*weighted_texts):
+    """Counter of the terms of (text, weight) pairs, each occurrence counting `weight` times"""
+    terms = Counter()
+    for text, weight in weighted_texts:
+        for token in tokenize(text):
+            terms[token] += weight
+    return terms
+
+
+class TextIndex:
+    """Inverted index with BM25 ranking.
+
+    A document (e.g. a place) is made of named parts (its own text, each of its
+    reviews), each one set and removed on its own, so a change only touches the
+    postings of the part that changed. Documents get small integer numbers and
+    each term's postings are three flat arrays (document numbers, frequencies,
+    part slots) with one entry per part holding the term: 10 bytes per entry,
+    and NumPy scores a posting list in one vectorized pass. Each part keeps the
+    positions of its entries, so removing it does not scan the posting lists.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._term_ids = {}  # term -> term id
+        self._postings = []  # term id -> (document numbers, frequencies, part slots) arrays
+        self._parts = {}  # (doc_id, part) -> part slot
+        self._slots = []  # part slot -> (term ids, frequencies, positions in the postings) arrays (None once free)
+        self._free_slots = []  # part slots to reuse
+        self._numbers = {}  # doc_id -> document number
+        self._doc_ids = []  # document number -> doc_id (None once free)
+        self._free = []  # document numbers to reuse
+        self._lengths = array('q')  # document number -> terms in the document
+        self._part_counts = array('q')  # document number -> parts in the document
+        self._total_length = 0
+        # (Places and reviews feed the same index, and searches hold the lock during their
+        # vectorized pass: the arrays cannot grow while NumPy looks at their buffers)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._numbers)
+
+    def set_part(self, doc_id, part, terms):
+        """Set the term frequencies (a dict) of one part of a document, replacing its previous terms"""
+        with self._lock:
+            self._remove_part(doc_id, part)
+            if not terms:
+                return
+            number = self._numbers.get(doc_id)
+            if number is None:
+                number = self._new_number(doc_id)
+            slot = self._new_slot()
+            term_ids, frequencies, positions = array('i'), array('H'), array('i')
+            for term, count in terms.items():
+                term_id = self._term_ids.get(term)
+                if term_id is None:
+                    term_id = self._term_ids[term] = len(self._postings)
+                    self._postings.append((array('i'), array('H'), array('i')))
+                count = min(count, MAX_FREQUENCY)
+                numbers, posting_frequencies, slots = self._postings[term_id]
+                positions.append(len(numbers))
+                numbers.append(number)
+                posting_frequencies.append(count)
+                slots.append(slot)
+                term_ids.append(term_id)
+                frequencies.append(count)
+            self._parts[(doc_id, part)] = slot
+            self._slots[slot] = (term_ids, frequencies, positions)
+            length = sum(frequencies)
+            self._lengths[number] += length
+            self._part_counts[number] += 1
+            self._total_length += length
+
+    def remove_part(self, doc_id, part):
+        with self._lock:
+            self._remove_part(doc_id, part)
+
+    def _new_number(self, doc_id):
+        if self._free:
+            number = self._free.pop()
+            self._doc_ids[number] = doc_id
+        else:
+            number = len(self._doc_ids)
+            self._doc_ids.append(doc_id)
+            self._lengths.append(0)
+            self._part_counts.append(0)
+        self._numbers[doc_id] = number
+        return number
+
+    def _new_slot(self):
+        if self._free_slots:
+            return self._free_slots.pop()
+        self._slots.append(None)
+        return len(self._slots) - 1
+
+    def _remove_part(self, doc_id, part):
+        slot = self._parts.pop((doc_id, part), None)
+        if slot is None:
+            return
+        term_ids, part_frequencies, positions = self._slots[slot]
+        number = self._numbers[doc_id]
+        for term_id, position in zip(term_ids, positions):
+            numbers, frequencies, slots = self._postings[term_id]
+            # Move the last entry into this part's position, and tell the part owning it where it went
+            last = len(numbers) - 1
+            if position != last:
+                moved = slots[last]
+                numbers[position], frequencies[position], slots[position] = numbers[last], frequencies[last], moved
+                moved_term_ids, _, moved_positions = self._slots[moved]
+                moved_positions[moved_term_ids.index(term_id)] = position
+            numbers.pop()
+            frequencies.pop()
+            slots.pop()
+        self._slots[slot] = None
+        self._free_slots.append(slot)
+        length = sum(part_frequencies)
+        self._lengths[number] -= length
+        self._part_counts[number] -= 1
+        self._total_length -= length
+        if not self._part_counts[number]:
+            del self._numbers[doc_id]
+            self._doc_ids[number] = None
+            self._free.append(number)
+
+    def search(self, query, limit, offset=0):
+        """Return the (score, doc_id) pairs ranked offset to offset + limit among the documents
+        holding every term of the query, best first, and the number of matching documents"""
+        term_ids = {self._term_ids.get(term) for term in tokenize(query)}
+        if not term_ids or None in term_ids:
+            return [], 0
+        global np
+        if np is None and HAS_NUMPY:
+            import numpy as np
+        with self._lock:
+            postings = sorted((self._postings[term_id] for term_id in term_ids), key=lambda posting: len(posting[0]))
+            if not postings[0][0]:
+                return [], 0
+            doc_count = len(self._numbers)
+            average_length = self._total_length / doc_count
+            # (Document frequencies count the parts holding a term, so the idf of terms repeated
+            # across the reviews of a place is a little lower)
+            weights = [math.log(1 + (doc_count - len(numbers) + 0.5) / (len(numbers) + 0.5))
+                       for numbers, *_ in postings]
+            search = self._search_numpy if np is not None else self._search_loop
+            ranked, total = search(postings, weights, average_length, offset + limit)
+            results = [(score, self._doc_ids[number]) for score, number in ranked[offset:]]
+        return results, total
+
+    def _bm25(self, frequency, weight, length, average_length):
+        return weight * frequency * (self.k1 + 1) / (
+            frequency + self.k1 * (1 - self.b + self.b * length / average_length))
+
+    def _search_numpy(self, postings, weights, average_length, count):
+        lengths = np.frombuffer(self._lengths, dtype=np.int64)
+        # Candidates: the documents of the rarest term, with the summed frequencies of their parts
+        numbers = np.frombuffer(postings[0][0], dtype=np.int32)
+        candidates, inverse = np.unique(numbers, return_inverse=True)
+        frequency = np.bincount(inverse, weights=np.frombuffer(postings[0][1], dtype=np.uint16))
+        candidate_lengths = lengths[candidates]
+        scores = self._bm25(frequency, weights[0], candidate_lengths, average_length)
+        for (numbers, frequencies, _), weight in zip(postings[1:], weights[1:]):
+            frequency = np.bincount(np.frombuffer(numbers, dtype=np.int32),
+                                    weights=np.frombuffer(frequencies, dtype=np.uint16),
+                                    minlength=len(lengths))[candidates]
+            matching = frequency > 0
+            candidates, frequency = candidates[matching], frequency[matching]
+            candidate_lengths, scores = candidate_lengths[matching], scores[matching]
+            scores = scores + self._bm25(frequency, weight, candidate_lengths, average_length)
+        total = len(candidates)
+        if count < total:
+            # (Every document tied with the last kept score competes, so ties break like the loop below)
+            top = np.flatnonzero(scores >= np.partition(scores, total - count)[total - count])
+        else:
+            top = np.arange(total)
+        # Best score first, then the lowest document number
+        top = top[np.lexsort((candidates[top], -scores[top]))][:count]
+        return list(zip(scores[top].tolist(), candidates[top].tolist())), total
+
+    def _search_loop(self, postings, weights, average_length, count):
+        per_term = []
+        for numbers, frequencies, _ in postings:
+            term_frequencies = Counter()
+            for number, frequency in zip(numbers, frequencies):
+                if not per_term or number in per_term[0]:
+                    term_frequencies[number] += frequency
+            per_term.append(term_frequencies)
+        scored = []
+        for number in per_term[0]:
+            if all(number in term_frequencies for term_frequencies in per_term[1:]):
+                length = self._lengths[number]
+                scored.append((sum(self._bm25(term_frequencies[number], weight, length, average_length)
+                                   for term_frequencies, weight in zip(per_term, weights)), number))
+        top = heapq.nsmallest(count, scored, key=lambda result: (-result[0], result[1]))
+        return top, len(scored)
@@ -0,0 +1,95 @@
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points, in kilometers"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 \
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GridIndex:
+    """Uniform latitude/longitude grid for bounding-box and radius searches"""
+
+    def __init__(self, cell_size=0.1, lat_attr='latitude', lon_attr='longitude'):
+        self.cell_size = cell_size
+        self.lat_attr = lat_attr
+        self.lon_attr = lon_attr
+        self._cells = {}  # (row, col) -> {obj_id: obj}
+        self._coords = {}  # obj_id -> (lat, lon) the object is indexed under
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_size), math.floor(lon / self.cell_size))
+
+    def add(self, obj):
+        lat, lon = getattr(obj, self.lat_attr), getattr(obj, self.lon_attr)
+        self._cells.setdefault(self._cell(lat, lon), {})[obj.id] = obj
+        self._coords[obj.id] = (lat, lon)
+
+    def remove(self, obj):
+        coords = self._coords.pop(obj.id, None)
+        if coords is None:
+            return
+        cell = self._cell(*coords)
+        entry = self._cells[cell]
+        entry.pop(obj.id, None)
+        if not entry:
+            del self._cells[cell]
+
+    def within_bbox(self, min_lat, min_lon, max_lat, max_lon):
+        """Return the (lat, lon, obj) tuples inside the box; min_lon > max_lon crosses the antimeridian"""
+        if min_lon > max_lon:
+            return self._scan(min_lat, min_lon, max_lat, 180.0) + self._scan(min_lat, -180.0, max_lat, max_lon)
+        return self._scan(min_lat, min_lon, max_lat, max_lon)
+
+    def near(self, lat, lon, radius_km):
+        """Return (distance_km, obj) pairs within radius_km of the point, closest first"""
+        dlat = radius_km / KM_PER_DEGREE
+        min_lat, max_lat = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+        cos_lat = min(math.cos(math.radians(min_lat)), math.cos(math.radians(max_lat)))
+        if max_lat >= 90 or min_lat <= -90 or cos_lat <= 0 or radius_km / (KM_PER_DEGREE * cos_lat) >= 180:
+            candidates = self._scan(min_lat, -180.0, max_lat, 180.0)
+        else:
+            dlon = radius_km / (KM_PER_DEGREE * cos_lat)
+            min_lon, max_lon = lon - dlon, lon + dlon
+            if min_lon < -180:
+                min_lon += 360
+            if max_lon > 180:
+                max_lon -= 360
+            candidates = self.within_bbox(min_lat, min_lon, max_lat, max_lon)
+
+        results = []
+        for obj_lat, obj_lon, obj in candidates:
+            distance = haversine_km(lat, lon, obj_lat, obj_lon)
+            if distance <= radius_km:
+                results.append((distance, obj))
+        results.sort(key=lambda result: result[0])
+        return results
+
+    def _scan(self, min_lat, min_lon, max_lat, max_lon):
+        min_row, min_col = self._cell(min_lat, min_lon)
+        max_row, max_col = self._cell(max_lat, max_lon)
+        # (Large boxes are cheaper to answer by walking the occupied cells only)
+        if (max_row - min_row + 1) * (max_col - min_col + 1) > len(self._cells):
+            cells = [cell for cell in list(self._cells)
+                     if min_row <= cell[0] <= max_row and min_col <= cell[1] <= max_col]
+        else:
+            cells = [(row, col) for row in range(min_row, max_row + 1)
+                     for col in range(min_col, max_col + 1) if (row, col) in self._cells]
+
+        # (Cells and coordinates are read from copies, a concurrent write may remove them)
+        results = []
+        for row, col in cells:
+            inner = min_row < row < max_row and min_col < col < max_col
+            for obj_id, obj in list(self._cells.get((row, col), {}).items()):
+                coords = self._coords.get(obj_id)
+                if coords is None:
+                    continue
+                lat, lon = coords
+                if inner or (min_lat <= lat <= max_lat and min_lon <= lon <= max_lon):
+                    results.append((lat, lon, obj))
+        return results
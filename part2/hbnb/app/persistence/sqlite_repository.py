@@ -0,0 +1,404 @@
+import heapq
+import json
+import sqlite3
+import threading
+from app.persistence.repository import Repository, decode_cursor, encode_cursor
+
+SQL_TYPES = {
+    'is_admin': 'INTEGER', 'price': 'REAL', 'latitude': 'REAL', 'longitude': 'REAL', 'rating': 'INTEGER'
+}
+JSON_COLUMNS = {'amenity_ids'}
+MAX_IN_PARAMETERS = 900  # (Older SQLite builds bind at most 999 parameters per statement)
+MAX_CHANGES = 100000  # (Rows of the change log kept for the processes catching up with it)
+
+
+class SQLiteConnectionPool:
+    """One connection per thread to a SQLite file in WAL mode, shared by the repositories"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # (sqlite3 keeps a per-connection cache of prepared statements,
+            # every repository statement is a constant string so it is prepared once)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                                   check_same_thread=False, cached_statements=256)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+class SQLiteChangeLog:
+    """Kind and id of every row written by any process, in write order.
+
+    The log is filled by triggers of the repository tables, so a process can
+    catch up with the writes of the others by re-reading the rows they wrote.
+    """
+
+    def __init__(self, pool):
+        self._pool = pool
+        self._pool.connection().execute('CREATE TABLE IF NOT EXISTS repository_changes ('
+                                         'seq INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, '
+                                         'obj_id TEXT NOT NULL)')
+
+    def last(self):
+        """Position of the latest change"""
+        row = self._pool.connection().execute('SELECT MAX(seq) AS seq FROM repository_changes').fetchone()
+        return row['seq'] or 0
+
+    def since(self, after):
+        """Return ([(kind, obj_id)] changed after a position, latest position); None instead of the
+        changes once some of them were pruned (the reader has to re-read everything)"""
+        conn = self._pool.connection()
+        rows = conn.execute('SELECT seq, kind, obj_id FROM repository_changes WHERE seq > ? ORDER BY seq',
+                            (after,)).fetchall()
+        if not rows:
+            return [], after
+        if rows[0]['seq'] != after + 1:
+            first = conn.execute('SELECT MIN(seq) AS seq FROM repository_changes').fetchone()['seq']
+            if first > after + 1:
+                return None, rows[-1]['seq']
+        return [(row['kind'], row['obj_id']) for row in rows], rows[-1]['seq']
+
+    def prune(self):
+        self._pool.connection().execute(
+            'DELETE FROM repository_changes WHERE seq <= (SELECT MAX(seq) FROM repository_changes) - ?',
+            (MAX_CHANGES,))
+
+
+class SQLiteRepository(Repository):
+    """Repository storing one model's records in a SQLite table.
+
+    Loaded objects are kept in an identity map, so a given row is always the
+    same Python object in a process. Every read checks the row's updated_at and
+    refreshes the cached object when another process changed it. SQLite makes
+    writes and unique checks atomic; a lock guards the identity map and indexes.
+    The ids of related objects are foreign keys (ON DELETE RESTRICT), so no
+    process can delete an object another one still refers to.
+
+    `listener(obj, event, old_record)` is told when a read picks up a write of
+    another process: event is 'load' (a new object), 'refresh' (old_record
+    holds its previous fields) or 'forget' (its row was deleted). The writes of
+    this process are not reported, and hold the lock until the identity map
+    reflects them so that no concurrent read reports them either.
+    """
+
+    def __init__(self, pool, record, resolve, unique_indexes=(), indexes=()):
+        self._pool = pool
+        self._record = record
+        self._resolve = resolve
+        self._table = record.kind
+        self._columns = ('id', 'created_at', 'updated_at') + record.columns
+        self._lookup_columns = {column: column for column in record.columns}
+        self._lookup_columns.update(record.references)
+        self._unique = [self._lookup_columns[attr_name] for attr_name in unique_indexes]
+        self._identity = {}  # obj_id -> obj
+        self._versions = {}  # obj_id -> updated_at of the row the object reflects
+        self._secondary_indexes = []
+        self._lock = threading.RLock()
+        self.listener = None
+
+        placeholders = ', '.join('?' for _ in self._columns)
+        assignments = ', '.join(f'{column} = ?' for column in self._columns[1:])
+        self._select = f'SELECT {", ".join(self._columns)} FROM {self._table}'
+        self._sql_insert = f'INSERT INTO {self._table} ({", ".join(self._columns)}) VALUES ({placeholders})'
+        self._sql_update = f'UPDATE {self._table} SET {assignments} WHERE id = ?'
+        self._sql_delete = f'DELETE FROM {self._table} WHERE id = ?'
+        self._sql_get = f'{self._select} WHERE id = ?'
+        self._sql_page = f'SELECT seq, {", ".join(self._columns)} FROM {self._table} WHERE seq > ? ORDER BY seq LIMIT ?'
+        self._sql_attribute_page = f'SELECT seq, {", ".join(self._columns)} FROM {self._table} ' \
+                                   'WHERE {column} = ? AND seq > ? ORDER BY seq LIMIT ?'
+        self._sql_version = 'SELECT version FROM repository_versions WHERE kind = ?'
+        self._create_schema(unique_indexes, indexes)
+
+    def _create_schema(self, unique_indexes, indexes):
+        conn = self._pool.connection()
+        columns = ', '.join(f'{column} {SQL_TYPES.get(column, "TEXT")}' +
+                            (f' REFERENCES {self._record.foreign_keys[column]} (id) ON DELETE RESTRICT'
+                             if column in self._record.foreign_keys else '')
+                            for column in self._record.columns)
+        conn.execute(f'CREATE TABLE IF NOT EXISTS {self._table} ('
+                     'seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT NOT NULL UNIQUE, '
+                     f'created_at REAL NOT NULL, updated_at REAL NOT NULL, {columns})')
+        for attr_name in unique_indexes:
+            column = self._lookup_columns[attr_name]
+            conn.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS {self._table}_{column} ON {self._table} ({column})')
+        for attr_name in indexes:
+            column = self._lookup_columns[attr_name]
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {self._table}_{column} ON {self._table} ({column})')
+        # Write counter of the table, bumped by triggers so writes of every process count
+        conn.execute('CREATE TABLE IF NOT EXISTS repository_versions (kind TEXT PRIMARY KEY, version INTEGER NOT NULL)')
+        conn.execute('INSERT OR IGNORE INTO repository_versions VALUES (?, 0)', (self._table,))
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            conn.execute(f'CREATE TRIGGER IF NOT EXISTS {self._table}_version_{event.lower()} '
+                         f'AFTER {event} ON {self._table} BEGIN '
+                         f"UPDATE repository_versions SET version = version + 1 WHERE kind = '{self._table}'; END")
+        # Rows written, for the processes catching up with the writes of the others (see SQLiteChangeLog)
+        SQLiteChangeLog(self._pool)
+        for event, row in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+            conn.execute(f'CREATE TRIGGER IF NOT EXISTS {self._table}_change_{event.lower()} '
+                         f'AFTER {event} ON {self._table} BEGIN '
+                         f"INSERT INTO repository_changes (kind, obj_id) VALUES ('{self._table}', {row}.id); END")
+
+    def _row_values(self, obj):
+        record = self._record.dump(obj)
+        return [json.dumps(record[column]) if column in JSON_COLUMNS else record[column]
+                for column in self._columns]
+
+    def _hydrate(self, row):
+        """Return the object of a row, creating or refreshing the cached one"""
+        record = {column: row[column] for column in self._columns}
+        for column in JSON_COLUMNS.intersection(record):
+            record[column] = json.loads(record[column])
+        obj_id = record['id']
+        obj = self._identity.get(obj_id)
+        if obj is not None and self._versions.get(obj_id) == record['updated_at']:
+            return obj
+        event = old_record = None
+        with self._lock:
+            obj = self._identity.get(obj_id)
+            if obj is None:
+                try:
+                    obj = self._record.load(record, self._resolve)
+                except LookupError:
+                    # (An orphan row, e.g. from a database created without the foreign keys:
+                    # it is skipped instead of failing every read that meets it)
+                    return None
+                self._identity[obj_id] = obj
+                self._index(obj)
+                event = 'load'
+            elif self._versions.get(obj_id) != record['updated_at']:
+                if self.listener is not None:
+                    old_record = self._record.dump(obj)
+                self._unindex(obj)
+                self._record.refresh(obj, record, self._resolve)
+                self._index(obj)
+                event = 'refresh'
+            self._versions[obj_id] = record['updated_at']
+        # (Outside the lock: the listener updates structures guarded by their own locks)
+        if event is not None and self.listener is not None:
+            self.listener(obj, event, old_record)
+        return obj
+
+    def _hydrate_all(self, rows):
+        return [obj for obj in map(self._hydrate, rows) if obj is not None]
+
+    def _check_references(self, conn, values):
+        for column, kind in self._record.foreign_keys.items():
+            if column in values and not conn.execute(f'SELECT 1 FROM {kind} WHERE id = ?', (values[column],)).fetchone():
+                raise ValueError(f"{column} refers to a deleted object !")
+
+    def _check_unique(self, conn, obj_id, values):
+        for column in self._unique:
+            if column in values and conn.execute(
+                    f'SELECT 1 FROM {self._table} WHERE {column} = ? AND id != ?',
+                    (values[column], obj_id)).fetchone():
+                raise ValueError(f"{column} already exists !")
+
+    def add(self, obj):
+        conn = self._pool.connection()
+        values = self._row_values(obj)
+        with self._lock:
+            try:
+                conn.execute(self._sql_insert, values)
+            except sqlite3.IntegrityError:
+                self._check_unique(conn, obj.id, dict(zip(self._columns, values)))
+                self._check_references(conn, dict(zip(self._columns, values)))
+                raise ValueError("Object already exists !")
+            self._identity[obj.id] = obj
+            self._versions[obj.id] = values[2]
+            self._index(obj)
+
+    def add_many(self, objs):
+        conn = self._pool.connection()
+        rows = [self._row_values(obj) for obj in objs]
+        with self._lock:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.executemany(self._sql_insert, rows)
+            except sqlite3.IntegrityError:
+                conn.execute('ROLLBACK')
+                raise ValueError("One of the objects already exists or refers to a deleted object !")
+            conn.execute('COMMIT')
+            for obj, values in zip(objs, rows):
+                self._identity[obj.id] = obj
+                self._versions[obj.id] = values[2]
+                self._index(obj)
+
+    def get(self, obj_id):
+        row = self._pool.connection().execute(self._sql_get, (obj_id,)).fetchone()
+        if row is None:
+            self._forget(obj_id)
+            return None
+        return self._hydrate(row)
+
+    def get_many(self, obj_ids):
+        obj_ids = list(obj_ids)
+        conn = self._pool.connection()
+        found = {}
+        # (One IN query per chunk, below SQLite's limit of bound parameters)
+        for start in range(0, len(obj_ids), MAX_IN_PARAMETERS):
+            chunk = obj_ids[start:start + MAX_IN_PARAMETERS]
+            rows = conn.execute(f'{self._select} WHERE id IN ({", ".join("?" * len(chunk))})', chunk).fetchall()
+            for obj in self._hydrate_all(rows):
+                found[obj.id] = obj
+        for obj_id in obj_ids:
+            if obj_id not in found:
+                self._forget(obj_id)
+        return [found[obj_id] for obj_id in obj_ids if obj_id in found]
+
+    def get_all(self):
+        rows = self._pool.connection().execute(f'{self._select} ORDER BY seq').fetchall()
+        return self._hydrate_all(rows)
+
+    def update(self, obj_id, data):
+        try:
+            with self._lock:
+                obj = self.get(obj_id)
+                if not obj:
+                    return
+                conn = self._pool.connection()
+                self._check_unique(conn, obj_id, {self._lookup_columns[key]: value for key, value in data.items()
+                                                  if key in self._lookup_columns})
+                self._unindex(obj)
+                try:
+                    obj.update(data)
+                finally:
+                    self._index(obj)
+                values = self._row_values(obj)
+                try:
+                    conn.execute(self._sql_update, values[1:] + [obj_id])
+                except sqlite3.IntegrityError:
+                    # (Lost a race with another process)
+                    raise ValueError("Update conflicts with an existing object !")
+                self._versions[obj_id] = values[2]
+        except Exception:
+            # (The object may hold some of the fields already, e.g. a valid price before an invalid
+            # title: it is brought back to the stored row now rather than at its next read, since
+            # index scans like the leaderboards never read its row)
+            self._versions.pop(obj_id, None)
+            self.get(obj_id)
+            raise
+
+    def reindex(self, obj):
+        """Move an object in the indexes after a change made outside update() (e.g. its rating)"""
+        with self._lock:
+            if obj.id in self._identity:
+                self._unindex(obj)
+                self._index(obj)
+
+    def delete(self, obj_id):
+        with self._lock:
+            try:
+                self._pool.connection().execute(self._sql_delete, (obj_id,))
+            except sqlite3.IntegrityError:
+                raise ValueError(f"Cannot delete this {self._table[:-1]}: other objects still refer to it !")
+            self._drop(obj_id)
+
+    def reconcile(self):
+        """Re-read the whole table, loading, refreshing and forgetting objects like reads do
+        (for a process that fell behind the change log)"""
+        present = set()
+        for row in self._pool.connection().execute(f'{self._select} ORDER BY seq').fetchall():
+            self._hydrate(row)
+            present.add(row['id'])
+        for obj_id in set(self._identity).difference(present):
+            self._forget(obj_id)
+
+    def get_by_attribute(self, attr_name, attr_value):
+        column = self._lookup_columns.get(attr_name)
+        if column is None:
+            return next((obj for obj in self.get_all() if getattr(obj, attr_name) == attr_value), None)
+        row = self._pool.connection().execute(
+            f'{self._select} WHERE {column} = ? ORDER BY seq LIMIT 1', (attr_value,)).fetchone()
+        return None if row is None else self._hydrate(row)
+
+    def get_all_by_attribute(self, attr_name, attr_value):
+        column = self._lookup_columns[attr_name]
+        rows = self._pool.connection().execute(
+            f'{self._select} WHERE {column} = ? ORDER BY seq', (attr_value,)).fetchall()
+        return self._hydrate_all(rows)
+
+    def get_page(self, limit, cursor=None):
+        after = 0 if cursor is None else decode_cursor(cursor)
+        # (One extra row tells whether there is a next page)
+        rows = self._pool.connection().execute(self._sql_page, (after, limit + 1)).fetchall()
+        page = self._hydrate_all(rows[:limit])
+        if len(rows) <= limit:
+            return page, None
+        return page, encode_cursor(rows[limit - 1]['seq'])
+
+    def get_page_of(self, objs, limit, cursor=None):
+        after = 0 if cursor is None else decode_cursor(cursor)
+        objs = {obj.id: obj for obj in objs}
+        obj_ids = list(objs)
+        conn = self._pool.connection()
+        seqs = []
+        for start in range(0, len(obj_ids), MAX_IN_PARAMETERS):
+            chunk = obj_ids[start:start + MAX_IN_PARAMETERS]
+            seqs.extend(conn.execute(f'SELECT seq, id FROM {self._table} WHERE seq > ? AND id IN '
+                                     f'({", ".join("?" * len(chunk))})', [after, *chunk]).fetchall())
+        keyed = heapq.nsmallest(limit + 1, ((row['seq'], row['id']) for row in seqs))
+        page = [objs[obj_id] for _, obj_id in keyed[:limit]]
+        if len(keyed) <= limit:
+            return page, None
+        return page, encode_cursor(keyed[limit - 1][0])
+
+    def get_page_by_attribute(self, attr_name, attr_value, limit, cursor=None):
+        after = 0 if cursor is None else decode_cursor(cursor)
+        sql = self._sql_attribute_page.format(column=self._lookup_columns[attr_name])
+        rows = self._pool.connection().execute(sql, (attr_value, after, limit + 1)).fetchall()
+        page = self._hydrate_all(rows[:limit])
+        if len(rows) <= limit:
+            return page, None
+        return page, encode_cursor(rows[limit - 1]['seq'])
+
+    @property
+    def version(self):
+        return self._pool.connection().execute(self._sql_version, (self._table,)).fetchone()['version']
+
+    def add_index(self, index):
+        """Register an in-process index; it is filled from the table and follows every object this process loads"""
+        with self._lock:
+            for obj in self.get_all():
+                index.add(obj)
+            self._secondary_indexes.append(index)
+
+    def _drop(self, obj_id):
+        with self._lock:
+            obj = self._identity.pop(obj_id, None)
+            self._versions.pop(obj_id, None)
+            if obj is not None:
+                self._unindex(obj)
+        return obj
+
+    def _forget(self, obj_id):
+        """Drop the object of a row a read found deleted (by another process)"""
+        obj = self._drop(obj_id)
+        if obj is not None and self.listener is not None:
+            self.listener(obj, 'forget', None)
+
+    def _index(self, obj):
+        for index in self._secondary_indexes:
+            index.add(obj)
+
+    def _unindex(self, obj):
+        for index in self._secondary_indexes:
+            index.remove(obj)
@@ -0,0 +1,53 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from app.services.facade import ITER_PAGE_SIZE
+
+
+class AsyncHBnBFacade:
+    """Asyncio front of an HBnBFacade: every public facade method is available as a coroutine.
+
+    Calls that may block (SQLite queries, waits for the journal's fsync) run on a
+    thread pool. With the in-memory backend they run inline: they only touch
+    dicts and indexes, so a thread hop would cost more than the call itself.
+    The executor hop is per facade call rather than per repository call, since
+    one facade call usually chains several repository and index operations.
+    """
+
+    def __init__(self, facade, executor=None, max_workers=32):
+        self._facade = facade
+        self._own_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hbnb-facade')
+
+    def __getattr__(self, name):
+        method = getattr(self._facade, name)
+        if name.startswith('_') or not callable(method):
+            raise AttributeError(name)
+
+        async def call(*args, **kwargs):
+            return await self.run(method, *args, **kwargs)
+
+        call.__name__ = call.__qualname__ = name
+        call.__doc__ = method.__doc__
+        return call
+
+    async def run(self, func, *args, **kwargs):
+        """Run a blocking callable without blocking the event loop (inline for the in-memory backend)"""
+        if self._facade.backend == 'memory':
+            return func(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def iter_pages(self, kind, page_size=ITER_PAGE_SIZE):
+        """Yield every object of a collection ('users', 'places'...) one page at a time"""
+        get_page = getattr(self._facade, f'get_{kind}_page')
+        page, cursor = await self.run(get_page, page_size)
+        while True:
+            yield page
+            if cursor is None:
+                return
+            page, cursor = await self.run(get_page, page_size, cursor)
+
+    def close(self):
+        if self._own_executor:
+            self._executor.shutdown(wait=True)
@@ -0,0 +1,65 @@
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """Bounded LRU cache of serialized representations, keyed by (kind, obj_id).
+
+    Each entry remembers the ETag it was built for; a lookup with another ETag
+    is a miss, so an entry changed behind the facade's back (e.g. by another
+    process sharing a SQLite file) is never served.
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._entries = OrderedDict()  # (kind, obj_id) -> (etag, body)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0  # (Dropped to respect max_size)
+        self.invalidations = 0  # (Dropped because the object or one it shows changed)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, kind, obj_id, etag):
+        key = (kind, obj_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != etag:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, kind, obj_id, etag, body):
+        if self.max_size <= 0:
+            return
+        key = (kind, obj_id)
+        with self._lock:
+            self._entries[key] = (etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, kind, *obj_ids):
+        with self._lock:
+            for obj_id in obj_ids:
+                if self._entries.pop((kind, obj_id), None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
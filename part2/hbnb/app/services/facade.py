@@ -1,15 +1,297 @@
+import functools
+import gc
+import threading
+from app.persistence.columns import PlaceColumnStore
+from app.persistence.indexes import MembershipIndex, SortedIndex
 from app.persistence.repository import InMemoryRepository
+from app.persistence.search import TextIndex, text_terms
+from app.persistence.spatial import GridIndex, haversine_km
+from app.services.cache import ResponseCache
 from app.models.amenity import Amenity
 from app.models.place import Place
 from app.models.review import Review
 from app.models.user import User
 
+# Attribute indexes of each repository, whatever the storage backend
+REPOSITORY_INDEXES = {
+    'users': {'unique_indexes': ['email']},
+    'amenities': {'unique_indexes': ['name']},
+    'places': {'indexes': ['owner.id']},
+    'reviews': {'indexes': ['place.id', 'user.id']}
+}
+# Objects fetched per repository page when iterating over a whole collection
+ITER_PAGE_SIZE = 1000
+# What deleting an object does to the objects depending on it ("<kind>.<relation>": rule):
+# 'cascade' deletes them (the places offering an amenity lose it instead), 'restrict' refuses
+# the delete while there are any
+DELETE_RULES = {
+    'users.places': 'restrict',
+    'users.reviews': 'cascade',
+    'places.reviews': 'cascade',
+    'amenities.places': 'cascade',
+}
+# kind -> (relation, attribute of the dependent objects holding the id of the object): dependents
+# are queried from their repository, so the SQLite backend sees those of every process
+DEPENDENTS = {
+    'users': (('places', 'owner.id'), ('reviews', 'user.id')),
+    'places': (('reviews', 'place.id'),),
+}
+
+
 class HBnBFacade:
     def __init__(self):
-        self.user_repo = InMemoryRepository()
-        self.place_repo = InMemoryRepository()
-        self.review_repo = InMemoryRepository()
-        self.amenity_repo = InMemoryRepository()
+        self._backend = None
+        self._pool = None
+        self._journal = None
+        # (SQLite backend: the log of the rows every process wrote, and how far this one applied it)
+        self._changes = None
+        self._synced_change = 0
+        self._sync_lock = threading.Lock()
+        # Serialized detail responses, evicted by the write paths below when what they show changes
+        self.response_cache = ResponseCache()
+        # (Review writes and the rating aggregates they maintain change together under this lock;
+        # deletes and bulk creates hold it too, so a batch never links to an object deleted meanwhile)
+        self._rating_lock = threading.RLock()
+        self._columns_lock = threading.Lock()
+        self.delete_rules = dict(DELETE_RULES)
+        self.use_repositories('memory')
+
+    def init_app(self, app):
+        """Use the storage backend selected by the app's configuration"""
+        self.response_cache.max_size = app.config.get('RESPONSE_CACHE_SIZE', self.response_cache.max_size)
+        self.set_delete_rules(app.config.get('DELETE_RULES', {}))
+        repository_type = app.config.get('REPOSITORY', 'memory')
+        if repository_type == 'sqlite':
+            self.use_repositories('sqlite', app.config.get('SQLITE_PATH'))
+            app.before_request(self.sync)
+        elif repository_type == 'journal':
+            self.use_repositories('journal', app.config.get('JOURNAL_DIR'),
+                                  durable=app.config.get('JOURNAL_DURABLE', True),
+                                  compact_interval=app.config.get('JOURNAL_COMPACT_INTERVAL', 300.0))
+        else:
+            self.use_repositories(repository_type)
+
+    def set_delete_rules(self, rules):
+        """Override some of the default delete rules, e.g. {"users.places": "cascade"}"""
+        for relation, rule in rules.items():
+            if relation not in DELETE_RULES:
+                raise ValueError(f"Unknown delete rule: {relation} (known: {', '.join(DELETE_RULES)})")
+            if rule not in ('cascade', 'restrict'):
+                raise ValueError(f"Delete rules are 'cascade' or 'restrict', not {rule!r}")
+        self.delete_rules = {**DELETE_RULES, **rules}
+
+    def use_repositories(self, repository_type, path=None, **options):
+        """Switch to the 'memory', 'sqlite' (path is the database file) or 'journal'
+        (path is the journal directory) repositories; a no-op if they are already in use"""
+        if repository_type not in ('memory', 'sqlite', 'journal'):
+            raise ValueError(f"Unknown repository type: {repository_type}")
+        backend = (repository_type, path)
+        if backend == self._backend:
+            return
+
+        self.close()
+        self.response_cache.clear()
+        # (The SQLite and journal backends are imported on first use, to keep startup light)
+        if repository_type == 'sqlite':
+            from app.persistence.records import RECORDS
+            from app.persistence.sqlite_repository import SQLiteChangeLog, SQLiteConnectionPool, SQLiteRepository
+            self._pool = SQLiteConnectionPool(path)
+            repositories = {kind: SQLiteRepository(self._pool, RECORDS[kind], self._resolve, **indexes)
+                            for kind, indexes in REPOSITORY_INDEXES.items()}
+            self._changes = SQLiteChangeLog(self._pool)
+            # (Read before the indexes are built: changes made meanwhile are applied again, harmlessly)
+            self._synced_change = self._changes.last()
+        elif repository_type == 'journal':
+            from app.persistence.journal import Journal, JournaledRepository
+            from app.persistence.records import RECORDS
+            self._journal = Journal(path, **options)
+            repositories = {kind: JournaledRepository(self._journal, RECORDS[kind], **indexes)
+                            for kind, indexes in REPOSITORY_INDEXES.items()}
+        else:
+            repositories = {kind: InMemoryRepository(**indexes) for kind, indexes in REPOSITORY_INDEXES.items()}
+        self._repositories = repositories
+        self.user_repo = repositories['users']
+        self.amenity_repo = repositories['amenities']
+        self.place_repo = repositories['places']
+        self.review_repo = repositories['reviews']
+        self._backend = backend
+        if self._journal is not None:
+            self._replay_journal()
+        self._build_indexes()
+        if self._changes is not None:
+            for kind, repo in repositories.items():
+                repo.listener = functools.partial(self._apply_change, kind)
+
+    @property
+    def backend(self):
+        """Type of the repositories in use ('memory', 'sqlite' or 'journal'), None once closed"""
+        return self._backend[0] if self._backend else None
+
+    def close(self):
+        """Release the storage backend (connections, journal threads)"""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+            self._changes = None
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        self._backend = None
+
+    def sync(self):
+        """Catch up with the writes other processes made to the SQLite database (a no-op with the
+        other backends): links, rating aggregates, leaderboards and search indexes are kept per
+        process, so they are brought up to date from the rows written since the last call"""
+        if self._changes is None:
+            return
+        with self._sync_lock:
+            changes, self._synced_change = self._changes.since(self._synced_change)
+            if changes == []:
+                return
+            if changes is None:
+                # (Fell behind the pruned log: everything is re-read)
+                for kind in ('users', 'amenities', 'places', 'reviews'):
+                    self._repositories[kind].reconcile()
+            else:
+                changed = {}
+                for kind, obj_id in changes:
+                    changed.setdefault(kind, {})[obj_id] = None
+                # (Re-reading a row reports what changed to _apply_change, see SQLiteRepository)
+                for kind in ('users', 'amenities', 'places', 'reviews'):
+                    if kind in changed:
+                        self._repositories[kind].get_many(changed[kind])
+            self._changes.prune()
+
+    def _apply_change(self, kind, obj, event, old_record):
+        """Bring the structures derived in this process up to date with an object another process
+        wrote: event is 'load' (new object), 'refresh' (old_record holds its previous fields) or 'forget'"""
+        if kind == 'reviews':
+            old_rating = obj.rating if event == 'forget' else old_record['rating'] if event == 'refresh' else None
+            new_rating = None if event == 'forget' else obj.rating
+            with self._rating_lock:
+                if event == 'forget':
+                    self._unlink('reviews', obj)
+                if old_rating != new_rating:
+                    for stats in (obj.place.rating_stats, obj.user.rating_stats):
+                        if old_rating is not None:
+                            stats.remove(old_rating)
+                        if new_rating is not None:
+                            stats.add(new_rating)
+            if event == 'forget':
+                self.place_text.remove_part(obj.place.id, obj.id)
+            elif event == 'load' or old_record['text'] != obj.text:
+                self._index_review_text(obj)
+            self._place_rating_changed(obj.place)
+            self.response_cache.invalidate('users', obj.user.id)
+        elif kind == 'places':
+            if event == 'forget':
+                self._unlink('places', obj)
+                self.place_text.remove_part(obj.id, None)
+            elif event == 'load' or (old_record['title'], old_record['description']) != (obj.title, obj.description):
+                self._index_place_text(obj)
+        elif kind == 'amenities':
+            self.response_cache.invalidate('places', *(place.id for place in self.get_places_by_amenity(obj.id)))
+        self.response_cache.invalidate(kind, obj.id)
+
+    def get_versions(self, *kinds):
+        """Write counters of the given repositories ('users', 'places'...), for collection ETags"""
+        return tuple(self._repositories[kind].version for kind in kinds)
+
+    def get_many(self, kind, obj_ids):
+        """Objects of a repository ('users', 'places'...) with the given ids, in their order; unknown ids are skipped"""
+        return self._repositories[kind].get_many(dict.fromkeys(obj_ids))
+
+    def get_page_of(self, kind, objs, limit, cursor=None):
+        """Page through some objects of a repository in storage order (seq cursors, like the full lists)"""
+        return self._repositories[kind].get_page_of(objs, limit, cursor)
+
+    def _resolve(self, kind, obj_id):
+        return self._repositories[kind].get(obj_id)
+
+    def _replay_journal(self):
+        """Load the journal's snapshot and log tail into the repositories"""
+        # (Millions of new long-lived objects would trigger the cycle collector over and over)
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            self._replay_entries()
+        finally:
+            if gc_enabled:
+                gc.enable()
+        self._journal.start(self._dump_all)
+
+    def _replay_entries(self):
+        for entry in self._journal.load():
+            repo = self._repositories[entry["kind"]]
+            if entry["op"] == 'put_many':
+                repo.restore_many(entry["records"], self._resolve)
+                continue
+            if entry["op"] == 'delete':
+                obj = repo.get(entry["id"])
+                if obj is not None:
+                    self._unlink(entry["kind"], obj)
+                repo.discard(entry["id"])
+                continue
+            try:
+                repo.restore(entry["record"], self._resolve)
+            except LookupError:
+                pass  # (Its place or user was deleted later in the journal)
+
+    def _dump_all(self):
+        """Yield the (kind, record) pairs of every stored object, referenced objects first"""
+        from app.persistence.records import RECORDS
+        for kind in ('users', 'amenities', 'places', 'reviews'):
+            for obj in self._repositories[kind].get_all():
+                yield kind, RECORDS[kind].dump(obj)
+
+    @staticmethod
+    def _iter_repository(repo):
+        """Yield every object of a repository, one page at a time"""
+        page, cursor = repo.get_page(ITER_PAGE_SIZE)
+        while True:
+            yield from page
+            if cursor is None:
+                return
+            page, cursor = repo.get_page(ITER_PAGE_SIZE, cursor)
+
+    def _build_indexes(self):
+        """(Re)build the structures derived from the stored objects"""
+        for review in self.review_repo.get_all():
+            review.place.rating_stats.add(review.rating)
+            review.user.rating_stats.add(review.rating)
+
+        self.place_geo = GridIndex()
+        self.place_repo.add_index(self.place_geo)
+        self.place_amenities = MembershipIndex('amenities')
+        self.place_repo.add_index(self.place_amenities)
+        # Leaderboards: best average rating first (then most reviewed), cheapest first
+        self.place_top_rated = SortedIndex(
+            lambda place: None if place.rating_stats.count == 0
+            else (-place.rating_stats.average, -place.rating_stats.count, place.id))
+        self.place_cheapest = SortedIndex(lambda place: (place.price, place.id))
+        self.place_repo.add_index(self.place_top_rated)
+        self.place_repo.add_index(self.place_cheapest)
+        # Full-text index of the places: their own text and the text of each of their reviews
+        self.place_text = TextIndex()
+        for place in self.place_repo.get_all():
+            self._index_place_text(place)
+        for review in self.review_repo.get_all():
+            self._index_review_text(review)
+        # Vectorized copy of the place scalars, built by the first scan that needs it
+        self._place_columns = None
+        self._place_columns_ready = False
+
+    @property
+    def place_columns(self):
+        """The place column store, None when numpy is not installed"""
+        if not self._place_columns_ready:
+            with self._columns_lock:
+                if not self._place_columns_ready:
+                    if PlaceColumnStore.available:
+                        self._place_columns = PlaceColumnStore()
+                        self.place_repo.add_index(self._place_columns)
+                    self._place_columns_ready = True
+        return self._place_columns
 
     # users
 
@@ -27,8 +309,21 @@ class HBnBFacade:
     def get_all_users(self):
         return self.user_repo.get_all()
 
+    def get_users_page(self, limit, cursor=None):
+        return self.user_repo.get_page(limit, cursor)
+
+    def iter_users(self):
+        return self._iter_repository(self.user_repo)
+
     def update_user(self, user_id, data):
-        self.user_repo.update(user_id, data)
+        try:
+            self.user_repo.update(user_id, data)
+        finally:
+            # (Places show their owner)
+            user = self.get_user(user_id)
+            self.response_cache.invalidate('users', user_id)
+            if user is not None:
+                self.response_cache.invalidate('places', *(place.id for place in user.places))
 
     # amenities
 
@@ -42,12 +337,29 @@ class HBnBFacade:
 
     def get_all_amenities(self):
         return self.amenity_repo.get_all()
+
+    def get_amenities_page(self, limit, cursor=None):
+        return self.amenity_repo.get_page(limit, cursor)
+
+    def iter_amenities(self):
+        return self._iter_repository(self.amenity_repo)
     
     def get_amenity_by_name(self, name):
         return self.amenity_repo.get_by_attribute('name', name)
 
     def update_amenity(self, amenity_id, amenity_data):
-        self.amenity_repo.update(amenity_id, amenity_data)
+        try:
+            self.amenity_repo.update(amenity_id, amenity_data)
+        finally:
+            # (Places show the names of their amenities)
+            self.response_cache.invalidate('amenities', amenity_id)
+            self.response_cache.invalidate('places', *(place.id for place in self.get_places_by_amenity(amenity_id)))
+
+    def get_places_by_amenity(self, amenity_id):
+        return self.place_amenities.get_all_with(amenity_id)
+
+    def get_places_page_by_amenity(self, amenity_id, limit, cursor=None):
+        return self.place_repo.get_page_of(self.get_places_by_amenity(amenity_id), limit, cursor)
 
     # places
 
@@ -55,14 +367,99 @@ class HBnBFacade:
         place = Place(**place_data)
         self.place_repo.add(place)
         place_data["owner"].add_place(place)
+        self._index_place_text(place)
         return place
 
+    def _index_place_text(self, place):
+        # (Title words weigh twice as much as description words)
+        self.place_text.set_part(place.id, None, text_terms((place.title, 2), (place.description, 1)))
+
     def get_place(self, place_id):
         return self.place_repo.get(place_id)
 
     def get_all_places(self):
         return self.place_repo.get_all()
 
+    def get_places_page(self, limit, cursor=None):
+        return self.place_repo.get_page(limit, cursor)
+
+    def iter_places(self):
+        return self._iter_repository(self.place_repo)
+
+    def get_places_with_amenities(self, amenity_ids):
+        """Return the places offering every one of the amenities"""
+        return self.place_amenities.get_all(amenity_ids)
+
+    def place_has_amenities(self, place, amenity_ids):
+        return self.place_amenities.has_all(place, amenity_ids)
+
+    def get_top_places(self, by, n):
+        """Return the n best rated (by='rating') or cheapest (by='price') places"""
+        if by == 'rating':
+            return self.place_top_rated.first(n)
+        if by == 'price':
+            return self.place_cheapest.first(n)
+        raise ValueError("by must be 'rating' or 'price' !")
+
+    def search_places(self, query, limit, offset=0):
+        """Return the (score, place) pairs ranked offset to offset + limit for a full-text query,
+        best match first, and the number of places matching every term"""
+        results, total = self.place_text.search(query, limit, offset)
+        places = ((score, self.place_repo.get(place_id)) for score, place_id in results)
+        return [(score, place) for score, place in places if place is not None], total
+
+    def get_places_in_bbox(self, min_lat, min_lon, max_lat, max_lon):
+        """Return (distance_km, place) pairs inside the box, closest to its center first"""
+        center_lat = (min_lat + max_lat) / 2
+        center_lon = (min_lon + max_lon) / 2
+        if min_lon > max_lon:
+            center_lon = (min_lon + max_lon + 360) / 2
+            if center_lon > 180:
+                center_lon -= 360
+        results = []
+        for lat, lon, place in self.place_geo.within_bbox(min_lat, min_lon, max_lat, max_lon):
+            results.append((haversine_km(center_lat, center_lon, lat, lon), place))
+        results.sort(key=lambda result: result[0])
+        return results
+
+    def get_places_near(self, latitude, longitude, radius_km):
+        """Return (distance_km, place) pairs within radius_km of the point, closest first"""
+        return self.place_geo.near(latitude, longitude, radius_km)
+
+    def filter_places(self, min_price=None, max_price=None, min_rating=None,
+                      latitude=None, longitude=None, radius_km=None):
+        """Return (distance_km, place) pairs matching every given bound.
+
+        Ordered by distance when a point is given, by price otherwise.
+        """
+        if self.place_columns is not None:
+            return self.place_columns.filter(min_price, max_price, min_rating, latitude, longitude, radius_km)
+        return self._filter_place_objects(min_price, max_price, min_rating, latitude, longitude, radius_km)
+
+    def _filter_place_objects(self, min_price=None, max_price=None, min_rating=None,
+                              latitude=None, longitude=None, radius_km=None):
+        results = []
+        for place in self.place_repo.get_all():
+            if min_price is not None and place.price < min_price:
+                continue
+            if max_price is not None and place.price > max_price:
+                continue
+            if min_rating is not None:
+                average = place.rating_stats.average
+                if average is None or average < min_rating:
+                    continue
+            distance = None
+            if latitude is not None:
+                distance = haversine_km(latitude, longitude, place.latitude, place.longitude)
+                if radius_km is not None and distance > radius_km:
+                    continue
+            results.append((distance, place))
+        if latitude is None:
+            results.sort(key=lambda result: result[1].price)
+        else:
+            results.sort(key=lambda result: result[0])
+        return results
+
     def update_place(self, place_id, place_data):
         amenities = place_data.get("amenities")
         if amenities:
@@ -70,7 +467,12 @@ class HBnBFacade:
             for amenity in amenities:
                 place.add_amenity(amenity)
             del place_data["amenities"]
-        self.place_repo.update(place_id, place_data)
+        try:
+            self.place_repo.update(place_id, place_data)
+        finally:
+            self.response_cache.invalidate('places', place_id)
+        if "title" in place_data or "description" in place_data:
+            self._index_place_text(self.get_place(place_id))
 
     # reviews
 
@@ -79,26 +481,310 @@ class HBnBFacade:
         self.review_repo.add(review)
         review_data["user"].add_review(review)
         review_data["place"].add_review(review)
+        with self._rating_lock:
+            review.place.rating_stats.add(review.rating)
+            review.user.rating_stats.add(review.rating)
+        self._ratings_changed([review.place], [review.user])
+        self._index_review_text(review)
         return review
 
+    def _index_review_text(self, review):
+        self.place_text.set_part(review.place.id, review.id, text_terms((review.text, 1)))
+
     def get_review(self, review_id):
         return self.review_repo.get(review_id)
 
     def get_all_reviews(self):
         return self.review_repo.get_all()
 
+    def get_reviews_page(self, limit, cursor=None):
+        return self.review_repo.get_page(limit, cursor)
+
+    def iter_reviews(self):
+        return self._iter_repository(self.review_repo)
+
     def get_reviews_by_place(self, place_id):
-        reviews_by_place = []
-        reviews = self.get_all_reviews()
+        return self.review_repo.get_all_by_attribute('place.id', place_id)
 
-        for review in reviews:
-            if review.place.id == place_id:
-                reviews_by_place.append(review)
+    def get_reviews_by_user(self, user_id):
+        return self.review_repo.get_all_by_attribute('user.id', user_id)
 
-        return reviews_by_place
+    def get_reviews_page_by_place(self, place_id, limit, cursor=None):
+        return self.review_repo.get_page_by_attribute('place.id', place_id, limit, cursor)
+
+    def get_reviews_page_by_user(self, user_id, limit, cursor=None):
+        return self.review_repo.get_page_by_attribute('user.id', user_id, limit, cursor)
 
     def update_review(self, review_id, review_data):
-        self.review_repo.update(review_id, review_data)
+        with self._rating_lock:
+            review = self.get_review(review_id)
+            if not review:
+                return
+            old_rating = review.rating
+            try:
+                self.review_repo.update(review_id, review_data)
+            finally:
+                self.response_cache.invalidate('reviews', review_id)
+            if "text" in review_data:
+                self._index_review_text(review)
+            if review.rating == old_rating:
+                return
+            for stats in (review.place.rating_stats, review.user.rating_stats):
+                stats.remove(old_rating)
+                stats.add(review.rating)
+        self._ratings_changed([review.place], [review.user])
+
+    def _place_rating_changed(self, place):
+        """Move a place in the rating based indexes after one of its reviews changed"""
+        self.response_cache.invalidate('places', place.id)
+        self.place_repo.reindex(place)
+
+    def _ratings_changed(self, places, users):
+        """Stamp the places and users whose rating aggregates this process changed, through their
+        repositories (which also moves the places in the rating based indexes): their stored
+        updated_at is what the validators of their responses follow, in every process"""
+        for place in places:
+            self.place_repo.update(place.id, {})
+        for user in users:
+            self.user_repo.update(user.id, {})
+        self.response_cache.invalidate('places', *(place.id for place in places))
+        self.response_cache.invalidate('users', *(user.id for user in users))
+
+    # deletion
+
+    def delete_user(self, user_id):
+        """Delete a user, and its places and reviews as the delete rules say (ValueError if they forbid it)"""
+        user = self.get_user(user_id)
+        if user:
+            self._delete('users', user)
+
+    def delete_place(self, place_id):
+        """Delete a place, and its reviews as the delete rules say (ValueError if they forbid it)"""
+        place = self.get_place(place_id)
+        if place:
+            self._delete('places', place)
 
     def delete_review(self, review_id):
-        self.review_repo.delete(review_id)
+        review = self.get_review(review_id)
+        if review:
+            self._delete('reviews', review)
+
+    def delete_amenity(self, amenity_id):
+        """Delete an amenity, removing it from the places offering it unless the delete rules forbid it"""
+        amenity = self.get_amenity(amenity_id)
+        if not amenity:
+            return
+        with self._rating_lock:
+            places = self.get_places_by_amenity(amenity_id)
+            if places and self.delete_rules['amenities.places'] == 'restrict':
+                raise ValueError("Cannot delete this amenity: places still offer it !")
+            for place in places:
+                # (Through the repository, so the journal and SQLite drop the link too)
+                self.place_repo.update(place.id, {"amenities": [other for other in place.amenities
+                                                                if other.id != amenity_id]})
+                self.response_cache.invalidate('places', place.id)
+            self.amenity_repo.delete(amenity_id)
+        self.response_cache.invalidate('amenities', amenity_id)
+
+    def _delete(self, kind, obj):
+        with self._rating_lock:
+            plan = {'reviews': {}, 'places': {}, 'users': {}}
+            self._plan_delete(kind, obj, plan)
+            # Dependents first, so the journal never holds an object whose references are gone
+            rated_places, rating_users = {}, {}
+            for review in plan['reviews'].values():
+                self.review_repo.delete(review.id)
+                self._unlink('reviews', review)
+                self.place_text.remove_part(review.place.id, review.id)
+                review.place.rating_stats.remove(review.rating)
+                review.user.rating_stats.remove(review.rating)
+                rated_places[review.place.id] = review.place
+                rating_users[review.user.id] = review.user
+            for place in plan['places'].values():
+                self.place_repo.delete(place.id)
+                self._unlink('places', place)
+                self.place_text.remove_part(place.id, None)
+            for user in plan['users'].values():
+                self.user_repo.delete(user.id)
+        self._ratings_changed([place for place_id, place in rated_places.items() if place_id not in plan['places']],
+                              [user for user_id, user in rating_users.items() if user_id not in plan['users']])
+        for deleted_kind, objects in plan.items():
+            self.response_cache.invalidate(deleted_kind, *objects)
+
+    def _plan_delete(self, kind, obj, plan):
+        """Add an object and the objects its deletion cascades to to the plan ({kind: {id: object}}),
+        ValueError if a restrict rule forbids it"""
+        plan[kind][obj.id] = obj
+        for relation, attr_name in DEPENDENTS.get(kind, ()):
+            related = self._repositories[relation].get_all_by_attribute(attr_name, obj.id)
+            if not related:
+                continue
+            if self.delete_rules[f'{kind}.{relation}'] == 'restrict':
+                raise ValueError(f"Cannot delete this {kind[:-1]}: it still has {relation} !")
+            for other in related:
+                if other.id not in plan[relation]:
+                    self._plan_delete(relation, other, plan)
+
+    @staticmethod
+    def _unlink(kind, obj):
+        """Remove a deleted object from the relationship collections holding it"""
+        if kind == 'reviews':
+            obj.place.remove_review(obj)
+            obj.user.remove_review(obj)
+        elif kind == 'places':
+            obj.owner.remove_place(obj)
+
+    # bulk creation
+
+    def bulk_create_users(self, items):
+        """Create users from API payloads, returns (created users, [{"index", "error"}])"""
+        emails = set()
+
+        def build(item):
+            user = User(first_name=item.get("first_name"), last_name=item.get("last_name"), email=item.get("email"))
+            if user.email in emails or self.get_user_by_email(user.email):
+                raise ValueError("Email already registered")
+            emails.add(user.email)
+            return user
+
+        return self._bulk_create(items, build, self.user_repo)
+
+    def bulk_create_amenities(self, items):
+        """Create amenities from API payloads, returns (created amenities, [{"index", "error"}])"""
+        names = set()
+
+        def build(item):
+            amenity = Amenity(name=item.get("name"))
+            if amenity.name in names or self.get_amenity_by_name(amenity.name):
+                raise ValueError("Amenity already exists")
+            names.add(amenity.name)
+            return amenity
+
+        return self._bulk_create(items, build, self.amenity_repo)
+
+    def bulk_create_places(self, items):
+        """Create places from API payloads (owner_id, amenity ID's), returns (created places, [{"index", "error"}])"""
+        # Every referenced owner and amenity is fetched once for the whole batch
+        owners = self._fetch_referenced(self.user_repo, items, lambda item: [item.get("owner_id")])
+        amenities = self._fetch_referenced(self.amenity_repo, items, lambda item: item.get("amenities"))
+
+        def build(item):
+            owner = owners.get(self._reference_id(item, "owner_id"))
+            if owner is None:
+                raise ValueError("This user does not exist!")
+            amenity_ids = item.get("amenities")
+            if not isinstance(amenity_ids, list) or not all(isinstance(amenity_id, str) for amenity_id in amenity_ids):
+                raise ValueError("amenities must be a list of amenity ID's !")
+            if any(amenity_id not in amenities for amenity_id in amenity_ids):
+                raise ValueError("One of the amenities does not exist!")
+            return Place(title=item.get("title"), description=item.get("description"), price=item.get("price"),
+                         latitude=item.get("latitude"), longitude=item.get("longitude"), owner=owner,
+                         amenities=[amenities[amenity_id] for amenity_id in amenity_ids])
+
+        def references(place):
+            return [(self.user_repo, place.owner.id)] + [(self.amenity_repo, amenity.id) for amenity in place.amenities]
+
+        with self._rating_lock:
+            places, errors = self._bulk_create(items, build, self.place_repo, references)
+            for place in places:
+                place.owner.add_place(place)
+                self._index_place_text(place)
+        return places, errors
+
+    def bulk_create_reviews(self, items):
+        """Create reviews from API payloads (user_id, place_id), returns (created reviews, [{"index", "error"}])"""
+        users = self._fetch_referenced(self.user_repo, items, lambda item: [item.get("user_id")])
+        places = self._fetch_referenced(self.place_repo, items, lambda item: [item.get("place_id")])
+
+        def build(item):
+            user = users.get(self._reference_id(item, "user_id"))
+            if user is None:
+                raise ValueError("This user does not exist!")
+            place = places.get(self._reference_id(item, "place_id"))
+            if place is None:
+                raise ValueError("This place does not exist!")
+            return Review(text=item.get("text"), rating=item.get("rating"), place=place, user=user)
+
+        def references(review):
+            return [(self.user_repo, review.user.id), (self.place_repo, review.place.id)]
+
+        rated_places, rating_users = {}, {}
+        with self._rating_lock:
+            reviews, errors = self._bulk_create(items, build, self.review_repo, references)
+            for review in reviews:
+                review.user.add_review(review)
+                review.place.add_review(review)
+                review.place.rating_stats.add(review.rating)
+                review.user.rating_stats.add(review.rating)
+                rated_places[review.place.id] = review.place
+                rating_users[review.user.id] = review.user
+                self._index_review_text(review)
+        self._ratings_changed(list(rated_places.values()), list(rating_users.values()))
+        return reviews, errors
+
+    @staticmethod
+    def _reference_id(item, key):
+        """The id an item refers to under key, ValueError if it is not a string"""
+        obj_id = item.get(key)
+        if not isinstance(obj_id, str):
+            raise ValueError(f"{key} must be a string !")
+        return obj_id
+
+    @staticmethod
+    def _fetch_referenced(repo, items, referenced_ids):
+        """Map every id referenced by the items to its object, skipping unknown ids"""
+        ids = set()
+        for item in items:
+            if isinstance(item, dict) and isinstance(referenced_ids(item), list):
+                ids.update(obj_id for obj_id in referenced_ids(item) if isinstance(obj_id, str))
+        return {obj.id: obj for obj in repo.get_many(list(ids))}
+
+    @staticmethod
+    def _bulk_create(items, build, repo, references=None):
+        """Validate every item with build(item), then store all the valid ones in a single call
+        (one call per object if that one fails on a unique value or reference written meanwhile).
+        references(obj) lists the (repository, id) pairs an object refers to: they are checked
+        again right before the write (callers hold the lock deletes take), so an object deleted
+        since the items were built only fails the items referring to it"""
+        built, errors = [], []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                errors.append({"index": index, "error": "Each item must be a JSON object !"})
+                continue
+            try:
+                built.append((index, build(item)))
+            except (ValueError, TypeError) as err:
+                errors.append({"index": index, "error": str(err)})
+        if references is not None and built:
+            referenced = {}
+            for _, obj in built:
+                for ref_repo, obj_id in references(obj):
+                    referenced.setdefault(ref_repo, set()).add(obj_id)
+            existing = {(ref_repo, obj.id) for ref_repo, ids in referenced.items()
+                        for obj in ref_repo.get_many(list(ids))}
+            kept = []
+            for index, obj in built:
+                if all(reference in existing for reference in references(obj)):
+                    kept.append((index, obj))
+                else:
+                    errors.append({"index": index, "error": "A referenced object was deleted meanwhile !"})
+            built = kept
+            errors.sort(key=lambda error: error["index"])
+        if built:
+            try:
+                repo.add_many([obj for _, obj in built])
+            except ValueError:
+                # (Lost a race, e.g. with a concurrent registration of the same email: each object is
+                # inserted on its own, the repository checking and inserting it atomically, so only
+                # the objects conflicting with the concurrent writes fail)
+                kept = []
+                for index, obj in built:
+                    try:
+                        repo.add(obj)
+                    except ValueError as err:
+                        errors.append({"index": index, "error": str(err)})
+                    else:
+                        kept.append((index, obj))
+                built = kept
+                errors.sort(key=lambda error: error["index"])
+        return [obj for _, obj in built], errors
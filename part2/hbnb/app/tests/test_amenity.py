@@ -1,3 +1,4 @@
+import json
 import unittest
 from app import create_app
 from app.models.amenity import Amenity
@@ -25,4 +26,41 @@ class TestAmenityEndpoints(unittest.TestCase):
         assert amenity.name == "Wi-Fi"
         print("Amenity creation test passed!")
 
+    def test_list_amenities_with_cursor(self):
+        created = set()
+        for name in ("pool", "sauna", "gym"):
+            created.add(self.client.post('/api/v1/amenities/', json={"name": name}).json.get("id"))
+
+        seen = []
+        response = self.client.get('/api/v1/amenities/?limit=1')
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.json), 1)
+            seen.extend(amenity["id"] for amenity in response.json)
+            cursor = response.headers.get('X-Next-Cursor')
+            if cursor is None:
+                break
+            response = self.client.get(f'/api/v1/amenities/?limit=1&cursor={cursor}')
+
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertTrue(created <= set(seen))
+
+    def test_list_amenities_invalid_limit(self):
+        response = self.client.get('/api/v1/amenities/?limit=0')
+        self.assertEqual(response.status_code, 400)
+
+    def test_stream_amenities(self):
+        created = {self.client.post('/api/v1/amenities/', json={"name": name}).json.get("id")
+                   for name in ("jacuzzi", "terrace")}
+
+        response = self.client.get('/api/v1/amenities/', headers={'Accept': 'application/x-ndjson'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = response.get_data(as_text=True).splitlines()
+        streamed = {json.loads(line)["id"] for line in lines}
+        self.assertTrue(created <= streamed)
+
+        response = self.client.get('/api/v1/amenities/?stream=json')
+        self.assertEqual({amenity["id"] for amenity in response.json}, streamed)
+
     # TODO: Test all amenity endpoints with positive/negative scenarios
\ No newline at end of file
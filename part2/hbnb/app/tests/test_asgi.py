@@ -0,0 +1,85 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+import uuid
+from app import create_app
+from app.asgi import HBnBASGI
+from app.services.async_facade import AsyncHBnBFacade
+from app.services.facade import HBnBFacade
+
+
+def asgi_request(app, method, path, query=b'', headers=(), body=b''):
+    """Run one request through an ASGI app, return (status, headers, body)"""
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query, 'root_path': '',
+             'headers': [(name.encode(), value.encode()) for name, value in headers],
+             'http_version': '1.1', 'scheme': 'http', 'server': ('testserver', 80), 'client': ('127.0.0.1', 1)}
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start = sent[0]
+    response_headers = {name.decode(): value.decode() for name, value in start['headers']}
+    return start['status'], response_headers, b''.join(message.get('body', b'') for message in sent[1:])
+
+
+class TestASGI(unittest.TestCase):
+
+    def setUp(self):
+        self.flask_app = create_app()
+        self.app = HBnBASGI(self.flask_app)
+
+    def test_requests_are_served_by_flask(self):
+        email = f"{uuid.uuid4().hex}@example.com"
+        status, headers, body = asgi_request(
+            self.app, 'POST', '/api/v1/users/', headers=[('content-type', 'application/json')],
+            body=json.dumps({"first_name": "Async", "last_name": "User", "email": email}).encode())
+        self.assertEqual(status, 201)
+        user_id = json.loads(body)["id"]
+
+        status, headers, body = asgi_request(self.app, 'GET', f'/api/v1/users/{user_id}')
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)["email"], email)
+        status, _, _ = asgi_request(self.app, 'GET', f'/api/v1/users/{user_id}',
+                                    headers=[('if-none-match', headers['etag'])])
+        self.assertEqual(status, 304)
+
+    def test_collections_are_streamed_natively(self):
+        self.flask_app.test_client().post('/api/v1/amenities/', json={"name": uuid.uuid4().hex[:20]})
+        status, headers, body = asgi_request(self.app, 'GET', '/api/v1/amenities/', query=b'stream=1')
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['content-type'], 'application/x-ndjson')
+        streamed = [json.loads(line) for line in body.decode().splitlines()]
+
+        # Same body and ETag as the Flask handler
+        response = self.flask_app.test_client().get('/api/v1/amenities/?stream=1')
+        self.assertEqual([json.loads(line) for line in response.get_data(as_text=True).splitlines()], streamed)
+        self.assertEqual(response.headers['ETag'], headers['etag'])
+
+
+class TestAsyncFacade(unittest.TestCase):
+
+    def test_calls_run_in_the_executor_for_sqlite(self):
+        directory = tempfile.TemporaryDirectory()
+        facade = HBnBFacade()
+        facade.use_repositories('sqlite', os.path.join(directory.name, 'hbnb.db'))
+        async_facade = AsyncHBnBFacade(facade)
+
+        async def scenario():
+            user = await async_facade.create_user({"first_name": "A", "last_name": "B", "email": "a@example.com"})
+            pages = [page async for page in async_facade.iter_pages('users', page_size=1)]
+            return user, await async_facade.get_user(user.id), pages
+
+        user, fetched, pages = asyncio.run(scenario())
+        self.assertIs(fetched, user)
+        self.assertEqual(pages, [[user]])
+        async_facade.close()
+        facade.close()
+        directory.cleanup()
@@ -0,0 +1,57 @@
+import unittest
+import uuid
+from app import create_app
+from app.services import facade
+from app.services.cache import ResponseCache
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(max_size=2)
+        cache.put('places', 'a', '"1"', b'a')
+        cache.put('places', 'b', '"1"', b'b')
+        self.assertEqual(cache.get('places', 'a', '"1"'), b'a')
+        cache.put('places', 'c', '"1"', b'c')  # (b is the least recently used)
+        self.assertIsNone(cache.get('places', 'b', '"1"'))
+        self.assertEqual(cache.get('places', 'c', '"1"'), b'c')
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_stale_etag_is_a_miss(self):
+        cache = ResponseCache()
+        cache.put('users', 'a', '"1"', b'a')
+        self.assertIsNone(cache.get('users', 'a', '"2"'))
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+
+class TestResponseCacheInvalidation(unittest.TestCase):
+
+    def setUp(self):
+        self.client = create_app().test_client()
+        self.email = f"{uuid.uuid4().hex}@example.com"
+        self.user_id = self.client.post('/api/v1/users/', json={
+            "first_name": "Cache", "last_name": "Owner", "email": self.email}).json["id"]
+        self.amenity_id = self.client.post('/api/v1/amenities/', json={"name": uuid.uuid4().hex}).json["id"]
+        self.place_id = self.client.post('/api/v1/places/', json={
+            "title": "Cached Loft", "description": "Hot listing", "price": 120.0, "latitude": 5.0,
+            "longitude": 5.0, "owner_id": self.user_id, "amenities": [self.amenity_id]}).json["id"]
+
+    def test_place_is_served_from_the_cache(self):
+        first = self.client.get(f'/api/v1/places/{self.place_id}')
+        hits = facade.response_cache.hits
+        second = self.client.get(f'/api/v1/places/{self.place_id}')
+        self.assertEqual(facade.response_cache.hits, hits + 1)
+        self.assertEqual(first.get_data(), second.get_data())
+
+    def test_owner_and_amenity_updates_evict_the_place(self):
+        self.client.get(f'/api/v1/places/{self.place_id}')
+        self.client.put(f'/api/v1/users/{self.user_id}', json={
+            "first_name": "Renamed", "last_name": "Owner", "email": self.email})
+        self.assertNotIn(('places', self.place_id), facade.response_cache._entries)
+        place = self.client.get(f'/api/v1/places/{self.place_id}').json
+        self.assertEqual(place["owner"]["first_name"], "Renamed")
+
+        self.client.put(f'/api/v1/amenities/{self.amenity_id}', json={"name": "Hammam " + self.user_id[:8]})
+        self.assertNotIn(('places', self.place_id), facade.response_cache._entries)
+        place = self.client.get(f'/api/v1/places/{self.place_id}').json
+        self.assertEqual(place["amenities"][0]["name"], "Hammam " + self.user_id[:8])
@@ -0,0 +1,199 @@
+import sys
+import threading
+import time
+import unittest
+import uuid
+from operator import attrgetter
+from random import Random
+from types import SimpleNamespace
+from app import create_app
+from app.models.user import User
+from app.persistence.indexes import SortedIndex
+from app.persistence.repository import InMemoryRepository
+from app.services.facade import HBnBFacade
+
+THREADS = 16
+
+
+def _yielding_email(user):
+    time.sleep(0)  # (Gives the other threads a chance to run between a unique check and the insert)
+    return user._email
+
+
+class YieldingUser(User):
+    """User whose email reads let other threads run, to widen the check-then-insert window"""
+    __slots__ = ()
+    email = property(_yielding_email, User.email.fset)
+
+
+def hammer(target, threads=THREADS):
+    """Run target(thread_index) on many threads started together, return the exceptions raised"""
+    barrier = threading.Barrier(threads)
+    errors = []
+
+    def run(index):
+        barrier.wait()
+        try:
+            target(index)
+        except Exception as err:  # (Reported by the test)
+            errors.append(err)
+
+    workers = [threading.Thread(target=run, args=(index,)) for index in range(threads)]
+    # (Switching threads very often makes the interleavings a race needs likely)
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    finally:
+        sys.setswitchinterval(interval)
+    return errors
+
+
+class TestConcurrentRepository(unittest.TestCase):
+
+    def test_insert_if_unique_is_atomic(self):
+        repo = InMemoryRepository(unique_indexes=['email'])
+        created = []
+
+        def register(index):
+            for attempt in range(200):
+                user = YieldingUser(first_name="Race", last_name="Condition", email=f"user{attempt % 50}@example.com")
+                try:
+                    repo.add(user)
+                except ValueError:
+                    continue
+                created.append(user)
+
+        self.assertEqual(hammer(register), [])
+        emails = [user.email for user in repo.get_all()]
+        self.assertEqual(len(emails), 50)
+        self.assertEqual(len(set(emails)), 50)
+        self.assertEqual(len(created), 50)
+
+    def test_reads_see_consistent_snapshots_during_writes(self):
+        repo = InMemoryRepository(indexes=['last_name'])
+        done = threading.Event()
+
+        def work(index):
+            if index % 2 == 0:
+                # Writers: add users and delete half of them, which compacts the page order
+                for number in range(300):
+                    user = User(first_name="W", last_name=f"writer{index}", email=f"w{index}.{number}@example.com")
+                    repo.add(user)
+                    if number % 2:
+                        repo.delete(user.id)
+                done.set()
+                return
+            while not done.is_set():
+                repo.get_all()
+                repo.get_all_by_attribute('last_name', 'writer0')
+                seen, cursor = [], None
+                while True:
+                    page, cursor = repo.get_page(7, cursor)
+                    seen.extend(user.id for user in page)
+                    if cursor is None:
+                        break
+                if len(seen) != len(set(seen)):
+                    raise AssertionError("A page walk returned an object twice")
+
+        self.assertEqual(hammer(work), [])
+        self.assertEqual(len(repo.get_all()), THREADS // 2 * 150)
+
+    def test_index_reads_see_consistent_snapshots_during_writes(self):
+        repo = InMemoryRepository(unique_indexes=['email'])
+        ranking = SortedIndex(attrgetter('price'))
+        ranking.BLOCK_SIZE = 4  # (Tiny blocks: the writes split and merge them all the time)
+        kept = [SimpleNamespace(id=f"kept{number}", price=number * 10.0) for number in range(20)]
+        for obj in kept:
+            ranking.add(obj)
+        kept_ids = {obj.id for obj in kept}
+        done = threading.Event()
+
+        def work(index):
+            if index % 2 == 0:
+                random = Random(index)
+                for number in range(300):
+                    obj = SimpleNamespace(id=f"{index}.{number}", price=random.uniform(0, 200))
+                    user = User(first_name="W", last_name="Writer", email=f"w{index}.{number % 3}@example.com")
+                    ranking.add(obj)
+                    repo.add(user)
+                    if number % 2:
+                        ranking.remove(obj)
+                    repo.delete(user.id)
+                done.set()
+                return
+            while not done.is_set():
+                repo.get_by_attribute('email', f"w{index - 1}.0@example.com")
+                found = ranking.first(10 ** 6)
+                ids = [obj.id for obj in found]
+                if len(ids) != len(set(ids)):
+                    raise AssertionError("The leaderboard returned an object twice")
+                if not kept_ids.issubset(ids):
+                    raise AssertionError("The leaderboard skipped an object")
+                if [obj.price for obj in found] != sorted(obj.price for obj in found):
+                    raise AssertionError("The leaderboard is out of order")
+
+        self.assertEqual(hammer(work), [])
+        self.assertEqual(len(ranking), len(kept) + THREADS // 2 * 150)
+
+
+class TestConcurrentFacade(unittest.TestCase):
+
+    def test_rating_stats_stay_exact(self):
+        facade = HBnBFacade()
+        owner = facade.create_user({"first_name": "Stress", "last_name": "Owner", "email": "stress@example.com"})
+        place = facade.create_place({"title": "Busy Place", "description": None, "price": 50.0, "latitude": 1.0,
+                                     "longitude": 1.0, "owner": owner, "amenities": []})
+
+        def review(index):
+            for number in range(50):
+                created = facade.create_review({"text": "Racing", "rating": number % 5 + 1,
+                                                "place": place, "user": owner})
+                if number % 3 == 0:
+                    facade.update_review(created.id, {"rating": 5})
+                if number % 4 == 0:
+                    facade.delete_review(created.id)
+
+        self.assertEqual(hammer(review), [])
+        ratings = [review.rating for review in facade.get_reviews_by_place(place.id)]
+        self.assertEqual(place.rating_stats.count, len(ratings))
+        self.assertEqual(place.rating_stats.total, sum(ratings))
+        self.assertEqual(facade.get_top_places('rating', 1), [place])
+
+    def test_concurrent_registrations_of_one_email(self):
+        client = create_app().test_client()
+        email = f"{uuid.uuid4().hex}@example.com"
+        statuses = []
+
+        def register(index):
+            response = client.post('/api/v1/users/', json={"first_name": "Same", "last_name": "Email", "email": email})
+            statuses.append(response.status_code)
+
+        self.assertEqual(hammer(register), [])
+        self.assertEqual(sorted(statuses), [201] + [400] * (THREADS - 1))
+
+    def test_concurrent_bulk_registrations_fail_per_item(self):
+        facade = HBnBFacade()
+        email = f"{uuid.uuid4().hex}@example.com"
+        results = []
+        check = facade.get_user_by_email
+
+        def slow_check(value):
+            found = check(value)
+            time.sleep(0.01)  # (Every batch checks the email before any of them inserts it)
+            return found
+
+        facade.get_user_by_email = slow_check
+
+        def register(index):
+            results.append(facade.bulk_create_users([
+                {"first_name": "Same", "last_name": "Email", "email": email},
+                {"first_name": "Own", "last_name": "Email", "email": f"{index}.{email}"}]))
+
+        self.assertEqual(hammer(register), [])
+        # (Whatever the interleaving, each batch keeps its unique item)
+        self.assertEqual(sum(len(users) for users, _ in results), THREADS + 1)
+        self.assertEqual(sorted(error["index"] for _, errors in results for error in errors), [0] * (THREADS - 1))
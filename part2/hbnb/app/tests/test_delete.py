@@ -0,0 +1,144 @@
+import gc
+import os
+import sys
+import unittest
+import uuid
+from unittest.mock import patch
+from app import create_app
+from app.services.facade import HBnBFacade
+from config import parse_delete_rules
+
+# Reviews created and deleted by the leak test (HBNB_LEAK_TEST_REVIEWS=1000000 for the full run)
+LEAK_TEST_REVIEWS = int(os.getenv('HBNB_LEAK_TEST_REVIEWS', 50000))
+LEAK_TEST_BATCH = 10000
+
+
+class TestDelete(unittest.TestCase):
+
+    def setUp(self):
+        self.facade = HBnBFacade()
+        self.owner = self.facade.create_user({"first_name": "Jane", "last_name": "Doe", "email": "jane@example.com"})
+        self.guest = self.facade.create_user({"first_name": "John", "last_name": "Doe", "email": "john@example.com"})
+        self.wifi = self.facade.create_amenity({"name": "Wi-Fi"})
+        self.place = self.facade.create_place({"title": "Cozy Apartment", "description": "Quiet", "price": 100.0,
+                                               "latitude": 1.0, "longitude": 1.0, "owner": self.owner,
+                                               "amenities": [self.wifi]})
+        self.review = self.facade.create_review({"text": "Great stay", "rating": 4, "place": self.place,
+                                                 "user": self.guest})
+
+    def test_delete_review_unlinks_it(self):
+        self.facade.delete_review(self.review.id)
+        self.assertEqual(self.place.reviews, [])
+        self.assertEqual(self.guest.reviews, [])
+        self.assertEqual(self.guest.rating_stats.count, 0)
+        self.assertEqual(self.facade.search_places("great", 10), ([], 0))
+
+    def test_restrict_and_cascade(self):
+        # (By default a user owning places cannot be deleted)
+        with self.assertRaises(ValueError):
+            self.facade.delete_user(self.owner.id)
+        self.assertIs(self.facade.get_user(self.owner.id), self.owner)
+
+        self.facade.delete_user(self.guest.id)
+        self.assertIsNone(self.facade.get_review(self.review.id))
+        self.assertEqual(self.place.rating_stats.count, 0)
+
+        self.facade.set_delete_rules({"users.places": "cascade"})
+        self.facade.delete_user(self.owner.id)
+        self.assertIsNone(self.facade.get_place(self.place.id))
+        self.assertEqual(self.facade.get_top_places('price', 10), [])
+        self.assertEqual(self.facade.get_places_near(1.0, 1.0, 10), [])
+        self.assertEqual(self.facade.search_places("cozy", 10), ([], 0))
+
+    def test_delete_place_restricted_by_its_reviews(self):
+        self.facade.set_delete_rules({"places.reviews": "restrict"})
+        with self.assertRaises(ValueError):
+            self.facade.delete_place(self.place.id)
+        self.facade.delete_review(self.review.id)
+        self.facade.delete_place(self.place.id)
+        self.assertEqual(self.owner.places, [])
+
+    def test_delete_amenity_removes_it_from_places(self):
+        self.facade.delete_amenity(self.wifi.id)
+        self.assertIsNone(self.facade.get_amenity(self.wifi.id))
+        self.assertEqual(self.place.amenities, [])
+        self.assertEqual(self.facade.get_places_with_amenities([self.wifi.id]), [])
+
+    def test_bulk_create_skips_objects_deleted_meanwhile(self):
+        # (The owner is deleted after the batch fetched it, before the batch is stored)
+        gone = self.facade.create_user({"first_name": "Gone", "last_name": "Soon", "email": "gone@example.com"})
+        fetched = {self.owner.id: self.owner, gone.id: gone}
+        self.facade.delete_user(gone.id)
+        item = {"title": "Loft", "description": "", "price": 10.0, "latitude": 1.0, "longitude": 1.0,
+                "amenities": []}
+        with patch.object(self.facade, '_fetch_referenced', side_effect=[fetched, {}]):
+            places, errors = self.facade.bulk_create_places([{**item, "owner_id": gone.id},
+                                                             {**item, "owner_id": self.owner.id}])
+        self.assertEqual([place.owner for place in places], [self.owner])
+        self.assertEqual(errors, [{"index": 0, "error": "A referenced object was deleted meanwhile !"}])
+        self.assertEqual(gone.places, [])
+
+    def test_invalid_delete_rules(self):
+        with self.assertRaises(ValueError):
+            self.facade.set_delete_rules({"users.amenities": "cascade"})
+        with self.assertRaises(ValueError):
+            self.facade.set_delete_rules({"users.places": "nullify"})
+        self.assertEqual(parse_delete_rules(" users.places = cascade,, places.reviews=restrict "),
+                         {"users.places": "cascade", "places.reviews": "restrict"})
+        for value in ("users.places", "users=cascade", "users.places=nullify"):
+            with self.assertRaisesRegex(ValueError, "HBNB_DELETE_RULES"):
+                parse_delete_rules(value)
+
+    def test_deleted_amenities_free_their_ordinals(self):
+        index = self.facade.place_amenities
+        for _ in range(20):
+            amenity = self.facade.create_amenity({"name": f"Sauna {uuid.uuid4()}"})
+            self.facade.update_place(self.place.id, {"amenities": [amenity]})
+            self.facade.delete_amenity(amenity.id)
+        self.assertEqual(len(index._members), 2)
+        self.assertEqual(self.facade.get_places_with_amenities([self.wifi.id]), [self.place])
+
+    def test_deleted_reviews_do_not_leak(self):
+        item = {"text": "Nice stay", "rating": 4, "user_id": self.guest.id, "place_id": self.place.id}
+
+        def churn(count):
+            for _ in range(0, count, LEAK_TEST_BATCH):
+                reviews, _ = self.facade.bulk_create_reviews([item] * min(LEAK_TEST_BATCH, count))
+                for review in reviews:
+                    self.facade.delete_review(review.id)
+            gc.collect()
+
+        churn(LEAK_TEST_BATCH)  # (Warm-up: lets the repository and index arrays reach their working size)
+        blocks = sys.getallocatedblocks()
+        churn(LEAK_TEST_REVIEWS)
+        # One leaked object per review would be at least LEAK_TEST_REVIEWS blocks
+        self.assertLess(sys.getallocatedblocks() - blocks, 1000)
+        self.assertEqual(self.place.reviews, [self.review])
+        self.assertEqual(self.guest.reviews, [self.review])
+        self.assertEqual(self.place.rating_stats.count, 1)
+        self.assertEqual(len(self.facade.get_all_reviews()), 1)
+
+
+class TestDeleteEndpoints(unittest.TestCase):
+
+    def setUp(self):
+        self.client = create_app().test_client()
+
+    def test_delete_endpoints(self):
+        word = uuid.uuid4().hex
+        user_id = self.client.post('/api/v1/users/', json={
+            "first_name": "Del", "last_name": "Ete", "email": f"{word}@example.com"}).json["id"]
+        amenity_id = self.client.post('/api/v1/amenities/', json={"name": f"Sauna {word}"}).json["id"]
+        place_id = self.client.post('/api/v1/places/', json={
+            "title": "Gone soon", "description": "", "price": 40.0, "latitude": 5.0, "longitude": 5.0,
+            "owner_id": user_id, "amenities": [amenity_id]}).json["id"]
+
+        self.assertEqual(self.client.delete(f'/api/v1/amenities/{amenity_id}').status_code, 200)
+        self.assertEqual(self.client.get(f'/api/v1/places/{place_id}').json["amenities"], [])
+        response = self.client.delete(f'/api/v1/users/{user_id}')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('places', response.json['error'])
+        self.assertEqual(self.client.delete(f'/api/v1/places/{place_id}').status_code, 200)
+        self.assertEqual(self.client.get(f'/api/v1/places/{place_id}').status_code, 404)
+        self.assertEqual(self.client.delete(f'/api/v1/users/{user_id}').status_code, 200)
+        self.assertEqual(self.client.delete(f'/api/v1/users/{user_id}').status_code, 404)
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+from app.persistence.journal import LOG_FILE, SNAPSHOT_FILE
+from app.services.facade import HBnBFacade
+
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.facade = self.open_facade()
+
+    def tearDown(self):
+        self.facade.close()
+        self.directory.cleanup()
+
+    def open_facade(self):
+        facade = HBnBFacade()
+        facade.use_repositories('journal', self.directory.name, compact_interval=0)
+        return facade
+
+    def reopen(self):
+        self.facade.close()
+        self.facade = self.open_facade()
+        return self.facade
+
+    def seed(self):
+        owner = self.facade.create_user({"first_name": "Jane", "last_name": "Doe", "email": "jane@example.com"})
+        wifi = self.facade.create_amenity({"name": "Wi-Fi"})
+        place = self.facade.create_place({"title": "Cozy Apartment", "description": None, "price": 100.0,
+                                          "latitude": 37.7749, "longitude": -122.4194, "owner": owner,
+                                          "amenities": [wifi]})
+        review = self.facade.create_review({"text": "Great stay!", "rating": 4, "place": place, "user": owner})
+        return owner, wifi, place, review
+
+    def test_replay_log(self):
+        owner, wifi, place, review = self.seed()
+        self.facade.update_place(place.id, {"price": 80.0})
+        self.facade.delete_review(review.id)
+
+        facade = self.reopen()
+        loaded = facade.get_place(place.id)
+        self.assertEqual(loaded.price, 80.0)
+        self.assertIs(loaded.owner, facade.get_user_by_email("jane@example.com"))
+        self.assertEqual([amenity.id for amenity in loaded.amenities], [wifi.id])
+        self.assertIsNone(facade.get_review(review.id))
+        self.assertEqual(loaded.reviews, [])
+        self.assertEqual(facade.get_top_places('price', 1), [loaded])
+
+    def test_replay_cascading_deletes(self):
+        owner, wifi, place, review = self.seed()
+        self.facade.delete_amenity(wifi.id)
+        self.facade.set_delete_rules({"users.places": "cascade"})
+        self.facade.delete_user(owner.id)
+
+        facade = self.reopen()
+        self.assertEqual(facade.get_all_users(), [])
+        self.assertEqual(facade.get_all_amenities(), [])
+        self.assertEqual(facade.get_all_places(), [])
+        self.assertEqual(facade.get_all_reviews(), [])
+
+    def test_snapshot_and_log_tail(self):
+        owner, wifi, place, review = self.seed()
+        self.facade._journal.compact()
+        self.assertEqual(os.path.getsize(os.path.join(self.directory.name, LOG_FILE)), 0)
+        self.facade.update_review(review.id, {"rating": 2})
+
+        facade = self.reopen()
+        self.assertTrue(os.path.exists(os.path.join(self.directory.name, SNAPSHOT_FILE)))
+        self.assertEqual(facade.get_review(review.id).rating, 2)
+        self.assertEqual(facade.get_place(place.id).rating_stats.average, 2)
+        self.assertEqual(facade.get_reviews_by_user(owner.id)[0].id, review.id)
+
+    def test_torn_last_entry_is_dropped(self):
+        owner, wifi, place, review = self.seed()
+        self.facade.close()
+        with open(os.path.join(self.directory.name, LOG_FILE), 'ab') as log:
+            log.write(b'{"seq": 99, "op": "pu')
+
+        facade = self.open_facade()
+        self.facade = facade
+        facade.create_amenity({"name": "Parking"})
+        facade = self.reopen()
+        self.assertIsNotNone(facade.get_amenity_by_name("Parking"))
+        self.assertIsNotNone(facade.get_review(review.id))
@@ -0,0 +1,60 @@
+import unittest
+import uuid
+from app import create_app
+from app.metrics import Histogram, metrics
+from app.persistence.repository import InMemoryRepository
+from app.services.facade import HBnBFacade
+from config import Config
+
+
+class MetricsConfig(Config):
+    METRICS_ENABLED = True
+
+
+class TestMetrics(unittest.TestCase):
+
+    def tearDown(self):
+        metrics.uninstrument()
+
+    def test_disabled_by_default(self):
+        client = create_app().test_client()
+        self.assertEqual(client.get('/metrics').status_code, 404)
+        self.assertNotIn('__wrapped__', vars(HBnBFacade.get_user))
+
+    def test_requests_and_calls_are_timed(self):
+        client = create_app(MetricsConfig).test_client()
+        response = client.post('/api/v1/users/', json={
+            "first_name": "Metric", "last_name": "User", "email": f"{uuid.uuid4().hex}@example.com"})
+        client.get(f"/api/v1/users/{response.json['id']}")
+        client.get('/api/v1/users/missing')
+
+        response = client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        text = response.get_data(as_text=True)
+        self.assertIn('hbnb_http_request_duration_seconds_count'
+                      '{method="GET",route="/api/v1/users/<user_id>",status="404"}', text)
+        self.assertIn('hbnb_method_duration_seconds_count{class="HBnBFacade",method="create_user"}', text)
+        self.assertIn('hbnb_method_duration_seconds_count{class="InMemoryRepository",method="get"}', text)
+        self.assertIn('hbnb_response_cache_misses_total', text)
+
+    def test_uninstrument_restores_the_methods(self):
+        original = InMemoryRepository.get
+        metrics.instrument(InMemoryRepository)
+        self.assertIsNot(InMemoryRepository.get, original)
+        metrics.uninstrument()
+        self.assertIs(InMemoryRepository.get, original)
+
+
+class TestHistogram(unittest.TestCase):
+
+    def test_buckets_are_cumulative(self):
+        histogram = Histogram('latency_seconds', 'Latency.', ('route',))
+        for seconds in (0.00005, 0.003, 0.003, 20.0):
+            histogram.observe(('/a"b',), seconds)
+        lines = histogram.render()
+        self.assertIn('latency_seconds_bucket{route="/a\\"b",le="0.0001"} 1', lines)
+        self.assertIn('latency_seconds_bucket{route="/a\\"b",le="0.005"} 3', lines)
+        self.assertIn('latency_seconds_bucket{route="/a\\"b",le="10.0"} 3', lines)
+        self.assertIn('latency_seconds_bucket{route="/a\\"b",le="+Inf"} 4', lines)
+        self.assertIn('latency_seconds_count{route="/a\\"b"} 4', lines)
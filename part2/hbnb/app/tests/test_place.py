@@ -2,9 +2,12 @@ from app.models.place import Place
 from app.models.review import Review
 from app.models.user import User
 
+import json
 import unittest
+import uuid
 from app import create_app
 from app.models.user import User
+from app.services.facade import HBnBFacade
 
 class TestPlaceEndpoints(unittest.TestCase):
 
@@ -57,4 +60,398 @@ class TestPlaceEndpoints(unittest.TestCase):
         assert place.reviews[0].text == "Great stay!"
         print("Place creation and relationship test passed!")
 
+    def test_update_ignores_related_reviews(self):
+        user_id = self.client.post('/api/v1/users/', json={
+            "first_name": "Rel", "last_name": "Ations", "email": f"{uuid.uuid4()}@example.com"}).json["id"]
+        place_id = self.client.post('/api/v1/places/', json={
+            "title": "Linked", "description": "Two rooms", "price": 10.0, "latitude": 1.0, "longitude": 1.0,
+            "owner_id": user_id, "amenities": []}).json["id"]
+        self.client.post('/api/v1/reviews/', json={
+            "text": "Kept", "rating": 4, "user_id": user_id, "place_id": place_id})
+
+        response = self.client.put(f'/api/v1/places/{place_id}', json={"reviews": [{"text": "Replaced"}]})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(f'/api/v1/places/{place_id}', query_string={'include': 'reviews'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([review["text"] for review in response.json["included"]["reviews"]], ["Kept"])
+        response = self.client.put(f'/api/v1/users/{user_id}', json={"places": [{}], "reviews": [{}]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.client.get(f'/api/v1/users/{user_id}', query_string={'include': 'places'})
+                             .json["included"]["places"]), 1)
+
+    def test_search_places_by_area(self):
+        user_id = self.client.post('/api/v1/users/', json={
+            "first_name": "Geo",
+            "last_name": "Grapher",
+            "email": "geo.grapher@example.com"
+        }).json.get("id")
+        place_ids = []
+        for title, latitude, longitude in (("Louvre flat", 48.8606, 2.3376),
+                                           ("Montmartre loft", 48.8867, 2.3431),
+                                           ("Old Port studio", 43.2951, 5.3740)):
+            place_ids.append(self.client.post('/api/v1/places/', json={
+                "title": title,
+                "description": title,
+                "price": 90.0,
+                "latitude": latitude,
+                "longitude": longitude,
+                "owner_id": user_id,
+                "amenities": []
+            }).json.get("id"))
+
+        response = self.client.get('/api/v1/places/?near=48.8584,2.2945&radius_km=10')
+        self.assertEqual(response.status_code, 200)
+        found = [place["id"] for place in response.json if place["id"] in place_ids]
+        self.assertEqual(found, place_ids[:2])
+
+        response = self.client.get('/api/v1/places/?bbox=43,5,44,6')
+        self.assertIn(place_ids[2], [place["id"] for place in response.json])
+        self.assertNotIn(place_ids[0], [place["id"] for place in response.json])
+
+        # Moving a place moves it in the index too
+        self.client.put(f'/api/v1/places/{place_ids[2]}', json={"latitude": 48.87, "longitude": 2.30})
+        response = self.client.get('/api/v1/places/?bbox=43,5,44,6')
+        self.assertNotIn(place_ids[2], [place["id"] for place in response.json])
+        response = self.client.get('/api/v1/places/?near=48.8584,2.2945&radius_km=10')
+        self.assertIn(place_ids[2], [place["id"] for place in response.json])
+        for radius in ("0", "-1", "nan", "inf"):
+            response = self.client.get(f'/api/v1/places/?near=48.8584,2.2945&radius_km={radius}')
+            self.assertEqual(response.status_code, 400)
+
+    def test_area_search_pages_keep_their_order(self):
+        user_id = self.client.post('/api/v1/users/', json={
+            "first_name": "Key", "last_name": "Set", "email": f"{uuid.uuid4()}@example.com"}).json["id"]
+        place_ids = [self.client.post('/api/v1/places/', json={
+            "title": f"Pier {number}", "description": "", "price": 50.0, "latitude": -60.0 + number / 100,
+            "longitude": -40.0, "owner_id": user_id, "amenities": []}).json["id"] for number in range(4)]
+        url = '/api/v1/places/?near=-60,-40&radius_km=50&limit=2'
+        response = self.client.get(url)
+        self.assertEqual([place["id"] for place in response.json], place_ids[:2])
+        # (The cursor holds the distance of the last place sent: deleting a place of the
+        # first page does not make the next one skip a place)
+        self.client.delete(f'/api/v1/places/{place_ids[0]}')
+        response = self.client.get(f"{url}&cursor={response.headers['X-Next-Cursor']}")
+        self.assertEqual([place["id"] for place in response.json], place_ids[2:])
+        self.assertEqual(self.client.get(f'{url}&cursor=bm9wZQ').status_code, 400)
+
+    def test_search_places_invalid_area(self):
+        response = self.client.get('/api/v1/places/?near=48.85,2.29')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/v1/places/?bbox=1,2,3')
+        self.assertEqual(response.status_code, 400)
+
+    def test_filter_places_by_price(self):
+        user_id = self.client.post('/api/v1/users/', json={
+            "first_name": "Penny",
+            "last_name": "Pincher",
+            "email": "penny.pincher@example.com"
+        }).json.get("id")
+        place_ids = []
+        for price in (12345.0, 12347.0, 12349.0):
+            place_ids.append(self.client.post('/api/v1/places/', json={
+                "title": "Priced place",
+                "description": "Somewhere",
+                "price": price,
+                "latitude": 10.0,
+                "longitude": 10.0,
+                "owner_id": user_id,
+                "amenities": []
+            }).json.get("id"))
+
+        response = self.client.get('/api/v1/places/?min_price=12346&max_price=12349')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([place["id"] for place in response.json], place_ids[1:])
+        for bounds in ("min_price=nan", "max_price=inf", "min_price=-inf&max_price=10"):
+            self.assertEqual(self.client.get(f'/api/v1/places/?{bounds}').status_code, 400)
+
+    def test_column_store_matches_object_walk(self):
+        facade = HBnBFacade()
+        owner = facade.create_user({"first_name": "Ann", "last_name": "Lee", "email": "ann.lee@example.com"})
+        for index in range(20):
+            facade.create_place({"title": f"Place {index}", "description": None, "price": float(index * 7 % 20),
+                                 "latitude": 40.0 + index / 10, "longitude": 3.0, "owner": owner, "amenities": []})
+        bounds = {"min_price": 3.0, "max_price": 15.0, "latitude": 40.5, "longitude": 3.0, "radius_km": 80.0}
+        if facade.place_columns is None:
+            self.skipTest("numpy is not installed")
+        expected = facade._filter_place_objects(**bounds)
+        self.assertEqual([place for _, place in facade.filter_places(**bounds)],
+                         [place for _, place in expected])
+
+    def test_filter_places_by_amenities(self):
+        user_id = self.client.post('/api/v1/users/', json={
+            "first_name": "Amy",
+            "last_name": "Nity",
+            "email": "amy.nity@example.com"
+        }).json.get("id")
+        wifi_id = self.client.post('/api/v1/amenities/', json={"name": "Fiber"}).json.get("id")
+        parking_id = self.client.post('/api/v1/amenities/', json={"name": "Garage"}).json.get("id")
+        place_ids = []
+        for amenities in ([wifi_id], [wifi_id, parking_id], []):
+            place_ids.append(self.client.post('/api/v1/places/', json={
+                "title": "Equipped place",
+                "description": "Somewhere",
+                "price": 75.0,
+                "latitude": 45.0,
+                "longitude": 4.8,
+                "owner_id": user_id,
+                "amenities": amenities
+            }).json.get("id"))
+
+        response = self.client.get(f'/api/v1/places/?amenities={wifi_id},{parking_id}')
+        self.assertEqual([place["id"] for place in response.json], [place_ids[1]])
+        response = self.client.get(f'/api/v1/amenities/{wifi_id}/places')
+        self.assertEqual([place["id"] for place in response.json], place_ids[:2])
+
+        # Amenities added through an update are indexed too
+        self.client.put(f'/api/v1/places/{place_ids[2]}', json={"amenities": [parking_id, wifi_id]})
+        response = self.client.get(f'/api/v1/places/?amenities={parking_id},{wifi_id}')
+        self.assertEqual([place["id"] for place in response.json], [place_ids[1], place_ids[2]])
+
+        response = self.client.get('/api/v1/places/?amenities=bad_id')
+        self.assertEqual(response.status_code, 400)
+
+    def test_leaderboards(self):
+        facade = HBnBFacade()
+        owner = facade.create_user({"first_name": "Lea", "last_name": "Derboard", "email": "lea@example.com"})
+        places = [facade.create_place({"title": f"Place {price}", "description": None, "price": price,
+                                       "latitude": 0.0, "longitude": 0.0, "owner": owner, "amenities": []})
+                  for price in (30.0, 10.0, 20.0)]
+        for place, rating in zip(places, (4, 5, 2)):
+            facade.create_review({"text": "Nice", "rating": rating, "place": place, "user": owner})
+
+        self.assertEqual(facade.get_top_places('price', 2), [places[1], places[2]])
+        self.assertEqual(facade.get_top_places('rating', 3), [places[1], places[0], places[2]])
+
+        facade.update_place(places[0].id, {"price": 5.0})
+        review = facade.create_review({"text": "Awful", "rating": 1, "place": places[1], "user": owner})
+        self.assertEqual(facade.get_top_places('price', 1), [places[0]])
+        self.assertEqual(facade.get_top_places('rating', 1), [places[0]])
+
+        facade.delete_review(review.id)
+        self.assertEqual(facade.get_top_places('rating', 1), [places[1]])
+
+    def test_leaderboard_endpoint(self):
+        response = self.client.get('/api/v1/places/top?by=price&n=5')
+        self.assertEqual(response.status_code, 200)
+        prices = [place["price"] for place in response.json]
+        self.assertEqual(prices, sorted(prices))
+        response = self.client.get('/api/v1/places/top?by=distance')
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_create_places(self):
+        user_id = self.client.post('/api/v1/users/', json={
+            "first_name": "Bulk",
+            "last_name": "Owner",
+            "email": "bulk.owner@example.com"
+        }).json.get("id")
+        response = self.client.post('/api/v1/amenities/batch', json=[{"name": "Sauna bath"}, {"name": "Sauna bath"}])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json["errors"], [{"index": 1, "error": "Amenity already exists"}])
+        sauna_id = response.json["created"][0]
+
+        place = {"title": "Bulk place", "description": "One of many", "price": 50.0,
+                 "latitude": 12.0, "longitude": 12.0, "owner_id": user_id, "amenities": [sauna_id]}
+        response = self.client.post('/api/v1/places/batch', json=[
+            place,
+            dict(place, owner_id="bad_id"),
+            dict(place, amenities=["bad_id"]),
+            dict(place, price=-1.0),
+            "not an object",
+            dict(place, owner_id=[user_id]),
+            dict(place, amenities=[[sauna_id]])
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json["created"]), 1)
+        self.assertEqual([error["index"] for error in response.json["errors"]], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(response.json["errors"][4]["error"], "owner_id must be a string !")
+        response = self.client.get(f'/api/v1/amenities/{sauna_id}/places')
+        self.assertEqual(len(response.json), 1)
+
+        lines = "\n".join(json.dumps(dict(place, title=f"Streamed {i}")) for i in range(3)) + "\n{broken\n"
+        response = self.client.post('/api/v1/places/batch', data=lines, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json["created"]), 3)
+        self.assertEqual(response.json["errors"][0]["index"], 3)
+        created = response.json["created"]
+        self.assertEqual(self.client.get(f'/api/v1/places/{created[0]}').json["title"], "Streamed 0")
+
+    def test_batch_create_reviews(self):
+        facade = HBnBFacade()
+        owner = facade.create_user({"first_name": "Ann", "last_name": "Lee", "email": "ann.lee@example.com"})
+        place = facade.create_place({"title": "Place", "description": None, "price": 10.0,
+                                     "latitude": 0.0, "longitude": 0.0, "owner": owner, "amenities": []})
+        reviews, errors = facade.bulk_create_reviews([
+            {"text": "Good", "rating": 4, "user_id": owner.id, "place_id": place.id},
+            {"text": "Bad", "rating": 2, "user_id": owner.id, "place_id": place.id},
+            {"text": "Ugly", "rating": 9, "user_id": owner.id, "place_id": place.id}
+        ])
+        self.assertEqual(len(reviews), 2)
+        self.assertEqual(errors, [{"index": 2, "error": "Rating must be between 1 and 5 !"}])
+        self.assertEqual(place.rating_stats.average, 3)
+        self.assertEqual(facade.get_reviews_by_place(place.id), reviews)
+        self.assertEqual(facade.get_top_places('rating', 1), [place])
+
+    def test_conditional_get_place(self):
+        user_id = self.client.post('/api/v1/users/', json={
+            "first_name": "Etta", "last_name": "Gee", "email": "etta.gee@example.com"}).json["id"]
+        place_id = self.client.post('/api/v1/places/', json={
+            "title": "Polled Flat", "description": "Fetched a lot", "price": 70.0, "latitude": 10.0,
+            "longitude": 10.0, "owner_id": user_id, "amenities": []}).json["id"]
+
+        response = self.client.get(f'/api/v1/places/{place_id}')
+        etag, last_modified = response.headers['ETag'], response.headers['Last-Modified']
+        response = self.client.get(f'/api/v1/places/{place_id}', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b'')
+        response = self.client.get(f'/api/v1/places/{place_id}', headers={'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_code, 304)
+
+        # A new review changes the rating shown with the place
+        self.client.post('/api/v1/reviews/', json={
+            "text": "Fine", "rating": 4, "user_id": user_id, "place_id": place_id})
+        response = self.client.get(f'/api/v1/places/{place_id}', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+        etag = self.client.get('/api/v1/places/').headers['ETag']
+        self.assertEqual(self.client.get('/api/v1/places/', headers={'If-None-Match': etag}).status_code, 304)
+        self.client.put(f'/api/v1/places/{place_id}', json={"price": 75.0})
+        self.assertEqual(self.client.get('/api/v1/places/', headers={'If-None-Match': etag}).status_code, 200)
+
+    def test_search_places(self):
+        word = uuid.uuid4().hex
+        user_id = self.client.post('/api/v1/users/', json={
+            "first_name": "Tex", "last_name": "Search", "email": f"{word}@example.com"}).json["id"]
+        place_ids = []
+        for title, description in ((f"Sea view loft {word}", "Bright loft"),
+                                   (f"Mountain chalet {word}", "With a sea view from the terrace"),
+                                   (f"City studio {word}", None)):
+            place_ids.append(self.client.post('/api/v1/places/', json={
+                "title": title, "description": description or "", "price": 90.0, "latitude": 1.0,
+                "longitude": 1.0, "owner_id": user_id, "amenities": []}).json["id"])
+
+        # Every term must match; the title weighs more than the description
+        response = self.client.get(f'/api/v1/places/search?q=Sea+View+{word}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([place["id"] for place in response.json], place_ids[:2])
+        self.assertEqual(response.headers['X-Total-Count'], '2')
+
+        # Reviews count, and follow their updates
+        review_id = self.client.post('/api/v1/reviews/', json={
+            "text": "Quiet and cosy studio, great café downstairs", "rating": 5,
+            "user_id": user_id, "place_id": place_ids[2]}).json["id"]
+        response = self.client.get(f'/api/v1/places/search?q=cafe+{word}')
+        self.assertEqual([place["id"] for place in response.json], [place_ids[2]])
+        self.client.put(f'/api/v1/reviews/{review_id}', json={"text": "Noisy street"})
+        self.assertEqual(self.client.get(f'/api/v1/places/search?q=cafe+{word}').json, [])
+
+        response = self.client.get(f'/api/v1/places/search?q={word}&limit=2')
+        self.assertEqual(len(response.json), 2)
+        response = self.client.get(f"/api/v1/places/search?q={word}&cursor={response.headers['X-Next-Cursor']}")
+        self.assertEqual(len(response.json), 1)
+        self.assertNotIn('X-Next-Cursor', response.headers)
+        self.assertEqual(self.client.get('/api/v1/places/search?q=the').status_code, 400)
+
+    def test_sparse_fieldsets(self):
+        word = uuid.uuid4().hex
+        user_id = self.client.post('/api/v1/users/', json={
+            "first_name": "Fi", "last_name": "Elds", "email": f"{word}@example.com"}).json["id"]
+        place_id = self.client.post('/api/v1/places/', json={
+            "title": f"Sparse {word}", "description": "Few fields", "price": 60.0, "latitude": 2.0,
+            "longitude": 2.0, "owner_id": user_id, "amenities": []}).json["id"]
+
+        full = self.client.get(f'/api/v1/places/{place_id}')
+        response = self.client.get(f'/api/v1/places/{place_id}?fields=title,id,price')
+        self.assertEqual(response.json, {"id": place_id, "title": f"Sparse {word}", "price": 60.0})
+        self.assertNotEqual(response.headers['ETag'], full.headers['ETag'])
+        response = self.client.get(f'/api/v1/places/{place_id}?fields=title',
+                                   headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 200)
+        # (The default representation is untouched by the selections)
+        self.assertEqual(self.client.get(f'/api/v1/places/{place_id}').json, full.json)
+
+        response = self.client.get(f'/api/v1/places/search?q={word}&fields=id,score')
+        self.assertEqual(list(response.json[0]), ["id", "score"])
+        response = self.client.get(f'/api/v1/places/?near=2,2&radius_km=1&fields=id,distance_km')
+        self.assertEqual(response.json, [{"id": place_id, "distance_km": 0.0}])
+        response = self.client.get(f'/api/v1/users/{user_id}?fields=email')
+        self.assertEqual(response.json, {"email": f"{word}@example.com"})
+        response = self.client.get('/api/v1/amenities/?fields=name&stream=1')
+        self.assertTrue(all(list(json.loads(line)) == ["name"] for line in response.get_data(as_text=True).splitlines()))
+
+        response = self.client.get(f'/api/v1/places/{place_id}?fields=id,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json['error'])
+        self.assertEqual(self.client.get('/api/v1/reviews/?fields=,').status_code, 400)
+
+    def test_include_related_objects(self):
+        word = uuid.uuid4().hex
+        owner_id, guest_id = (self.client.post('/api/v1/users/', json={
+            "first_name": name, "last_name": "Inc", "email": f"{name}.{word}@example.com"}).json["id"]
+            for name in ("owner", "guest"))
+        place_id = self.client.post('/api/v1/places/', json={
+            "title": "Included", "description": "Side-loaded", "price": 80.0, "latitude": 3.0,
+            "longitude": 3.0, "owner_id": owner_id, "amenities": []}).json["id"]
+        review_ids = [self.client.post('/api/v1/reviews/', json={
+            "text": "Fine", "rating": rating, "user_id": user_id, "place_id": place_id}).json["id"]
+            for user_id, rating in ((owner_id, 5), (guest_id, 3))]
+
+        plain = self.client.get(f'/api/v1/places/{place_id}')
+        response = self.client.get(f'/api/v1/places/{place_id}?include=owner,reviews.user')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["data"], plain.json)
+        included = response.json["included"]
+        # (The owner wrote a review too: each user is sent once)
+        self.assertEqual([user["id"] for user in included["users"]], [owner_id, guest_id])
+        self.assertEqual({review["id"] for review in included["reviews"]}, set(review_ids))
+
+        # Included objects are part of the ETag
+        etag = response.headers['ETag']
+        self.client.put(f'/api/v1/users/{guest_id}', json={"first_name": "Renamed"})
+        response = self.client.get(f'/api/v1/places/{place_id}?include=owner,reviews.user',
+                                   headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(f'/api/v1/places/{place_id}').headers['ETag'], plain.headers['ETag'])
+
+        response = self.client.get(f'/api/v1/reviews/places/{place_id}/reviews?include=user,place')
+        self.assertEqual(len(response.json["data"]), 2)
+        self.assertEqual([place["id"] for place in response.json["included"]["places"]], [place_id])
+        response = self.client.get(f'/api/v1/users/{guest_id}?include=reviews.place')
+        self.assertEqual([review["id"] for review in response.json["included"]["reviews"]], [review_ids[1]])
+
+        self.client.delete(f'/api/v1/reviews/{review_ids[1]}')
+        response = self.client.get(f'/api/v1/places/{place_id}?include=reviews')
+        self.assertEqual([review["id"] for review in response.json["included"]["reviews"]], [review_ids[0]])
+
+        self.assertEqual(self.client.get(f'/api/v1/places/{place_id}?include=guests').status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/places/?include=owner&stream=1').status_code, 400)
+        response = self.client.get('/api/v1/reviews/?include=user&limit=1')
+        self.assertEqual(list(response.json), ["data", "included"])
+
+    def test_get_many_places(self):
+        word = uuid.uuid4().hex
+        user_id = self.client.post('/api/v1/users/', json={
+            "first_name": "Multi", "last_name": "Get", "email": f"{word}@example.com"}).json["id"]
+        place_ids = [self.client.post('/api/v1/places/', json={
+            "title": f"Favorite {i}", "description": "", "price": 50.0 + i, "latitude": 4.0, "longitude": 4.0,
+            "owner_id": user_id, "amenities": []}).json["id"] for i in range(3)]
+
+        ids = [place_ids[2], "missing", place_ids[0], place_ids[2]]
+        response = self.client.get(f"/api/v1/places/?ids={','.join(ids)}&fields=id,title")
+        self.assertEqual(response.json, [{"id": place_ids[2], "title": "Favorite 2"},
+                                         {"id": place_ids[0], "title": "Favorite 0"}])
+        response = self.client.get(f"/api/v1/places/?ids={','.join(place_ids)}&limit=2")
+        self.assertEqual([place["id"] for place in response.json], place_ids[:2])
+        self.assertIn('X-Next-Cursor', response.headers)
+
+        response = self.client.post('/api/v1/places/lookup?include=owner', json={"ids": place_ids[::-1]})
+        self.assertEqual([place["id"] for place in response.json["data"]], place_ids[::-1])
+        self.assertEqual([user["id"] for user in response.json["included"]["users"]], [user_id])
+        response = self.client.post('/api/v1/users/lookup', json={"ids": [user_id]})
+        self.assertEqual(response.json[0]["email"], f"{word}@example.com")
+
+        self.assertEqual(self.client.post('/api/v1/reviews/lookup', json={"ids": []}).status_code, 400)
+        self.assertEqual(self.client.post('/api/v1/amenities/lookup', json={"ids": "a,b"}).status_code, 400)
+        self.assertEqual(self.client.get(f"/api/v1/users/?ids={','.join(['x'] * 101)}").status_code, 400)
+
     # TODO: Test all place endpoints with positive/negative scenarios
\ No newline at end of file
@@ -0,0 +1,142 @@
+import unittest
+from random import Random
+from types import SimpleNamespace
+from app.models.amenity import Amenity
+from app.models.place import Place
+from app.models.review import Review
+from app.models.user import User
+from app.persistence.indexes import SortedIndex
+from app.persistence.repository import InMemoryRepository
+from app.persistence.spatial import GridIndex
+
+
+class TestInMemoryRepository(unittest.TestCase):
+
+    def setUp(self):
+        self.repo = InMemoryRepository(unique_indexes=['email'], indexes=['last_name'])
+        self.user = User(first_name="Jane", last_name="Doe", email="jane@example.com")
+        self.repo.add(self.user)
+
+    def test_get_by_indexed_attribute(self):
+        other = User(first_name="John", last_name="Doe", email="john@example.com")
+        self.repo.add(other)
+        assert self.repo.get_by_attribute('email', "john@example.com") is other
+        assert self.repo.get_by_attribute('last_name', "Doe") is self.user
+        assert self.repo.get_by_attribute('email', "nobody@example.com") is None
+
+    def test_unique_index_rejects_duplicates(self):
+        duplicate = User(first_name="Janet", last_name="Doe", email="jane@example.com")
+        with self.assertRaises(ValueError):
+            self.repo.add(duplicate)
+        assert self.repo.get(duplicate.id) is None
+
+    def test_index_follows_update_and_delete(self):
+        self.repo.update(self.user.id, {"email": "jane.doe@example.com"})
+        assert self.repo.get_by_attribute('email', "jane@example.com") is None
+        assert self.repo.get_by_attribute('email', "jane.doe@example.com") is self.user
+
+        self.repo.delete(self.user.id)
+        assert self.repo.get_by_attribute('email', "jane.doe@example.com") is None
+
+    def test_failed_update_keeps_index_consistent(self):
+        with self.assertRaises(ValueError):
+            self.repo.update(self.user.id, {"email": "invalid-email"})
+        assert self.repo.get_by_attribute('email', "jane@example.com") is self.user
+
+    def test_unindexed_attribute_falls_back_to_scan(self):
+        repo = InMemoryRepository()
+        amenity = Amenity(name="Wi-Fi")
+        repo.add(amenity)
+        assert repo.get_by_attribute('name', "Wi-Fi") is amenity
+
+    def test_foreign_key_index(self):
+        repo = InMemoryRepository(indexes=['place.id', 'user.id'])
+        place = Place(title="Cozy Apartment", description=None, price=100.0, latitude=37.7749, longitude=-122.4194, owner=self.user, amenities=[])
+        other_place = Place(title="Loft", description=None, price=80.0, latitude=48.85, longitude=2.35, owner=self.user, amenities=[])
+        first = Review(text="Great stay!", rating=5, place=place, user=self.user)
+        second = Review(text="Noisy", rating=2, place=other_place, user=self.user)
+        repo.add(first)
+        repo.add(second)
+
+        assert repo.get_all_by_attribute('place.id', place.id) == [first]
+        assert repo.get_all_by_attribute('user.id', self.user.id) == [first, second]
+
+        repo.delete(first.id)
+        assert repo.get_all_by_attribute('place.id', place.id) == []
+        assert repo.get_all_by_attribute('user.id', self.user.id) == [second]
+
+    def test_get_page_is_stable_under_inserts_and_deletes(self):
+        repo = InMemoryRepository()
+        amenities = [Amenity(name=f"amenity {i}") for i in range(5)]
+        for amenity in amenities[:4]:
+            repo.add(amenity)
+
+        page, cursor = repo.get_page(2)
+        assert page == amenities[:2]
+
+        repo.add(amenities[4])
+        repo.delete(amenities[2].id)
+        page, cursor = repo.get_page(2, cursor)
+        assert page == [amenities[3], amenities[4]]
+        assert cursor is None
+
+        with self.assertRaises(ValueError):
+            repo.get_page(2, "not a cursor")
+
+    def test_get_page_by_attribute_keeps_the_storage_order(self):
+        repo = InMemoryRepository(indexes=['last_name'])
+        users = [User(first_name=f"User{i}", last_name="Doe", email=f"user{i}@example.com") for i in range(5)]
+        for user in users:
+            repo.add(user)
+        # (An update re-indexes the object: it keeps its place in the pages)
+        repo.update(users[1].id, {"first_name": "Renamed"})
+        repo.delete(users[3].id)
+
+        page, cursor = repo.get_page_by_attribute('last_name', "Doe", 2)
+        assert page == users[:2]
+        page, cursor = repo.get_page_by_attribute('last_name', "Doe", 2, cursor)
+        assert page == [users[2], users[4]]
+        assert cursor is None
+        assert repo.get_page_by_attribute('last_name', "Roe", 2) == ([], None)
+
+    def test_get_many_keeps_the_order_of_the_ids(self):
+        other = User(first_name="John", last_name="Doe", email="john@example.com")
+        self.repo.add(other)
+        assert self.repo.get_many([other.id, "missing", self.user.id]) == [other, self.user]
+        assert self.repo.get_many([]) == []
+
+    def test_sorted_index_blocks_stay_ordered(self):
+        index = SortedIndex(lambda obj: obj.score)
+        index.BLOCK_SIZE = 4
+        objects = {}
+        random = Random(7)
+        for step in range(400):
+            obj_id = str(random.randrange(60))
+            if obj_id in objects and random.random() < 0.5:
+                index.remove(objects.pop(obj_id))
+            else:
+                objects[obj_id] = SimpleNamespace(id=obj_id, score=random.randrange(20))
+                index.add(objects[obj_id])
+            expected = sorted(objects.values(), key=lambda obj: (obj.score, obj.id))
+            assert index.first(len(objects) + 1) == expected
+            assert index.first(5) == expected[:5]
+            assert len(index) == len(objects)
+            assert all(0 < len(block) <= 2 * index.BLOCK_SIZE for block in index._blocks)
+
+    def test_grid_index_follows_repository(self):
+        repo = InMemoryRepository()
+        grid = GridIndex()
+        repo.add_index(grid)
+        fiji = Place(title="Fiji hut", description=None, price=50.0, latitude=-17.8, longitude=179.9, owner=self.user, amenities=[])
+        samoa = Place(title="Samoa hut", description=None, price=50.0, latitude=-13.8, longitude=-171.8, owner=self.user, amenities=[])
+        repo.add(fiji)
+        repo.add(samoa)
+
+        # Boxes crossing the antimeridian are split in two
+        assert {obj for _, _, obj in grid.within_bbox(-20, 170, -10, -170)} == {fiji, samoa}
+        assert [obj for _, obj in grid.near(-17.8, 179.95, 50)] == [fiji]
+
+        repo.update(fiji.id, {"longitude": 178.0})
+        assert [obj for _, obj in grid.near(-17.8, 179.95, 50)] == []
+        repo.delete(samoa.id)
+        assert [obj for _, _, obj in grid.within_bbox(-20, 170, -10, -170)] == [fiji]
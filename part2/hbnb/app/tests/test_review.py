@@ -3,6 +3,7 @@ from app.models.review import Review
 from app.models.user import User
 
 import unittest
+import uuid
 from app import create_app
 from app.models.user import User
 
@@ -59,4 +60,114 @@ class TestReviewEndpoints(unittest.TestCase):
         assert review.user is user
         print("Review creation test passed!")
 
+    def test_rating_aggregates(self):
+        user_id = self.client.post('/api/v1/users/', json={
+            "first_name": "Rita",
+            "last_name": "Ting",
+            "email": "rita.ting@example.com"
+        }).json.get("id")
+        place_id = self.client.post('/api/v1/places/', json={
+            "title": "Rated place",
+            "description": "Somewhere",
+            "price": 60.0,
+            "latitude": 1.0,
+            "longitude": 1.0,
+            "owner_id": user_id,
+            "amenities": []
+        }).json.get("id")
+        review_ids = []
+        for rating in (5, 3):
+            review_ids.append(self.client.post('/api/v1/reviews/', json={
+                "text": "Rated",
+                "rating": rating,
+                "user_id": user_id,
+                "place_id": place_id
+            }).json.get("id"))
+
+        rating = self.client.get(f'/api/v1/places/{place_id}').json["rating"]
+        self.assertEqual(rating["count"], 2)
+        self.assertEqual(rating["average"], 4)
+        self.assertEqual(rating["histogram"]["5"], 1)
+
+        self.client.put(f'/api/v1/reviews/{review_ids[1]}', json={"rating": 1})
+        self.client.delete(f'/api/v1/reviews/{review_ids[0]}')
+        rating = self.client.get(f'/api/v1/places/{place_id}').json["rating"]
+        self.assertEqual(rating, {"count": 1, "average": 1, "histogram": {"1": 1, "2": 0, "3": 0, "4": 0, "5": 0}})
+        rating = self.client.get(f'/api/v1/users/{user_id}').json["rating"]
+        self.assertEqual(rating["count"], 1)
+
+    def test_list_reviews_by_place_and_user(self):
+        user_id = self.client.post('/api/v1/users/', json={
+            "first_name": "Jim",
+            "last_name": "Doe",
+            "email": "jim.doe@example.com"
+        }).json.get("id")
+        place_id = self.client.post('/api/v1/places/', json={
+            "title": "Beach House",
+            "description": "Right on the sand",
+            "price": 150.0,
+            "latitude": 43.7,
+            "longitude": 7.26,
+            "owner_id": user_id,
+            "amenities": []
+        }).json.get("id")
+        review_id = self.client.post('/api/v1/reviews/', json={
+            "text": "Lovely view",
+            "rating": 4,
+            "user_id": user_id,
+            "place_id": place_id
+        }).json.get("id")
+
+        response = self.client.get(f'/api/v1/reviews/places/{place_id}/reviews')
+        self.assertEqual([review["id"] for review in response.json], [review_id])
+        response = self.client.get(f'/api/v1/reviews/users/{user_id}/reviews')
+        self.assertEqual([review["id"] for review in response.json], [review_id])
+
+        self.client.delete(f'/api/v1/reviews/{review_id}')
+        response = self.client.get(f'/api/v1/reviews/places/{place_id}/reviews')
+        self.assertEqual(response.json, [])
+
+    def test_nested_review_lists_are_paginated(self):
+        user_id = self.client.post('/api/v1/users/', json={
+            "first_name": "Page", "last_name": "Doe", "email": f"{uuid.uuid4()}@example.com"}).json["id"]
+        place_id = self.client.post('/api/v1/places/', json={
+            "title": "Paged House", "description": "", "price": 80.0, "latitude": 4.0, "longitude": 5.0,
+            "owner_id": user_id, "amenities": []}).json["id"]
+        review_ids = [self.client.post('/api/v1/reviews/', json={
+            "text": f"Stay {number}", "rating": 3, "user_id": user_id, "place_id": place_id}).json["id"]
+            for number in range(3)]
+
+        for url in (f'/api/v1/reviews/places/{place_id}/reviews', f'/api/v1/reviews/users/{user_id}/reviews'):
+            response = self.client.get(url, query_string={'limit': 2})
+            self.assertEqual([review["id"] for review in response.json], review_ids[:2])
+            cursor = response.headers['X-Next-Cursor']
+            response = self.client.get(url, query_string={'limit': 2, 'cursor': cursor})
+            self.assertEqual([review["id"] for review in response.json], review_ids[2:])
+            self.assertNotIn('X-Next-Cursor', response.headers)
+
+        # (Seq cursors: deleting a review of the first page does not shift the second one)
+        url = f'/api/v1/reviews/places/{place_id}/reviews'
+        cursor = self.client.get(url, query_string={'limit': 1}).headers['X-Next-Cursor']
+        self.client.delete(f'/api/v1/reviews/{review_ids[0]}')
+        response = self.client.get(url, query_string={'limit': 1, 'cursor': cursor})
+        self.assertEqual([review["id"] for review in response.json], review_ids[1:2])
+        self.assertEqual(self.client.get(url, query_string={'limit': 0}).status_code, 400)
+
+    def test_conditional_get_of_related_lists(self):
+        user_id = self.client.post('/api/v1/users/', json={
+            "first_name": "Etag", "last_name": "Doe", "email": f"{uuid.uuid4()}@example.com"}).json["id"]
+        place_id = self.client.post('/api/v1/places/', json={
+            "title": "Polled House", "description": "", "price": 80.0, "latitude": 4.0, "longitude": 5.0,
+            "owner_id": user_id, "amenities": []}).json["id"]
+        urls = (f'/api/v1/reviews/places/{place_id}/reviews', f'/api/v1/reviews/users/{user_id}/reviews',
+                '/api/v1/places/top')
+        etags = [self.client.get(url).headers['ETag'] for url in urls]
+        for url, etag in zip(urls, etags):
+            self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+
+        self.client.post('/api/v1/reviews/', json={
+            "text": "Fresh", "rating": 5, "user_id": user_id, "place_id": place_id})
+        for url, etag in zip(urls, etags):
+            self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 200)
+
     # TODO: Test all review endpoints with positive/negative scenarios
\ No newline at end of file
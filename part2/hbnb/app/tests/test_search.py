@@ -0,0 +1,69 @@
+import unittest
+from collections import Counter
+from unittest.mock import patch
+from app.persistence import search
+from app.persistence.search import TextIndex, tokenize
+
+
+class TestTextIndex(unittest.TestCase):
+
+    def test_tokenize_normalizes_and_drops_stopwords(self):
+        self.assertEqual(tokenize("The Café at the SEA-view, 2 rooms"), ["cafe", "sea", "view", "2", "rooms"])
+        self.assertEqual(tokenize(None), [])
+
+    def test_bm25_ranking(self):
+        index = TextIndex()
+        index.set_part('a', None, Counter(tokenize("loft loft with a sea view")))
+        index.set_part('b', None, Counter(tokenize("large family house with garden and a distant sea view")))
+        index.set_part('c', None, Counter(tokenize("garden studio")))
+        results, total = index.search("sea view", 10)
+        self.assertEqual(total, 2)
+        # (Same term frequencies, the shorter document ranks first)
+        self.assertEqual([doc_id for _, doc_id in results], ['a', 'b'])
+        results, total = index.search("garden", 1, offset=1)
+        self.assertEqual(([doc_id for _, doc_id in results], total), (['b'], 2))
+
+    def test_parts_are_updated_on_their_own(self):
+        index = TextIndex()
+        index.set_part('place', None, Counter(tokenize("harbour flat")))
+        index.set_part('place', 'review1', Counter(tokenize("lovely terrace")))
+        self.assertEqual(index.search("harbour terrace", 10)[1], 1)
+        index.set_part('place', 'review1', Counter(tokenize("tiny kitchen")))
+        self.assertEqual(index.search("terrace", 10), ([], 0))
+        index.remove_part('place', None)
+        self.assertEqual(index.search("harbour", 10), ([], 0))
+        self.assertEqual(len(index), 1)
+        index.remove_part('place', 'review1')
+        self.assertEqual(len(index), 0)
+        self.assertEqual([len(numbers) for numbers, *_ in index._postings], [0] * len(index._postings))
+
+    def test_removals_keep_the_positions_of_moved_entries(self):
+        index = TextIndex()
+        words = "sea view loft garden quiet".split()
+        for number in range(60):
+            index.set_part(f'doc{number % 7}', number, Counter({words[number % 5]: 1, words[number % 3]: 2}))
+        for number in range(0, 60, 3):
+            index.remove_part(f'doc{number % 7}', number)
+        index.set_part('doc1', 1, Counter({'sea': 3}))
+        for slot in index._parts.values():
+            term_ids, frequencies, positions = index._slots[slot]
+            for term_id, frequency, position in zip(term_ids, frequencies, positions):
+                numbers, posting_frequencies, slots = index._postings[term_id]
+                self.assertEqual((posting_frequencies[position], slots[position]), (frequency, slot))
+        self.assertEqual(sum(len(numbers) for numbers, *_ in index._postings),
+                         sum(len(index._slots[slot][0]) for slot in index._parts.values()))
+
+    def test_numpy_and_loop_searches_agree(self):
+        index = TextIndex()
+        words = "sea view loft garden quiet terrace harbour studio".split()
+        for number in range(200):
+            index.set_part(f'doc{number}', None,
+                           Counter({words[number % 8]: 1 + number % 3, words[number % 5]: 1, words[number % 3]: 2}))
+            if number % 4 == 0:
+                index.set_part(f'doc{number}', 'review', Counter({'terrace': 1, 'sea': number % 2 + 1}))
+        if not search.HAS_NUMPY:
+            self.skipTest("numpy is not installed")
+        for query in ("sea", "sea terrace", "view loft garden"):
+            expected = index.search(query, 15, offset=3)
+            with patch.object(TextIndex, '_search_numpy', TextIndex._search_loop):
+                self.assertEqual(index.search(query, 15, offset=3), expected)
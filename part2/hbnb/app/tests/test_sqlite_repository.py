@@ -0,0 +1,209 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+import unittest.mock
+from app import create_app
+from app.api.v1.places import place_headers
+from app.api.v1.users import user_headers
+from app.services.facade import HBnBFacade
+
+
+class TestSQLiteRepository(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'hbnb.db')
+        self.facade = HBnBFacade()
+        self.facade.use_repositories('sqlite', self.path)
+
+    def tearDown(self):
+        self.facade.use_repositories('memory')
+        self.directory.cleanup()
+
+    def seed(self, facade):
+        owner = facade.create_user({"first_name": "Jane", "last_name": "Doe", "email": "jane@example.com"})
+        wifi = facade.create_amenity({"name": "Wi-Fi"})
+        place = facade.create_place({"title": "Cozy Apartment", "description": "A nice place to stay", "price": 100.0,
+                                     "latitude": 37.7749, "longitude": -122.4194, "owner": owner, "amenities": [wifi]})
+        review = facade.create_review({"text": "Great stay!", "rating": 4, "place": place, "user": owner})
+        return owner, wifi, place, review
+
+    def test_data_is_shared_between_processes(self):
+        owner, wifi, place, review = self.seed(self.facade)
+        # A second facade on the same file stands for another worker process
+        other = HBnBFacade()
+        other.use_repositories('sqlite', self.path)
+
+        self.assertEqual(other.get_user_by_email("jane@example.com").id, owner.id)
+        self.assertEqual(other.get_amenity_by_name("Wi-Fi").id, wifi.id)
+        loaded = other.get_place(place.id)
+        self.assertEqual(loaded.owner.id, owner.id)
+        self.assertEqual([amenity.id for amenity in loaded.amenities], [wifi.id])
+        self.assertEqual([r.id for r in other.get_reviews_by_place(place.id)], [review.id])
+        self.assertEqual(loaded.rating_stats.average, 4)
+
+        self.facade.update_place(place.id, {"price": 80.0})
+        self.assertEqual(other.get_place(place.id).price, 80.0)
+        self.facade.delete_review(review.id)
+        self.assertEqual(other.get_reviews_by_user(owner.id), [])
+        other.use_repositories('memory')
+
+    def test_unique_indexes(self):
+        self.seed(self.facade)
+        with self.assertRaises(ValueError):
+            self.facade.create_user({"first_name": "Jo", "last_name": "Doe", "email": "jane@example.com"})
+        other = self.facade.create_amenity({"name": "Parking"})
+        with self.assertRaises(ValueError):
+            self.facade.update_amenity(other.id, {"name": "Wi-Fi"})
+        self.assertEqual(self.facade.get_amenity(other.id).name, "Parking")
+
+    def test_bulk_create_is_one_transaction(self):
+        owner, wifi, place, review = self.seed(self.facade)
+        users, errors = self.facade.bulk_create_users([
+            {"first_name": "A", "last_name": "B", "email": "a@example.com"},
+            {"first_name": "C", "last_name": "D", "email": "jane@example.com"}
+        ])
+        self.assertEqual(len(users), 1)
+        self.assertEqual(errors[0]["index"], 1)
+        places, errors = self.facade.bulk_create_places([
+            {"title": "Bulk", "description": None, "price": 10.0, "latitude": 1.0, "longitude": 1.0,
+             "owner_id": users[0].id, "amenities": [wifi.id]}
+        ])
+        other = HBnBFacade()
+        other.use_repositories('sqlite', self.path)
+        self.assertEqual(other.get_place(places[0].id).owner.email, "a@example.com")
+        other.use_repositories('memory')
+
+    def test_version_counts_writes_of_every_process(self):
+        owner, wifi, place, review = self.seed(self.facade)
+        other = HBnBFacade()
+        other.use_repositories('sqlite', self.path)
+        version = other.get_versions('places')
+        self.facade.update_place(place.id, {"price": 90.0})
+        self.assertNotEqual(other.get_versions('places'), version)
+        other.use_repositories('memory')
+
+    def test_pagination(self):
+        owner = self.facade.create_user({"first_name": "Jane", "last_name": "Doe", "email": "jane@example.com"})
+        users = [owner] + [self.facade.create_user({"first_name": "User", "last_name": str(i),
+                                                    "email": f"user{i}@example.com"}) for i in range(4)]
+        page, cursor = self.facade.get_users_page(3)
+        self.assertEqual(page, users[:3])
+        page, cursor = self.facade.get_users_page(3, cursor)
+        self.assertEqual(page, users[3:])
+        self.assertIsNone(cursor)
+
+    def test_get_many(self):
+        owner, wifi, place, review = self.seed(self.facade)
+        other = HBnBFacade()
+        other.use_repositories('sqlite', self.path)
+        # (Fetched from the file by the other facade, in one IN query per chunk)
+        users = other.get_many('users', ['missing', owner.id, owner.id])
+        self.assertEqual([user.email for user in users], ["jane@example.com"])
+        self.assertIs(other.get_many('users', [owner.id])[0], users[0])
+        with unittest.mock.patch('app.persistence.sqlite_repository.MAX_IN_PARAMETERS', 1):
+            self.assertEqual([obj.id for obj in other.get_many('places', [place.id, 'missing'])], [place.id])
+        other.use_repositories('memory')
+
+    def test_pages_of_some_objects(self):
+        owner, wifi, place, review = self.seed(self.facade)
+        second = self.facade.create_review({"text": "Again", "rating": 5, "place": place, "user": owner})
+        page, cursor = self.facade.get_reviews_page_by_place(place.id, 1)
+        self.assertEqual((page, cursor is not None), ([review], True))
+        self.assertEqual(self.facade.get_reviews_page_by_place(place.id, 1, cursor), ([second], None))
+        places = [self.facade.create_place({"title": f"Place {number}", "description": "", "price": 10.0,
+                                            "latitude": 1.0, "longitude": 1.0, "owner": owner, "amenities": []})
+                  for number in range(3)]
+        page, cursor = self.facade.get_page_of('places', places[::-1], 2)
+        self.assertEqual(page, places[:2])
+        self.facade.delete_place(places[2].id)
+        self.assertEqual(self.facade.get_page_of('places', places, 2, cursor), ([], None))
+
+    def test_delete_sees_the_dependents_of_every_process(self):
+        owner, wifi, place, review = self.seed(self.facade)
+        other = HBnBFacade()
+        other.use_repositories('sqlite', self.path)
+        lodger = other.create_user({"first_name": "Lo", "last_name": "Dger", "email": "lodger@example.com"})
+        flat = other.create_place({"title": "Flat", "description": "", "price": 20.0, "latitude": 1.0,
+                                   "longitude": 1.0, "owner": lodger, "amenities": []})
+        # (The place was created by the other facade: this one never loaded it)
+        with self.assertRaises(ValueError):
+            self.facade.delete_user(lodger.id)
+        self.assertIsNotNone(self.facade.get_place(flat.id))
+        # (The foreign keys refuse a delete the plan could not see, instead of leaving orphans)
+        with self.assertRaises(ValueError):
+            other.user_repo.delete(lodger.id)
+        other.use_repositories('memory')
+
+    def test_orphan_rows_do_not_stop_the_boot(self):
+        owner, wifi, place, review = self.seed(self.facade)
+        conn = sqlite3.connect(self.path)
+        conn.execute('PRAGMA foreign_keys=OFF')
+        conn.execute("UPDATE places SET owner_id = 'gone'")
+        conn.commit()
+        conn.close()
+        other = HBnBFacade()
+        other.use_repositories('sqlite', self.path)
+        self.assertIsNone(other.get_place(place.id))
+        self.assertEqual(other.get_all_places(), [])
+        self.assertEqual(other.get_reviews_by_user(owner.id), [])
+        other.use_repositories('memory')
+
+    def test_sync_catches_up_with_other_processes(self):
+        owner, wifi, place, review = self.seed(self.facade)
+        other = HBnBFacade()
+        other.use_repositories('sqlite', self.path)
+        guest = self.facade.create_user({"first_name": "Gu", "last_name": "Est", "email": "guest@example.com"})
+        second = self.facade.create_review({"text": "Fine", "rating": 2, "place": place, "user": guest})
+        other.sync()
+        self.assertEqual(other.get_place(place.id).rating_stats.average, 3.0)
+        self.assertEqual(len(other.get_reviews_by_place(place.id)), 2)
+        other.update_review(second.id, {"rating": 4})
+        other.delete_review(review.id)
+        self.facade.sync()
+        self.assertEqual([r.id for r in self.facade.get_reviews_by_place(place.id)], [second.id])
+        self.assertEqual(self.facade.get_place(place.id).rating_stats.average, 4.0)
+        self.assertEqual(self.facade.get_reviews_by_user(owner.id), [])
+        other.use_repositories('memory')
+
+    def test_failed_update_keeps_the_stored_row(self):
+        owner, wifi, place, review = self.seed(self.facade)
+        cheap = self.facade.create_place({"title": "Cheap", "description": "", "price": 10.0, "latitude": 2.0,
+                                          "longitude": 2.0, "owner": owner, "amenities": []})
+        # (The price is valid and applied first, the title then fails)
+        with self.assertRaises(ValueError):
+            self.facade.update_place(place.id, {"price": 5.0, "title": ""})
+        self.assertEqual(self.facade.get_place(place.id).price, 100.0)
+        self.assertEqual([p.id for p in self.facade.get_top_places('price', 1)], [cheap.id])
+        with self.assertRaises(ValueError):
+            self.facade.update_user(owner.id, {"first_name": "New", "email": "bad"})
+        self.assertEqual(self.facade.get_user(owner.id).first_name, "Jane")
+
+    def test_workers_send_the_same_validators(self):
+        owner, wifi, place, review = self.seed(self.facade)
+        other = HBnBFacade()
+        other.use_repositories('sqlite', self.path)
+        self.assertEqual(place_headers(other.get_place(place.id)), place_headers(place))
+        self.assertEqual(user_headers(other.get_user(owner.id)), user_headers(owner))
+        before = place_headers(place)
+        # (A rating change stamps the stored place, so Last-Modified moves even on a delete)
+        other.delete_review(review.id)
+        self.facade.sync()
+        self.assertEqual(place_headers(place), place_headers(other.get_place(place.id)))
+        self.assertNotEqual(place_headers(place)['ETag'], before['ETag'])
+        self.assertGreaterEqual(place.updated_at.timestamp(), review.updated_at.timestamp())
+        other.use_repositories('memory')
+
+    def test_selected_from_config(self):
+        class SQLiteConfig:
+            REPOSITORY = 'sqlite'
+            SQLITE_PATH = self.path
+
+        self.seed(self.facade)
+        client = create_app(SQLiteConfig).test_client()
+        try:
+            response = client.get('/api/v1/users/')
+            self.assertEqual([user["email"] for user in response.json], ["jane@example.com"])
+        finally:
+            create_app()
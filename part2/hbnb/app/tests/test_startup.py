@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+import unittest
+from app import create_app
+from config import Config
+
+HBNB_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class NoDocsConfig(Config):
+    API_DOCS = False
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_optional_modules_are_not_imported_at_startup(self):
+        probe = ("import sys; import app; app.create_app(); "
+                 "print(sorted(m for m in ('numpy', 'sqlite3', 'app.persistence.journal') if m in sys.modules))")
+        output = subprocess.run([sys.executable, '-c', probe], cwd=HBNB_DIR, capture_output=True, text=True,
+                                check=True, env=dict(os.environ, HBNB_REPOSITORY='memory'))
+        self.assertEqual(output.stdout.strip(), '[]')
+
+    def test_api_docs_can_be_disabled(self):
+        client = create_app(NoDocsConfig).test_client()
+        self.assertEqual(client.get('/swagger.json').status_code, 404)
+        self.assertEqual(client.get('/api/v1/').status_code, 404)
+        self.assertEqual(client.get('/api/v1/amenities/').status_code, 200)
+
+        client = create_app().test_client()
+        self.assertEqual(client.get('/swagger.json').status_code, 200)
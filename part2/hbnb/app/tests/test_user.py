@@ -1,4 +1,5 @@
 import unittest
+import uuid
 from app import create_app
 from app.models.user import User
 
@@ -32,4 +33,39 @@ class TestUserEndpoints(unittest.TestCase):
         assert user.is_admin is False  # Default value
         print("User creation test passed!")
 
+    def test_update_ignores_rating_stats(self):
+        response = self.client.post('/api/v1/users/', json={
+            "first_name": "Jane",
+            "last_name": "Doe",
+            "email": f"{uuid.uuid4()}@example.com"
+        })
+        user_id = response.get_json()['id']
+        response = self.client.put(f'/api/v1/users/{user_id}', json={"first_name": "Janet", "rating_stats": 3})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(f'/api/v1/users/{user_id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['first_name'], "Janet")
+        self.assertEqual(response.get_json()['rating']['count'], 0)
+
+    def test_update_ignores_timestamps(self):
+        response = self.client.post('/api/v1/users/', json={
+            "first_name": "Jane",
+            "last_name": "Doe",
+            "email": f"{uuid.uuid4()}@example.com"
+        })
+        user_id = response.get_json()['id']
+        response = self.client.put(f'/api/v1/users/{user_id}', json={"created_at": "2020-01-01"})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(f'/api/v1/users/{user_id}', query_string={'fields': 'id,created_at'})
+        self.assertNotEqual(response.get_json()['created_at'], "2020-01-01")
+        with self.assertRaises(ValueError):
+            User("John", "Doe", "john.doe@example.com").created_at = "2020-01-01"
+
+    def test_rating_stats_keep_epoch_timestamps(self):
+        stats = User("John", "Doe", "john.doe@example.com").rating_stats
+        self.assertIsNone(stats.updated_at)
+        stats.add(4)
+        self.assertIsInstance(stats._updated_at, float)
+        self.assertAlmostEqual(stats.updated_at.timestamp(), stats._updated_at, places=5)
+
     # TODO: Test all user endpoints with positive/negative scenarios
\ No newline at end of file
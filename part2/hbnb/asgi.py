@@ -0,0 +1,5 @@
+from app import create_app
+from app.asgi import HBnBASGI
+
+# ASGI entry point, e.g. `uvicorn asgi:app` (run.py serves the same app over WSGI)
+app = HBnBASGI(create_app())
@@ -0,0 +1,173 @@
+"""Compare the WSGI server (run.py's threaded Werkzeug server) with the ASGI entry point under many connections.
+
+Each mode gets a fresh server process, seeded with a few users and places,
+then `--connections` concurrent clients (keep-alive when the server allows
+it) send GET requests for `--duration` seconds. Reports throughput, latency
+percentiles, errors and the server's thread count. The ASGI mode needs
+uvicorn.
+
+Usage (from part2/hbnb): python -m benchmarks.bench_asgi [--connections 1000] [--duration 10] [--modes wsgi asgi]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+REQUEST_TIMEOUT = 30.0
+
+SERVERS = {
+    'wsgi': [sys.executable, '-c', "import sys; from werkzeug.serving import run_simple; from run import app; "
+                                   "run_simple('127.0.0.1', int(sys.argv[1]), app, threaded=True)"],
+    'asgi': [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1',
+             '--log-level', 'warning', '--backlog', '4096', '--port'],
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode, port):
+    process = subprocess.Popen(SERVERS[mode] + [str(port)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 20
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/api/v1/amenities/', timeout=1)
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise SystemExit(f"The {mode} server did not start")
+
+
+def post(port, path, payload):
+    request = urllib.request.Request(f'http://127.0.0.1:{port}{path}', data=json.dumps(payload).encode(),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def seed(port, places=50):
+    owner = post(port, '/api/v1/users/', {"first_name": "Bench", "last_name": "Mark", "email": "bench@example.com"})
+    place_ids = []
+    for index in range(places):
+        place_ids.append(post(port, '/api/v1/places/', {
+            "title": f"Place {index}", "description": "Benchmark", "price": 50.0 + index,
+            "latitude": 10.0, "longitude": 10.0, "owner_id": owner["id"], "amenities": []})["id"])
+    return [f'/api/v1/places/{place_id}' for place_id in place_ids] + ['/api/v1/places/?limit=20']
+
+
+def thread_count(pid):
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                if line.startswith('Threads:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response (Content-Length or chunked body), return (status, keep-alive)"""
+    status = int((await reader.readline()).split()[1])
+    length, chunked, keep_alive = 0, False, True
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+        elif name.lower() == 'transfer-encoding' and 'chunked' in value.lower():
+            chunked = True
+        elif name.lower() == 'connection' and 'close' in value.lower():
+            keep_alive = False  # (Werkzeug's server closes HTTP/1.1 connections after each response)
+    if not chunked:
+        await reader.readexactly(length)
+        return status, keep_alive
+    while True:
+        size = int((await reader.readline()).split(b';')[0], 16)
+        await reader.readexactly(size + 2)
+        if size == 0:
+            return status, keep_alive
+
+
+async def client(port, paths, offset, stop_at, latencies, errors):
+    index = offset
+    reader = writer = None
+    while time.perf_counter() < stop_at:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            path = paths[index % len(paths)]
+            index += 1
+            start = time.perf_counter()
+            writer.write(f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n'.encode())
+            await writer.drain()
+            status, keep_alive = await asyncio.wait_for(read_response(reader), REQUEST_TIMEOUT)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+            if not keep_alive:
+                writer.close()
+                reader = writer = None
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError, IndexError) as err:
+            errors.append(type(err).__name__)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.05)
+    if writer is not None:
+        writer.close()
+
+
+async def load(port, paths, connections, duration, pid):
+    latencies, errors = [], []
+    stop_at = time.perf_counter() + duration
+    tasks = [asyncio.create_task(client(port, paths, offset, stop_at, latencies, errors))
+             for offset in range(connections)]
+    await asyncio.sleep(duration / 2)
+    threads = thread_count(pid)
+    await asyncio.gather(*tasks)
+    return latencies, errors, threads
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--modes', nargs='+', choices=sorted(SERVERS), default=['wsgi', 'asgi'])
+    args = parser.parse_args()
+
+    print(f"{'mode':<6}{'conns':>7}{'req/s':>9}{'p50':>10}{'p95':>10}{'p99':>10}{'errors':>8}{'threads':>9}")
+    for mode in args.modes:
+        port = free_port()
+        server = start_server(mode, port)
+        try:
+            paths = seed(port)
+            latencies, errors, threads = asyncio.run(
+                load(port, paths, args.connections, args.duration, server.pid))
+        finally:
+            server.terminate()
+            server.wait()
+        latencies.sort()
+        print(f"{mode:<6}{args.connections:>7}{len(latencies) / args.duration:>9.0f}"
+              f"{percentile(latencies, 0.50) * 1000:>8.1f}ms{percentile(latencies, 0.95) * 1000:>8.1f}ms"
+              f"{percentile(latencies, 0.99) * 1000:>8.1f}ms{len(errors):>8}{threads or '?':>9}")
+
+
+if __name__ == '__main__':
+    os.environ.setdefault('HBNB_REPOSITORY', 'memory')
+    main()
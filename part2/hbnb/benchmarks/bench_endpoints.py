@@ -0,0 +1,290 @@
+"""Latency and throughput of every v1 endpoint.
+
+Seeds a synthetic dataset through the facade, then sends `--requests`
+requests to each endpoint, first sequentially through the Flask test client
+(the cost of the app alone) then over HTTP from `--threads` threads against a
+local threaded server. Reports p50/p95/p99 latency and requests per second
+per endpoint; --output saves the results as JSON and --compare prints the
+change against an earlier results file.
+
+Usage (from part2/hbnb): python -m benchmarks.bench_endpoints [--users 1000] [--places 1000]
+    [--reviews-per-place 5] [--requests 500] [--threads 8] [--modes client http]
+    [--backend memory] [--output results.json] [--compare previous.json]
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from app import create_app
+from app.services import facade
+
+
+class Dataset:
+    """Ids of the seeded objects, and generators of unique write payloads"""
+
+    def __init__(self, users, amenities, places, reviews, deletable_reviews):
+        self.users = users
+        self.amenities = amenities
+        self.places = places
+        self.reviews = reviews
+        self.deletable_reviews = deque(deletable_reviews)
+        self._counter = itertools.count()  # (next() on it is atomic, the HTTP threads share it)
+
+    def unique(self):
+        return next(self._counter)
+
+    def pick(self, ids, n):
+        return ids[n % len(ids)]
+
+
+def seed(users, amenities, places, reviews_per_place, deletable):
+    """Create the dataset through the facade, return its Dataset"""
+    rng = random.Random(42)
+    user_objs = [facade.create_user({"first_name": "Bench", "last_name": f"User{index}",
+                                     "email": f"bench.user{index}@example.com"}) for index in range(users)]
+    amenity_objs = [facade.create_amenity({"name": f"Amenity {index}"}) for index in range(amenities)]
+    place_objs = []
+    for index in range(places):
+        place_objs.append(facade.create_place({
+            "title": f"Place {index}",
+            "description": "Synthetic place of the endpoint benchmark",
+            "price": round(rng.uniform(10, 500), 2),
+            "latitude": rng.uniform(-60, 70),
+            "longitude": rng.uniform(-180, 180),
+            "owner": user_objs[index % users],
+            "amenities": rng.sample(amenity_objs, min(3, amenities))
+        }))
+    review_objs = [facade.create_review({"text": "Synthetic review", "rating": rng.randint(1, 5),
+                                         "place": place, "user": rng.choice(user_objs)})
+                   for place in place_objs for _ in range(reviews_per_place)]
+    deletable_objs = [facade.create_review({"text": "To be deleted", "rating": 3,
+                                            "place": rng.choice(place_objs), "user": rng.choice(user_objs)})
+                      for _ in range(deletable)]
+    ids = lambda objs: [obj.id for obj in objs]
+    return Dataset(ids(user_objs), ids(amenity_objs), ids(place_objs), ids(review_objs), ids(deletable_objs))
+
+
+def place_payload(data, n):
+    return {"title": f"Bench place {n}", "description": "Benchmark", "price": 75.0, "latitude": 10.0,
+            "longitude": 20.0, "owner_id": data.pick(data.users, n), "amenities": [data.pick(data.amenities, n)]}
+
+
+# name -> function(dataset, n) returning the (method, path, JSON body) of the n-th request
+ENDPOINTS = {
+    'POST /users/': lambda d, n: ('POST', '/api/v1/users/', {
+        "first_name": "New", "last_name": "User", "email": f"bench.new{d.unique()}@example.com"}),
+    'GET /users/': lambda d, n: ('GET', '/api/v1/users/?limit=20', None),
+    'GET /users/<id>': lambda d, n: ('GET', f'/api/v1/users/{d.pick(d.users, n)}', None),
+    'PUT /users/<id>': lambda d, n: ('PUT', f'/api/v1/users/{d.pick(d.users, n)}', {"last_name": f"Updated{n}"}),
+    'GET /users/<id>/reviews': lambda d, n: ('GET', f'/api/v1/reviews/users/{d.pick(d.users, n)}/reviews', None),
+    'POST /amenities/': lambda d, n: ('POST', '/api/v1/amenities/', {"name": f"New amenity {d.unique()}"}),
+    'GET /amenities/': lambda d, n: ('GET', '/api/v1/amenities/?limit=20', None),
+    'GET /amenities/<id>': lambda d, n: ('GET', f'/api/v1/amenities/{d.pick(d.amenities, n)}', None),
+    'PUT /amenities/<id>': lambda d, n: ('PUT', f'/api/v1/amenities/{d.pick(d.amenities, n)}', {
+        "name": f"Renamed amenity {d.unique()}"}),
+    'GET /amenities/<id>/places': lambda d, n: ('GET', f'/api/v1/amenities/{d.pick(d.amenities, n)}/places', None),
+    'POST /places/': lambda d, n: ('POST', '/api/v1/places/', place_payload(d, n)),
+    'GET /places/': lambda d, n: ('GET', '/api/v1/places/?limit=20', None),
+    'GET /places/?bbox=': lambda d, n: ('GET', '/api/v1/places/?bbox=40,-10,55,20', None),
+    'GET /places/?near=': lambda d, n: ('GET', '/api/v1/places/?near=48.85,2.35&radius_km=1000', None),
+    'GET /places/?min_price=': lambda d, n: ('GET', '/api/v1/places/?min_price=80&max_price=120', None),
+    'GET /places/top': lambda d, n: ('GET', '/api/v1/places/top?by=rating&n=10', None),
+    'GET /places/<id>': lambda d, n: ('GET', f'/api/v1/places/{d.pick(d.places, n)}', None),
+    'PUT /places/<id>': lambda d, n: ('PUT', f'/api/v1/places/{d.pick(d.places, n)}', {"price": 60.0 + n % 100}),
+    'POST /reviews/': lambda d, n: ('POST', '/api/v1/reviews/', {
+        "text": "Benchmark review", "rating": n % 5 + 1,
+        "user_id": d.pick(d.users, n), "place_id": d.pick(d.places, n)}),
+    'GET /reviews/': lambda d, n: ('GET', '/api/v1/reviews/?limit=20', None),
+    'GET /reviews/<id>': lambda d, n: ('GET', f'/api/v1/reviews/{d.pick(d.reviews, n)}', None),
+    'PUT /reviews/<id>': lambda d, n: ('PUT', f'/api/v1/reviews/{d.pick(d.reviews, n)}', {"rating": n % 5 + 1}),
+    'DELETE /reviews/<id>': lambda d, n: ('DELETE', f'/api/v1/reviews/{d.deletable_reviews.popleft()}', None),
+    'GET /places/<id>/reviews': lambda d, n: ('GET', f'/api/v1/reviews/places/{d.pick(d.places, n)}/reviews', None),
+}
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of sorted values"""
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else float('nan')
+
+
+def summarize(latencies, errors, elapsed):
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+def run_client(app, data, endpoint, requests):
+    """Sequential requests through the Flask test client"""
+    client = app.test_client()
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    for n in range(requests):
+        method, path, body = endpoint(data, n)
+        start = time.perf_counter()
+        response = client.open(path, method=method, json=body)
+        latencies.append(time.perf_counter() - start)
+        errors += response.status_code >= 400
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def run_http(port, data, endpoint, requests, threads):
+    """The requests spread over `threads` HTTP clients of a local server"""
+    latencies, lock = [], threading.Lock()
+    counter = itertools.count()
+    errors = []
+
+    def worker():
+        own = []
+        while True:
+            n = next(counter)
+            if n >= requests:
+                break
+            method, path, body = endpoint(data, n)
+            payload = json.dumps(body).encode() if body is not None else None
+            start = time.perf_counter()
+            # (A connection per request: the development server closes them after each response)
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            try:
+                connection.request(method, path, body=payload, headers={'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                response.read()
+                if response.status >= 400:
+                    errors.append(response.status)
+            except OSError as err:
+                errors.append(type(err).__name__)
+            finally:
+                connection.close()
+            own.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(own)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for _ in range(threads):
+            executor.submit(worker)
+    return summarize(latencies, len(errors), time.perf_counter() - started)
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, previous=None):
+    print(f"{'endpoint':<30}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for mode, endpoints in results.items():
+        print(f"-- {mode}")
+        for name, result in endpoints.items():
+            line = (f"{name:<30}{result['rps']:>10.0f}{result['p50_ms']:>10.2f}"
+                    f"{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['errors']:>8}")
+            before = (previous or {}).get(mode, {}).get(name)
+            if before and before['rps'] and before['p50_ms']:
+                line += (f"   rps {(result['rps'] / before['rps'] - 1) * 100:+.0f}%"
+                         f" p50 {(result['p50_ms'] / before['p50_ms'] - 1) * 100:+.0f}%")
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--amenities', type=int, default=50)
+    parser.add_argument('--places', type=int, default=1000)
+    parser.add_argument('--reviews-per-place', type=int, default=5)
+    parser.add_argument('--requests', type=int, default=500, help='requests per endpoint and mode')
+    parser.add_argument('--threads', type=int, default=8, help='HTTP load generator threads')
+    parser.add_argument('--modes', nargs='+', choices=['client', 'http'], default=['client', 'http'])
+    parser.add_argument('--backend', choices=['memory', 'sqlite', 'journal'], default='memory')
+    parser.add_argument('--endpoints', nargs='+', metavar='NAME', help='only these endpoints (names as printed)')
+    parser.add_argument('--output', help='save the results to this JSON file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare with')
+    args = parser.parse_args()
+
+    unknown = set(args.endpoints or ()) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+    endpoints = {name: ENDPOINTS[name] for name in args.endpoints or ENDPOINTS}
+
+    app = create_app()
+    directory = tempfile.TemporaryDirectory()
+    if args.backend != 'memory':
+        facade.use_repositories(args.backend, os.path.join(directory.name, 'hbnb.db' if args.backend == 'sqlite'
+                                                           else 'journal'))
+    start = time.perf_counter()
+    data = seed(args.users, args.amenities, args.places, args.reviews_per_place,
+                deletable=args.requests * len(args.modes))
+    print(f"Seeded {args.users} users, {args.amenities} amenities, {args.places} places and "
+          f"{args.places * args.reviews_per_place} reviews on {args.backend} in {time.perf_counter() - start:.1f}s")
+
+    results = {}
+    server = None
+    try:
+        for mode in args.modes:
+            if mode == 'http':
+                server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietRequestHandler)
+                threading.Thread(target=server.serve_forever, daemon=True).start()
+            results[mode] = {}
+            for name, endpoint in endpoints.items():
+                if mode == 'client':
+                    results[mode][name] = run_client(app, data, endpoint, args.requests)
+                else:
+                    results[mode][name] = run_http(server.server_port, data, endpoint, args.requests, args.threads)
+    finally:
+        if server is not None:
+            server.shutdown()
+        facade.close()
+        directory.cleanup()
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as file:
+            previous = json.load(file)['results']
+    print_results(results, previous)
+
+    if args.output:
+        report = {
+            "meta": {
+                "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                "revision": git_revision(),
+                "python": platform.python_version(),
+                "cpus": os.cpu_count(),
+                "backend": args.backend,
+                "dataset": {"users": args.users, "amenities": args.amenities, "places": args.places,
+                            "reviews_per_place": args.reviews_per_place},
+                "requests": args.requests,
+                "threads": args.threads,
+            },
+            "results": results,
+        }
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
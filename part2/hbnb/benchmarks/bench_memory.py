@@ -0,0 +1,92 @@
+"""Measure the memory footprint of users, places and reviews.
+
+Builds `count` objects of each model (places and reviews spread over the
+users) and reports the RSS growth per entity and the total RSS. With
+--store the objects go through the facade, so repository indexes count too.
+
+Usage (from part2/hbnb): python -m benchmarks.bench_memory [--count 1000000] [--store]
+"""
+import argparse
+import gc
+import os
+import resource
+
+from app.models.place import Place
+from app.models.review import Review
+from app.models.user import User
+from app.services.facade import HBnBFacade
+
+
+def rss_bytes():
+    """Current resident set size (peak RSS where /proc is not available)"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def build_users(count, facade):
+    users = []
+    for index in range(count):
+        user_data = {"first_name": "Bench", "last_name": f"User{index}", "email": f"user{index}@example.com"}
+        users.append(facade.create_user(user_data) if facade else User(**user_data))
+    return users
+
+
+def build_places(count, users, facade):
+    places = []
+    for index in range(count):
+        owner = users[index % len(users)]
+        place_data = {"title": f"Place {index}", "description": None, "price": float(index % 500),
+                      "latitude": (index % 180) - 90.0, "longitude": (index % 360) - 180.0,
+                      "owner": owner, "amenities": []}
+        place = facade.create_place(place_data) if facade else Place(**place_data)
+        if not facade:
+            owner.add_place(place)
+        places.append(place)
+    return places
+
+
+def build_reviews(count, users, places, facade):
+    reviews = []
+    for index in range(count):
+        review_data = {"text": "Nice stay", "rating": index % 5 + 1,
+                       "place": places[index % len(places)], "user": users[index % len(users)]}
+        review = facade.create_review(review_data) if facade else Review(**review_data)
+        if not facade:
+            review.place.add_review(review)
+            review.user.add_review(review)
+        reviews.append(review)
+    return reviews
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=1_000_000)
+    parser.add_argument('--store', action='store_true', help='create the objects through the facade')
+    args = parser.parse_args()
+
+    facade = HBnBFacade() if args.store else None
+    # (The collector only adds noise while millions of long-lived objects are created)
+    gc.disable()
+    start = rss_bytes()
+    print(f"{'model':<10}{'count':>10}{'bytes/entity':>15}")
+
+    before = rss_bytes()
+    users = build_users(args.count, facade)
+    print(f"{'users':<10}{args.count:>10}{(rss_bytes() - before) / args.count:>15.0f}")
+
+    before = rss_bytes()
+    places = build_places(args.count, users, facade)
+    print(f"{'places':<10}{args.count:>10}{(rss_bytes() - before) / args.count:>15.0f}")
+
+    before = rss_bytes()
+    build_reviews(args.count, users, places, facade)
+    print(f"{'reviews':<10}{args.count:>10}{(rss_bytes() - before) / args.count:>15.0f}")
+
+    print(f"total RSS {rss_bytes() / 2 ** 20:.0f} MiB ({(rss_bytes() - start) / 2 ** 20:.0f} MiB for the objects)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Compare the NumPy column store with the object walk for place scans.
+
+Usage (from part2/hbnb): python -m benchmarks.bench_place_columns [--sizes 10000 100000 1000000]
+"""
+import argparse
+import random
+import time
+
+from app.services.facade import HBnBFacade
+
+QUERIES = {
+    "price range": {"min_price": 80.0, "max_price": 120.0},
+    "price range near point": {"min_price": 80.0, "max_price": 120.0,
+                               "latitude": 48.85, "longitude": 2.35, "radius_km": 500.0},
+    "distance sort": {"latitude": 48.85, "longitude": 2.35},
+}
+
+
+def seed(facade, size):
+    owner = facade.create_user({"first_name": "Bench", "last_name": "Mark", "email": "bench@example.com"})
+    rng = random.Random(42)
+    for index in range(size):
+        facade.create_place({
+            "title": f"Place {index}",
+            "description": None,
+            "price": round(rng.uniform(10, 500), 2),
+            "latitude": rng.uniform(-60, 70),
+            "longitude": rng.uniform(-180, 180),
+            "owner": owner,
+            "amenities": []
+        })
+
+
+def best_of(repeat, func, **kwargs):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(**kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'places':>10}  {'query':<24}{'object walk':>14}{'columns':>12}{'speedup':>10}")
+    for size in args.sizes:
+        facade = HBnBFacade()
+        if facade.place_columns is None:
+            raise SystemExit("numpy is required for this benchmark")
+        seed(facade, size)
+        for name, bounds in QUERIES.items():
+            walk = best_of(args.repeat, facade._filter_place_objects, **bounds)
+            columns = best_of(args.repeat, facade.filter_places, **bounds)
+            print(f"{size:>10}  {name:<24}{walk * 1000:>11.1f} ms{columns * 1000:>9.1f} ms{walk / columns:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Measure the full-text index: build time, memory and query latency.
+
+Documents are synthetic place texts (a 4 word title counted twice, a 15 word
+description) drawn from a Zipf-distributed vocabulary, so a few words are in
+most documents and most words are rare, as in real text. Queries of 1 to 3
+words are drawn from the same distribution; the worst case is the single most
+frequent word, which matches the most documents.
+
+Usage (from part2/hbnb): python -m benchmarks.bench_search [--sizes 10000 100000 1000000] [--queries 200]
+"""
+import argparse
+import gc
+import itertools
+import random
+import statistics
+import time
+
+from app.persistence.search import TextIndex, text_terms
+from benchmarks.bench_memory import rss_bytes
+
+VOCABULARY = 20000
+
+
+def zipf_sampler(rng, words):
+    weights = list(itertools.accumulate(1 / rank for rank in range(1, len(words) + 1)))
+    return lambda count: rng.choices(words, cum_weights=weights, k=count)
+
+
+def build(size, sample):
+    index = TextIndex()
+    for doc_id in range(size):
+        index.set_part(f'place-{doc_id}', None, text_terms((' '.join(sample(4)), 2), (' '.join(sample(15)), 1)))
+    return index
+
+
+def latencies(index, queries, limit=20):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, limit)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    words = [''.join(rng.choices('abcdefghijklmnopqrstuvwxyz', k=rng.randint(3, 9))) for _ in range(VOCABULARY)]
+    sample = zipf_sampler(rng, words)
+    print(f"{'documents':>10}  {'build':>8}  {'memory':>8}  {'query':<18}{'p50':>9}{'p95':>9}{'max':>9}{'matches':>10}")
+    for size in args.sizes:
+        gc.collect()
+        before = rss_bytes()
+        start = time.perf_counter()
+        index = build(size, sample)
+        build_time = time.perf_counter() - start
+        memory = (rss_bytes() - before) / 2 ** 20
+        workloads = {f"{words} word{'s' if words > 1 else ''}": [' '.join(sample(words)) for _ in range(args.queries)]
+                     for words in (1, 2, 3)}
+        most_frequent = max(index._term_ids, key=lambda term: len(index._postings[index._term_ids[term]][0]))
+        workloads["most frequent word"] = [most_frequent] * 10
+        index.search(most_frequent, 1)  # (Warm-up: the first search imports NumPy)
+        for name, queries in workloads.items():
+            timings = latencies(index, queries)
+            matches = statistics.median(index.search(query, 1)[1] for query in queries[:20])
+            prefix = f"{size:>10}  {build_time:>7.1f}s  {memory:>6.0f}MB" if name == "1 word" else ' ' * 30
+            print(f"{prefix}  {name:<18}{statistics.median(timings):>7.2f}ms{timings[int(len(timings) * 0.95)]:>7.2f}ms"
+                  f"{timings[-1]:>7.2f}ms{matches:>10.0f}")
+        del index
+
+
+if __name__ == '__main__':
+    main()
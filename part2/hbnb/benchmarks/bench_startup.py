@@ -0,0 +1,80 @@
+"""Measure the cold start of the app: imports, create_app and the first requests.
+
+Each run is a fresh interpreter, so the import times are those of a new
+worker. Reports the median over `--runs` of the `app` package import,
+create_app(), the first API request, and the first request of the Swagger
+spec, with the API docs enabled and disabled (HBNB_API_DOCS=0). --top lists
+the slowest modules to import (python -X importtime).
+
+Usage (from part2/hbnb): python -m benchmarks.bench_startup [--runs 10] [--top 10]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROBE = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+flask_app = app.create_app()
+created = time.perf_counter()
+client = flask_app.test_client()
+client.get('/api/v1/amenities/')
+first_request = time.perf_counter()
+spec = client.get('/swagger.json').status_code
+first_spec = time.perf_counter()
+print(json.dumps({
+    "import app": imported - start,
+    "create_app()": created - imported,
+    "first API request": first_request - created,
+    "first /swagger.json": first_spec - first_request if spec == 200 else None,
+}))
+"""
+
+
+def probe(docs):
+    env = dict(os.environ, HBNB_API_DOCS='1' if docs else '0')
+    output = subprocess.run([sys.executable, '-c', PROBE], env=env, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.splitlines()[-1])
+
+
+def slowest_imports(top):
+    """(cumulative microseconds, module) of the slowest top-level imports of `import app`"""
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            capture_output=True, text=True, check=True)
+    imports = []
+    for line in output.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        imports.append((int(cumulative), module.strip()))
+    return sorted(imports, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=0, help='also list the N slowest imports')
+    args = parser.parse_args()
+
+    print(f"{'step':<22}{'docs on':>12}{'docs off':>12}")
+    runs = {docs: [probe(docs) for _ in range(args.runs)] for docs in (True, False)}
+    for step in runs[True][0]:
+        cells = []
+        for docs in (True, False):
+            values = [run[step] for run in runs[docs] if run[step] is not None]
+            cells.append(f"{statistics.median(values) * 1000:>9.1f} ms" if values else f"{'-':>12}")
+        print(f"{step:<22}{''.join(cells)}")
+
+    if args.top:
+        print(f"\nSlowest imports of `import app` (cumulative):")
+        for microseconds, module in slowest_imports(args.top):
+            print(f"{microseconds / 1000:>9.1f} ms  {module}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,42 @@
 import os
 
+
+def parse_delete_rules(value):
+    """{"entity.relation": rule} of a comma separated list of entity.relation=rule items
+    (ValueError naming the bad item; the facade checks the relations when the app starts)"""
+    rules = {}
+    for item in filter(None, (item.strip() for item in value.split(','))):
+        relation, _, rule = (part.strip() for part in item.partition('='))
+        entity, _, related = relation.partition('.')
+        if not entity or not related or not rule:
+            raise ValueError(f"HBNB_DELETE_RULES: expected entity.relation=rule items, got {item!r}")
+        if rule not in ('cascade', 'restrict'):
+            raise ValueError(f"HBNB_DELETE_RULES: the rule of {relation} must be 'cascade' or 'restrict', not {rule!r}")
+        rules[relation] = rule
+    return rules
+
+
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'default_secret_key')
     DEBUG = False
+    # Storage backend of the facade: 'memory', 'sqlite' (shared by every worker process, each one
+    # catching up with the writes of the others at the start of its requests)
+    # or 'journal' (in memory, made durable by an append-only log and snapshots)
+    REPOSITORY = os.getenv('HBNB_REPOSITORY', 'memory')
+    SQLITE_PATH = os.getenv('HBNB_SQLITE_PATH', 'hbnb.db')
+    JOURNAL_DIR = os.getenv('HBNB_JOURNAL_DIR', 'data')
+    # (Durable writes wait for the fsync of their batch, otherwise they are flushed in the background)
+    JOURNAL_DURABLE = os.getenv('HBNB_JOURNAL_DURABLE', '1') != '0'
+    JOURNAL_COMPACT_INTERVAL = float(os.getenv('HBNB_JOURNAL_COMPACT_INTERVAL', 300))
+    # Serialized detail responses kept in memory (0 disables the cache)
+    RESPONSE_CACHE_SIZE = int(os.getenv('HBNB_RESPONSE_CACHE_SIZE', 10000))
+    # Request and facade/repository timings served at /metrics (Prometheus text format)
+    METRICS_ENABLED = os.getenv('HBNB_METRICS', '0') == '1'
+    # Swagger UI at /api/v1/ and its spec at /swagger.json (the spec is built on its first request)
+    API_DOCS = os.getenv('HBNB_API_DOCS', '1') != '0'
+    # Overrides of the facade's delete rules, e.g. HBNB_DELETE_RULES=users.places=cascade,places.reviews=restrict
+    # ('cascade' deletes the dependent objects, 'restrict' refuses the delete while there are any)
+    DELETE_RULES = parse_delete_rules(os.getenv('HBNB_DELETE_RULES', ''))
 
 class DevelopmentConfig(Config):
     DEBUG = True